@@ -1,18 +1,43 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.db.models import Q, Value
+from django.db.models.functions import Upper
 
 UserModel = get_user_model()
 
+def users_by_email(email):
+    # UPPER(email) = UPPER(%s) and email != '' together match the partial unique index
+    return UserModel._default_manager.alias(email_upper=Upper('email')).exclude(email='').filter(
+        email_upper=Upper(Value(email)),
+    )
+
 class EmailBackend(ModelBackend):
-    def authenticate(self, request, username=None, password=None, **kwargs):
-        email = username or kwargs.get('email')
-        if email is None or password is None:
-            return None
-        try:
-            user = UserModel.objects.get(email=email)
-        except UserModel.DoesNotExist:
+    """The only authentication backend: one query per login, by email or by username.
+
+    The email keyword (the login endpoint) is compared as UPPER(email) = UPPER(email), the
+    expression of the unique index from users.0001_unique_email_index (email__iexact would
+    compile to LIKE on SQLite and miss it). A username (the admin) may itself contain '@',
+    so it is matched against username or email in one query and the username wins.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        username = username or kwargs.get(UserModel.USERNAME_FIELD)
+        if password is None or (username is None and email is None):
             return None
+        if username is None:
+            users = list(users_by_email(email)[:1])
         else:
-            if user.check_password(password) and self.user_can_authenticate(user):
-                return user
+            users = sorted(
+                UserModel._default_manager.alias(email_upper=Upper('email')).filter(
+                    Q(username=username) | (Q(email_upper=Upper(Value(username))) & ~Q(email=''))
+                )[:2],
+                key=lambda user: user.username != username,
+            )
+        if not users:
+            # hash anyway so a missing account takes as long as a wrong password
+            UserModel().set_password(password)
+            return None
+        user = users[0]
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
         return None
@@ -0,0 +1,96 @@
+import pickle
+import threading
+import time as clock
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+AUTH_VERSION_KEY = "auth-user:version:{}"
+AUTH_USER_KEY = "auth-user:{}:{}"
+_local_users = OrderedDict()
+_local_users_lock = threading.Lock()
+
+
+def bump_auth_version(user_id):
+    cache.set(AUTH_VERSION_KEY.format(user_id), clock.time_ns(), None)
+
+
+def get_auth_version(user_id):
+    return cache.get_or_set(AUTH_VERSION_KEY.format(user_id), clock.time_ns, None)
+
+
+def invalidate_user(user_id):
+    # other processes drop their copy when AUTH_USER_LOCAL_TTL runs out
+    bump_auth_version(user_id)
+    with _local_users_lock:
+        _local_users.pop(str(user_id), None)
+
+
+def clear_local_users():
+    with _local_users_lock:
+        _local_users.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the token's user from a cache instead of a query per request.
+
+    Users are kept in-process for AUTH_USER_LOCAL_TTL seconds and in the shared cache under
+    (user id, auth version). The version is bumped when a user is saved or deleted (see
+    users.signals), so a password change or deactivation reaches every process within the
+    local TTL. Queryset .update() calls skip the signals and must call invalidate_user.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = self.get_cached_user(user_id)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+    def get_cached_user(self, user_id):
+        # the claim holds the id as a string; signals pass the model's pk
+        user_id = str(user_id)
+        now = clock.monotonic()
+        with _local_users_lock:
+            cached = _local_users.get(user_id)
+            if cached and cached[0] > now:
+                _local_users.move_to_end(user_id)
+                # kept pickled: every request gets a fresh instance (own _state and related
+                # object caches), so a view changing request.user never leaks into others
+                return pickle.loads(cached[1])
+
+        key = AUTH_USER_KEY.format(user_id, get_auth_version(user_id))
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+
+        with _local_users_lock:
+            _local_users[user_id] = (now + settings.AUTH_USER_LOCAL_TTL, pickle.dumps(user, pickle.HIGHEST_PROTOCOL))
+            if len(_local_users) > settings.AUTH_USER_LOCAL_CACHE_SIZE:
+                _local_users.popitem(last=False)
+        return user
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    # same bearer scheme as JWTAuthentication in the OpenAPI schema
+    target_class = "bank_kpi_backend.authentication.CachedJWTAuthentication"
@@ -1,6 +1,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from bank_kpi_backend.metrics import connect_celery_signals
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bank_kpi_backend.settings')
 
@@ -10,10 +11,17 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # auto-discover tasks
 app.autodiscover_tasks()
 
+# task counts and durations for /metrics
+connect_celery_signals()
+
 # schedule configuration
 app.conf.beat_schedule = {
     'generate-weekly-reports-every-monday-morning': {
         'task': 'reports.tasks.generate_weekly_reports',
         'schedule': crontab(hour=8, minute=0, day_of_week=1),  # Monday at 08:00
     },
+    'maintain-transaction-partitions-monthly': {
+        'task': 'transactions.tasks.maintain_transaction_partitions',
+        'schedule': crontab(hour=3, minute=0, day_of_month=1),  # 1st of the month at 03:00
+    },
 }
\ No newline at end of file
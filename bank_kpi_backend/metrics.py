@@ -0,0 +1,314 @@
+"""Request, import, KPI summary and Celery task metrics in the Prometheus text format.
+
+Each process (gunicorn worker, celery child) records into its own registry, with only a lock
+and a few dict updates per observation. At most every METRICS_PUSH_INTERVAL seconds it
+stores a snapshot of the registry in the shared cache. /metrics merges the snapshots of
+every process, so one scrape covers the web and the worker processes alike.
+
+A process that has not pushed for METRICS_SNAPSHOT_TIMEOUT seconds (stopped, restarted,
+recycled by max-requests) is folded into a running total of departed processes, so the
+merged counters never go backwards.
+"""
+import functools
+import logging
+import os
+import socket
+import threading
+import time as clock
+from bisect import bisect_left
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+DURATION_BUCKETS = LATENCY_BUCKETS + (60, 300, 1800)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "http_requests_total": ("counter", "Requests by route, method and status.", None),
+    "http_request_duration_seconds": ("histogram", "Time spent in the view and middleware, by route.", LATENCY_BUCKETS),
+    "http_request_db_queries": ("histogram", "Database queries per request, by route.", QUERY_BUCKETS),
+    "http_request_db_seconds_total": ("counter", "Time spent in database queries, by route.", None),
+    "transactions_imported_rows_total": ("counter", "Rows read by import_transactions and spooled imports.", None),
+    "transactions_import_seconds_total": ("counter", "Time spent importing; rows/s = rate(rows) / rate(seconds).", None),
+    "transactions_import_duration_seconds": ("histogram", "Duration of one import.", DURATION_BUCKETS),
+    "kpi_summary_duration_seconds": ("histogram", "Duration of calculate_kpi_summary calls.", LATENCY_BUCKETS),
+    "celery_tasks_total": ("counter", "Finished Celery tasks by task and state.", None),
+    "celery_task_duration_seconds": ("histogram", "Celery task run time, by task.", DURATION_BUCKETS),
+}
+SNAPSHOT_KEY = "metrics:process:{}"
+PROCESSES_KEY = "metrics:processes"
+DEPARTED_KEY = "metrics:departed"
+PRUNE_LOCK_KEY = "metrics:prune-lock"
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._pushed = 0.0
+        self._process = None
+        self._last_push = None
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # per-bucket counts, then sum and count; made cumulative when rendered
+                series = self._values[key] = [0] * (len(buckets) + 3)
+            series[bisect_left(buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._pushed = 0.0
+            self._last_push = None
+
+    def subtract(self, snapshot):
+        with self._lock:
+            for key, value in snapshot.items():
+                if isinstance(value, list):
+                    series = self._values[key]
+                    for i, count in enumerate(value):
+                        series[i] -= count
+                else:
+                    self._values[key] -= value
+
+    def process_key(self):
+        # the pid is read on every push: celery forks its pool children after import. the start
+        # time keeps a restarted process that gets the same pid (pid 1 in a container) apart
+        pid = os.getpid()
+        if self._process is None or self._process[0] != pid:
+            self._process = (pid, SNAPSHOT_KEY.format(f"{socket.gethostname()}:{pid}:{clock.time_ns()}"))
+        return self._process[1]
+
+    def push(self, force=False):
+        now = clock.time()
+        if not force and now - self._pushed < settings.METRICS_PUSH_INTERVAL:
+            return
+        self._pushed = now
+        key = self.process_key()
+        processes = cache.get(PROCESSES_KEY) or {}
+        if key not in processes:
+            if self._last_push is not None and cache.get(key) is None:
+                # folded into the departed totals while idle: those hold our last push,
+                # so only what was recorded since then is still ours to report
+                self.subtract(self._last_push)
+            # a lost update between two new processes is repaired by their next push
+            processes[key] = now
+            cache.set(PROCESSES_KEY, processes, None)
+        snapshot = self.snapshot()
+        # no expiry: merged_snapshots folds it into the departed totals once the process goes quiet
+        cache.set(key, (now, snapshot), None)
+        self._last_push = snapshot
+
+
+registry = Registry()
+
+
+def merge_snapshot(merged, snapshot):
+    for key, value in snapshot.items():
+        if isinstance(value, list):
+            total = merged.setdefault(key, [0] * len(value))
+            for i, count in enumerate(value):
+                total[i] += count
+        else:
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def fold_departed(departed, pushes):
+    """Adds the last snapshot of each departed process to the departed totals and forgets it."""
+    totals = cache.get(DEPARTED_KEY) or {}
+    for key in departed:
+        if key in pushes:
+            merge_snapshot(totals, pushes[key][1])
+    cache.set(DEPARTED_KEY, totals, None)
+    cache.delete_many(departed)
+    # read again so processes registered since the scrape started are kept
+    processes = cache.get(PROCESSES_KEY) or {}
+    cache.set(PROCESSES_KEY, {key: pushed for key, pushed in processes.items() if key not in departed}, None)
+
+
+def merged_snapshots():
+    registry.push(force=True)
+    processes = cache.get(PROCESSES_KEY) or {}
+    pushes = cache.get_many(list(processes) + [DEPARTED_KEY])
+    departed_totals = pushes.pop(DEPARTED_KEY, {})
+    now = clock.time()
+    # a process registers before its first snapshot is stored, so the registration time
+    # stands in until then
+    departed = [
+        key for key, registered in processes.items()
+        if now - (pushes[key][0] if key in pushes else registered) > settings.METRICS_SNAPSHOT_TIMEOUT
+    ]
+    # one scrape at a time folds, so no process is added to the totals twice
+    if departed and cache.add(PRUNE_LOCK_KEY, True, 60):
+        try:
+            fold_departed(departed, pushes)
+        finally:
+            cache.delete(PRUNE_LOCK_KEY)
+        departed_totals = cache.get(DEPARTED_KEY) or {}
+        pushes = {key: push for key, push in pushes.items() if key not in departed}
+
+    merged = merge_snapshot({}, departed_totals)
+    for _, snapshot in pushes.values():
+        merge_snapshot(merged, snapshot)
+    return merged
+
+
+def format_number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def render(values) -> str:
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in series:
+            if kind == "counter":
+                lines.append(f"{name}{format_labels(labels)} {format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ("+Inf",), value[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_number(value[-2])}")
+            lines.append(f"{name}_count{format_labels(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    # fails closed: without a token the endpoint is only served with DEBUG or METRICS_PUBLIC
+    token = settings.METRICS_TOKEN
+    if token:
+        if request.headers.get("Authorization") != f"Bearer {token}":
+            return HttpResponseForbidden()
+    elif not (settings.DEBUG or settings.METRICS_PUBLIC):
+        return HttpResponseForbidden()
+    return HttpResponse(render(merged_snapshots()), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def timed(name):
+    """Records the duration of each call of the decorated function in the histogram `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = clock.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.observe(name, clock.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def record_import(rows, seconds):
+    registry.inc("transactions_imported_rows_total", value=rows)
+    registry.inc("transactions_import_seconds_total", value=seconds)
+    registry.observe("transactions_import_duration_seconds", seconds)
+
+
+class QueryTimer:
+    """connection.execute_wrapper that counts queries and their time, keeping the SQL if asked."""
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = [] if keep_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = clock.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = clock.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if self.statements is not None:
+                self.statements.append((elapsed, sql))
+
+
+class MetricsMiddleware:
+    """Latency, status and database queries/time per route; logs the SQL of slow requests.
+
+    Streaming responses are measured until the response starts; queries run while the body
+    is streamed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slow_seconds = settings.METRICS_SLOW_REQUEST_SECONDS
+        timer = QueryTimer(keep_sql=bool(slow_seconds))
+        started = clock.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        elapsed = clock.perf_counter() - started
+
+        match = request.resolver_match
+        # the route pattern, not the path, so ids in URLs do not create new series
+        route = ("/" + match.route) if match else "unmatched"
+        registry.inc("http_requests_total", (("route", route), ("method", request.method), ("status", response.status_code)))
+        registry.observe("http_request_duration_seconds", elapsed, (("route", route),))
+        registry.observe("http_request_db_queries", timer.count, (("route", route),))
+        registry.inc("http_request_db_seconds_total", (("route", route),), timer.seconds)
+
+        if slow_seconds and elapsed >= slow_seconds:
+            slowest = sorted(timer.statements, reverse=True)[:settings.METRICS_SLOW_REQUEST_STATEMENTS]
+            logger.warning(
+                "Slow request %s %s: %.3fs, %d queries in %.3fs\n%s",
+                request.method, request.get_full_path(), elapsed, timer.count, timer.seconds,
+                "\n".join(f"  {seconds * 1000:8.1f} ms  {sql}" for seconds, sql in slowest),
+            )
+        registry.push()
+        return response
+
+
+def connect_celery_signals():
+    from celery.signals import task_prerun, task_postrun
+
+    started = {}
+
+    @task_prerun.connect(weak=False)
+    def task_started(task_id=None, **kwargs):
+        started[task_id] = clock.perf_counter()
+
+    @task_postrun.connect(weak=False)
+    def task_finished(task_id=None, task=None, state=None, **kwargs):
+        began = started.pop(task_id, None)
+        name = (("task", task.name),)
+        registry.inc("celery_tasks_total", name + (("state", state or "UNKNOWN"),))
+        if began is not None:
+            registry.observe("celery_task_duration_seconds", clock.perf_counter() - began, name)
+        registry.push()
@@ -14,6 +14,7 @@ import os
 from pathlib import Path
 from datetime import timedelta
 import dj_database_url
+from urllib.parse import urlsplit
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bank_kpi_backend.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +68,18 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'bank_kpi_backend.urls'
 
+# /metrics (Prometheus text format): each process pushes its counters to the cache at most every
+# METRICS_PUSH_INTERVAL seconds; processes silent for METRICS_SNAPSHOT_TIMEOUT seconds are folded
+# into the departed totals. with METRICS_TOKEN set, scrapes need "Authorization: Bearer <token>";
+# without one the endpoint answers 403 unless DEBUG or METRICS_PUBLIC (e.g. a private network) is set
+METRICS_PUSH_INTERVAL = int(os.getenv('METRICS_PUSH_INTERVAL', 15))
+METRICS_SNAPSHOT_TIMEOUT = int(os.getenv('METRICS_SNAPSHOT_TIMEOUT', 24 * 60 * 60))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.getenv('METRICS_PUBLIC', 'False') == 'True'
+# requests slower than this many seconds are logged with their slowest SQL statements (0 disables)
+METRICS_SLOW_REQUEST_SECONDS = float(os.getenv('METRICS_SLOW_REQUEST_SECONDS', 0))
+METRICS_SLOW_REQUEST_STATEMENTS = int(os.getenv('METRICS_SLOW_REQUEST_STATEMENTS', 10))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -96,6 +110,40 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# shared redis cache in docker, per-process memory when no url is configured (local runs);
+# tests always use memory (see test_settings)
+
+def redis_database(url, number):
+    # the same redis server on another database number
+    return urlsplit(url)._replace(path=f"/{number}").geturl()
+
+# without CACHE_URL the cache takes its own database on the broker's server: it is cleared
+# (tests, cache.clear()) without touching queued celery tasks and results
+CACHE_URL = os.getenv('CACHE_URL')
+if not CACHE_URL and os.getenv('REDIS_URL'):
+    CACHE_URL = redis_database(os.environ['REDIS_URL'], os.getenv('CACHE_REDIS_DB', 1))
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# versioned keys never serve stale data; the timeout only bounds memory use
+KPI_SUMMARY_CACHE_TIMEOUT = int(os.getenv('KPI_SUMMARY_CACHE_TIMEOUT', 60 * 60))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -116,7 +164,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'bank_kpi_backend.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PARSER_CLASSES': [
@@ -127,8 +175,8 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 10,
 }
 
+# one backend, one query per login: email (case-insensitive) or username
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
     'bank_kpi_backend.auth_backends.EmailBackend',
 ]
 
@@ -140,6 +188,11 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
+# CachedJWTAuthentication: seconds a process reuses a user before checking the shared auth version
+# (the bound on how long a password change or deactivation takes to reach every process)
+AUTH_USER_LOCAL_TTL = int(os.getenv('AUTH_USER_LOCAL_TTL', 30))
+AUTH_USER_LOCAL_CACHE_SIZE = int(os.getenv('AUTH_USER_LOCAL_CACHE_SIZE', 4096))
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 10 * 60))
 
 # Celery configuration
 CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
@@ -147,6 +200,32 @@ CELERY_RESULT_BACKEND = CELERY_BROKER_URL
 CELERY_TIMEZONE = "UTC"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+# users per weekly report task; chunks run in parallel across workers
+WEEKLY_REPORT_CHUNK_SIZE = int(os.getenv('WEEKLY_REPORT_CHUNK_SIZE', 500))
+
+# Transaction import
+TRANSACTION_IMPORT_CHUNK_SIZE = int(os.getenv('TRANSACTION_IMPORT_CHUNK_SIZE', 1000))
+TRANSACTION_IMPORT_MAX_REJECTS = int(os.getenv('TRANSACTION_IMPORT_MAX_REJECTS', 1000))
+# more than one worker parses on-disk uploads in a process pool, TRANSACTION_IMPORT_RANGE_BYTES at a time
+TRANSACTION_IMPORT_WORKERS = int(os.getenv('TRANSACTION_IMPORT_WORKERS', 1))
+TRANSACTION_IMPORT_RANGE_BYTES = int(os.getenv('TRANSACTION_IMPORT_RANGE_BYTES', 8 * 1024 * 1024))
+# per-user Bloom filter of stored hashes (kept in the cache) so certainly-new chunks skip the duplicate probe
+TRANSACTION_DEDUP_BLOOM = os.getenv('TRANSACTION_DEDUP_BLOOM', 'False') == 'True'
+TRANSACTION_DEDUP_BLOOM_MIN_CAPACITY = int(os.getenv('TRANSACTION_DEDUP_BLOOM_MIN_CAPACITY', 100000))
+# seconds a stored filter lives after its last save
+TRANSACTION_BLOOM_TTL = int(os.getenv('TRANSACTION_BLOOM_TTL', 7 * 24 * 60 * 60))
+# rows fetched per round trip by the streaming export
+TRANSACTION_EXPORT_CHUNK_SIZE = int(os.getenv('TRANSACTION_EXPORT_CHUNK_SIZE', 2000))
+# partition_transactions (PostgreSQL, opt-in): empty monthly partitions kept ahead, and how many
+# months of partitions stay attached (0 keeps all)
+TRANSACTION_PARTITION_MONTHS_AHEAD = int(os.getenv('TRANSACTION_PARTITION_MONTHS_AHEAD', 3))
+TRANSACTION_PARTITION_RETAIN_MONTHS = int(os.getenv('TRANSACTION_PARTITION_RETAIN_MONTHS', 0))
+# compiled per-user category matchers kept in each process
+CATEGORY_MATCHER_CACHE_SIZE = int(os.getenv('CATEGORY_MATCHER_CACHE_SIZE', 1024))
+# longest regex pattern accepted in a user's category rule
+CATEGORY_REGEX_MAX_LENGTH = int(os.getenv('CATEGORY_REGEX_MAX_LENGTH', 100))
+# async uploads are written here before the celery worker picks them up
+IMPORT_SPOOL_DIR = os.getenv('IMPORT_SPOOL_DIR', str(BASE_DIR / 'spool'))
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
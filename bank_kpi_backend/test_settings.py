@@ -0,0 +1,9 @@
+from .settings import *  # noqa: F401,F403
+
+# tests clear the cache before each test; it must never be a shared redis (the celery broker
+# lives there), whatever REDIS_URL/CACHE_URL the environment sets
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
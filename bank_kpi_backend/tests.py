@@ -0,0 +1,103 @@
+import logging
+import pytest
+from io import BytesIO
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from django.core.cache import cache
+from bank_kpi_backend.metrics import Registry, registry, render, merged_snapshots, PROCESSES_KEY
+from reports.services import calculate_kpi_summary
+from transactions.services import import_transactions
+from transactions.tasks import maintain_transaction_partitions
+
+
+@pytest.fixture(autouse=True)
+def public_metrics(settings):
+    settings.METRICS_PUBLIC = True
+
+@pytest.fixture
+def client_user(db):
+    user = User.objects.create_user(username="metricsuser", password="pass1234")
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, user
+
+def scrape():
+    response = APIClient().get("/metrics")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    return response.content.decode()
+
+def test_requests_are_counted_per_route(client_user):
+    client, _ = client_user
+    client.get("/reports/history/")
+    client.get("/reports/history/")
+
+    text = scrape()
+    assert 'http_requests_total{route="/reports/history/",method="GET",status="200"}' in text
+    assert 'http_request_duration_seconds_bucket{route="/reports/history/",le="+Inf"}' in text
+    assert 'http_request_db_queries_count{route="/reports/history/"}' in text
+    assert "# TYPE http_request_db_seconds_total counter" in text
+
+def test_import_summary_and_task_metrics(client_user):
+    _, user = client_user
+    before = registry.snapshot()
+    import_transactions(user, BytesIO(b"date,amount,currency,type,description\n2025-07-01,10.00,TRY,credit,Fatura\n2025-07-02,-5.00,TRY,debit,Kira\n"), "metrics-key")
+    calculate_kpi_summary(user)
+    maintain_transaction_partitions.apply()
+    after = registry.snapshot()
+
+    assert after[("transactions_imported_rows_total", ())] - before.get(("transactions_imported_rows_total", ()), 0) == 2
+    summaries = ("kpi_summary_duration_seconds", ())
+    assert after[summaries][-1] - (before[summaries][-1] if summaries in before else 0) == 1
+    task = ("celery_tasks_total", (("task", "transactions.tasks.maintain_transaction_partitions"), ("state", "SUCCESS")))
+    assert after[task] - before.get(task, 0) == 1
+
+def test_slow_requests_log_their_sql(client_user, settings, caplog):
+    client, _ = client_user
+    settings.METRICS_SLOW_REQUEST_SECONDS = 1e-9
+    with caplog.at_level(logging.WARNING, logger="bank_kpi_backend.metrics"):
+        client.get("/reports/history/")
+    assert "Slow request GET /reports/history/" in caplog.text
+    assert "SELECT" in caplog.text
+
+def test_metrics_token(db, settings):
+    settings.METRICS_TOKEN = "scrape-secret"
+    assert APIClient().get("/metrics").status_code == 403
+    assert APIClient().get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret").status_code == 200
+
+def test_metrics_fail_closed_without_a_token(db, settings):
+    settings.METRICS_PUBLIC = False
+    assert APIClient().get("/metrics").status_code == 403
+
+def test_departed_processes_keep_their_counts(settings):
+    settings.METRICS_SNAPSHOT_TIMEOUT = 60
+    rows = ("transactions_imported_rows_total", ())
+    other = Registry()
+    other.inc(*rows, value=5)
+    other.push(force=True)
+    assert merged_snapshots()[rows] == 5
+
+    # the other process stops pushing: its last counts stay in the merged totals
+    key = other.process_key()
+    pushed, snapshot = cache.get(key)
+    cache.set(key, (pushed - 3600, snapshot), None)
+    assert merged_snapshots()[rows] == 5
+    assert key not in cache.get(PROCESSES_KEY)
+
+    # and if it was only idle, it reports just what came after the folded counts
+    other.inc(*rows, value=2)
+    other.push(force=True)
+    assert merged_snapshots()[rows] == 7
+    assert merged_snapshots()[rows] == 7
+
+def test_histogram_buckets_are_cumulative():
+    local = Registry()
+    for seconds in (0.003, 0.2, 0.2, 40):
+        local.observe("kpi_summary_duration_seconds", seconds)
+    text = render(local.snapshot())
+
+    assert 'kpi_summary_duration_seconds_bucket{le="0.005"} 1' in text
+    assert 'kpi_summary_duration_seconds_bucket{le="0.25"} 3' in text
+    assert 'kpi_summary_duration_seconds_bucket{le="30"} 3' in text
+    assert 'kpi_summary_duration_seconds_bucket{le="+Inf"} 4' in text
+    assert "kpi_summary_duration_seconds_count 4" in text
@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from bank_kpi_backend.metrics import metrics_view
 
 
 urlpatterns = [
@@ -24,6 +25,7 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('transactions/', include('transactions.urls')),
     path('reports/', include('reports.urls')),
+    path('metrics', metrics_view, name='metrics'),
 
     # Swagger
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
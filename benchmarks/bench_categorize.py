@@ -0,0 +1,55 @@
+"""Descriptions per second of the compiled category matcher versus the nested keyword loop.
+
+    python -m benchmarks.bench_categorize --descriptions 100000 --extra-keywords 300
+"""
+import argparse
+import random
+from collections import Counter
+
+from benchmarks.common import setup_django, timed
+
+
+def legacy_detect_category(description, keywords):
+    desc_lower = description.lower()
+    scores = Counter()
+    for category, words in keywords.items():
+        for word in words:
+            if word in desc_lower:
+                scores[category] += 1
+    return scores.most_common(1)[0][0] if scores else "Uncategorized"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--descriptions", type=int, default=100000)
+    parser.add_argument("--extra-keywords", type=int, default=300)
+    parser.add_argument("--distinct", type=int, default=2000, help="distinct descriptions in the sample")
+    args = parser.parse_args()
+
+    setup_django()
+    from transactions.categorization import CategoryMatcher
+    from transactions.services import CATEGORY_KEYWORDS
+
+    rng = random.Random(0)
+    keywords = {category: list(words) for category, words in CATEGORY_KEYWORDS.items()}
+    for i in range(args.extra_keywords):
+        keywords.setdefault(f"Rule {i % 50}", []).append(f"tedarikçi{i}")
+    words = [w for ws in keywords.values() for w in ws] + ["ödeme", "havale", "market", "temmuz"]
+    distinct = [" ".join(rng.choice(words) for _ in range(4)) + f" #{i}" for i in range(args.distinct)]
+    sample = [rng.choice(distinct) for _ in range(args.descriptions)]
+
+    results = {}
+    with timed(results, "nested loop"):
+        expected = [legacy_detect_category(d, keywords) for d in sample]
+    with timed(results, "compiled, no cache"):
+        uncached = CategoryMatcher.from_keywords(keywords, cache_size=0).categorize_many(sample)
+    with timed(results, "compiled + lru"):
+        cached = CategoryMatcher.from_keywords(keywords).categorize_many(sample)
+    assert expected == uncached == cached
+
+    for name, seconds in results.items():
+        print(f"{name:>20}: {args.descriptions / seconds:10.0f} descriptions/s")
+
+
+if __name__ == "__main__":
+    main()
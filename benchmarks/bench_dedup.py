@@ -0,0 +1,50 @@
+"""Duplicate detection cost of imports with and without the per-user Bloom filter.
+
+Each run imports a history of --rows rows, then a file of only new rows and a re-upload
+that overlaps the history by half.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_dedup --rows 20000
+"""
+import argparse
+from io import BytesIO
+
+from benchmarks.common import setup_django, test_database, timed, sample_csv
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from transactions.models import ImportBatch
+    from transactions.services import import_transactions
+
+    files = {
+        "new rows": sample_csv(args.rows, offset=args.rows),
+        "50% overlap": sample_csv(args.rows, offset=args.rows // 2),
+    }
+    results, stats = {}, {}
+    with test_database():
+        for bloom in (False, True):
+            settings.TRANSACTION_DEDUP_BLOOM = bloom
+            for name, payload in files.items():
+                user = User.objects.create_user(username=f"bench-dedup-{bloom}-{name}")
+                import_transactions(user, BytesIO(sample_csv(args.rows)), f"history-{user.pk}")
+                label = f"{name}, bloom {'on' if bloom else 'off'}"
+                with timed(results, label):
+                    import_transactions(user, BytesIO(payload), f"bench-{user.pk}")
+                stats[label] = ImportBatch.objects.get(idempotency_key=f"bench-{user.pk}")
+
+    for name, seconds in results.items():
+        batch = stats[name]
+        print(
+            f"{name:>22}: {seconds:6.2f} s total  dedup {batch.dedup_seconds * 1000:7.1f} ms"
+            f"  probes {batch.dedup_probes:4d}  skipped {batch.skipped_rows}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Insert rate and unique index size of the dedup key: 64-char hex with a global unique
+index versus a 32-byte digest unique per (user, hash).
+
+Both layouts are created as scratch tables next to the real schema, so the numbers only
+measure the key and its index.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_hash_index --rows 200000
+"""
+import argparse
+import hashlib
+
+from benchmarks.common import setup_django, test_database, timed
+
+LAYOUTS = {
+    "hex, global unique": ("varchar(64)", "unique_hash", lambda digest: digest.hex()),
+    "binary, (user, hash)": ("{binary}", "user_id, unique_hash", lambda digest: digest),
+}
+
+
+def index_bytes(connection, table, index):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_relation_size(%s)", [index])
+        else:
+            # needs SQLite built with the dbstat virtual table (the python.org builds are)
+            cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [index])
+        return cursor.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection, transaction
+
+    binary = "bytea" if connection.vendor == "postgresql" else "blob"
+    digests = [hashlib.sha256(str(i).encode()).digest() for i in range(args.rows)]
+    results, sizes = {}, {}
+
+    with test_database():
+        for n, (name, (column, key, encode)) in enumerate(LAYOUTS.items()):
+            table, index = f"bench_hash_{n}", f"bench_hash_{n}_unique"
+            with connection.cursor() as cursor:
+                cursor.execute(f"CREATE TABLE {table} (id integer PRIMARY KEY, user_id integer NOT NULL, unique_hash {column.format(binary=binary)} NOT NULL)")
+                cursor.execute(f"CREATE UNIQUE INDEX {index} ON {table} ({key})")
+
+            rows = [(i, i % args.users, encode(digest)) for i, digest in enumerate(digests)]
+            with timed(results, name):
+                for start in range(0, len(rows), args.batch_size):
+                    with transaction.atomic(), connection.cursor() as cursor:
+                        cursor.executemany(f"INSERT INTO {table} (id, user_id, unique_hash) VALUES (%s, %s, %s)", rows[start:start + args.batch_size])
+            sizes[name] = index_bytes(connection, table, index)
+
+    for name, seconds in results.items():
+        print(f"{name:>22}: {args.rows / seconds:9.0f} rows/s  index {sizes[name] / 1024 / 1024:7.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
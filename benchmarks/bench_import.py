@@ -0,0 +1,63 @@
+"""Rows per second of the bulk import path versus per-row get_or_create.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_import --rows 20000
+"""
+import argparse
+import csv
+from io import BytesIO, TextIOWrapper
+
+from benchmarks.common import setup_django, test_database, timed, sample_csv
+
+
+def legacy_import(user, csv_file, idempotency_key):
+    from datetime import datetime
+    from django.db import transaction as db_transaction
+    from django.utils.timezone import make_aware
+    from transactions.models import Transaction, ImportBatch
+    from transactions.services import validate_currency, generate_unique_hash, detect_category
+
+    reader = csv.DictReader(TextIOWrapper(csv_file, encoding="utf-8-sig"))
+    with db_transaction.atomic():
+        batch = ImportBatch.objects.create(user=user, idempotency_key=idempotency_key)
+        for row in reader:
+            Transaction.objects.get_or_create(
+                unique_hash=generate_unique_hash(user.id, row),
+                defaults={
+                    "user": user,
+                    "batch": batch,
+                    "date": make_aware(datetime.strptime(row["date"], "%Y-%m-%d")),
+                    "amount": row["amount"],
+                    "currency": validate_currency(row["currency"]),
+                    "transaction_type": row["type"],
+                    "description": row["description"],
+                    "category": detect_category(row["description"]),
+                },
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from transactions.services import import_transactions
+
+    payload = sample_csv(args.rows)
+    results = {}
+    with test_database():
+        legacy_user = User.objects.create_user(username="bench-legacy")
+        bulk_user = User.objects.create_user(username="bench-bulk")
+        with timed(results, "get_or_create"):
+            legacy_import(legacy_user, BytesIO(payload), "bench-legacy")
+        with timed(results, "bulk"):
+            import_transactions(bulk_user, BytesIO(payload), "bench-bulk", chunk_size=args.chunk_size)
+
+    for name, seconds in results.items():
+        print(f"{name:>14}: {args.rows / seconds:10.0f} rows/s ({seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
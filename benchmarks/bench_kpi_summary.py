@@ -0,0 +1,70 @@
+"""calculate_kpi_summary (rollups + grouped edge query) versus the per-row Python loop.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_kpi_summary --rows 200000 [--daily-rates]
+
+--daily-rates loads one USD and EUR rate per day, so every foreign total is converted per day.
+"""
+import argparse
+
+from benchmarks.common import setup_django, test_database, timed, seed_transactions
+
+
+def legacy_kpi_summary(user, target_currency, dated=False):
+    from transactions.models import Transaction
+    from transactions.services import convert_amount
+
+    total_income = 0
+    total_expense = 0
+    category_totals = {}
+    for tx in Transaction.objects.filter(user=user):
+        amount_converted = convert_amount(tx.amount, tx.currency, target_currency, tx.date.date() if dated else None)
+        if tx.amount > 0:
+            total_income += amount_converted
+        else:
+            total_expense += abs(amount_converted)
+            if tx.category:
+                category_totals[tx.category] = category_totals.get(tx.category, 0) + abs(amount_converted)
+    return total_income, total_expense, category_totals
+
+
+def seed_daily_rates():
+    from datetime import date, timedelta
+    from decimal import Decimal
+    from transactions.models import ExchangeRate
+    from transactions.services import bump_rates_version
+
+    ExchangeRate.objects.bulk_create([
+        ExchangeRate(currency=currency, date=date(2024, 1, 1) + timedelta(days=i), rate=base + Decimal(i) / 100)
+        for currency, base in (("USD", Decimal("30")), ("EUR", Decimal("33"))) for i in range(366)
+    ])
+    bump_rates_version()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--currency", default="USD")
+    parser.add_argument("--daily-rates", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from reports.services import calculate_kpi_summary
+
+    results = {}
+    with test_database():
+        user = User.objects.create_user(username="bench-kpi")
+        seed_transactions(user, args.rows)
+        if args.daily_rates:
+            seed_daily_rates()
+        with timed(results, "row loop"):
+            legacy_kpi_summary(user, args.currency, args.daily_rates)
+        with timed(results, "summary"):
+            calculate_kpi_summary(user, target_currency=args.currency)
+
+    for name, seconds in results.items():
+        print(f"{name:>14}: {seconds * 1000:9.1f} ms for {args.rows} rows")
+
+
+if __name__ == "__main__":
+    main()
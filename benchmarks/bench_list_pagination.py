@@ -0,0 +1,45 @@
+"""Latency of page 1 versus a deep page for page-number and cursor pagination.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_list_pagination --rows 200000 --page 10000
+"""
+import argparse
+
+from benchmarks.common import setup_django, test_database, seed_transactions, median_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--page", type=int, default=10000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from rest_framework.settings import api_settings
+    from rest_framework.test import APIClient
+    from transactions.pagination import KeysetPagination
+    from transactions.services import get_filtered_transactions
+
+    with test_database():
+        user = User.objects.create_user(username="bench-pages")
+        seed_transactions(user, args.rows)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        depth = (args.page - 1) * api_settings.PAGE_SIZE
+        deep_row = get_filtered_transactions(user).values("date", "id")[depth - 1]
+        deep_cursor = KeysetPagination().encode_cursor(deep_row)
+
+        results = {
+            "page-number, page 1": median_ms(lambda: client.get("/transactions/", {"page": 1})),
+            f"page-number, page {args.page}": median_ms(lambda: client.get("/transactions/", {"page": args.page})),
+            "cursor, page 1": median_ms(lambda: client.get("/transactions/", {"pagination": "cursor"})),
+            f"cursor, page {args.page}": median_ms(lambda: client.get("/transactions/", {"cursor": deep_cursor})),
+        }
+
+    for name, ms in results.items():
+        print(f"{name:>26}: {ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Serialization throughput of the transaction list: ModelSerializer over instances versus
+the lean serializer over a .values() projection (query time included).
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_list_serializer --rows 20000
+"""
+import argparse
+
+from benchmarks.common import setup_django, test_database, seed_transactions, median_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from transactions.serializers import LIST_FIELDS, TransactionSerializer, TransactionListSerializer
+    from transactions.services import get_filtered_transactions
+
+    with test_database():
+        user = User.objects.create_user(username="bench-serializer")
+        seed_transactions(user, args.rows)
+        queryset = get_filtered_transactions(user)
+
+        results = {
+            "ModelSerializer, instances": median_ms(lambda: TransactionSerializer(queryset.all(), many=True).data, repeat=3),
+            "lean serializer, values()": median_ms(lambda: TransactionListSerializer(queryset.values(*LIST_FIELDS), many=True).data, repeat=3),
+            "lean, fields=id,date,amount": median_ms(
+                lambda: TransactionListSerializer(queryset.values("id", "date", "amount"), many=True, fields=["id", "date", "amount"]).data,
+                repeat=3,
+            ),
+        }
+
+    for name, ms in results.items():
+        print(f"{name:>28}: {ms:8.1f} ms  {args.rows / ms * 1000:10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Per-request cost of MetricsMiddleware: the list and summary endpoints with and without it,
+and with the slow-request log capturing SQL.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_metrics_overhead --rows 20000 --requests 200 --rounds 9
+"""
+import argparse
+
+from benchmarks.common import setup_django, test_database, seed_transactions, median_ms
+
+
+def middleware_alone(calls):
+    # the middleware around a view that runs three trivial queries, without the rest of the stack
+    from django.db import connection
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.urls import resolve
+    from bank_kpi_backend.metrics import MetricsMiddleware
+
+    def view(request):
+        with connection.cursor() as cursor:
+            for _ in range(3):
+                cursor.execute("SELECT 1")
+        return HttpResponse()
+
+    request = RequestFactory().get("/reports/summary/")
+    request.resolver_match = resolve("/reports/summary/")
+    wrapped = MetricsMiddleware(view)
+    return {
+        name: median_ms(lambda: [fn(request) for _ in range(calls)]) / calls * 1000
+        for name, fn in (("view", view), ("view + middleware", wrapped))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint per round")
+    parser.add_argument("--rounds", type=int, default=9)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+
+    without = [name for name in settings.MIDDLEWARE if name != "bank_kpi_backend.metrics.MetricsMiddleware"]
+    variants = {
+        "no middleware": {"MIDDLEWARE": without},
+        "metrics": {},
+        # a threshold no request reaches: the SQL is kept but never logged
+        "metrics + slow log": {"METRICS_SLOW_REQUEST_SECONDS": 3600},
+    }
+    endpoints = {"/transactions/": {"page": 1}, "/reports/summary/": {}}
+    samples = {}
+    with test_database():
+        user = User.objects.create_user(username="bench-metrics")
+        seed_transactions(user, args.rows)
+        clients = {}
+        for name, overrides in variants.items():
+            with override_settings(**overrides):
+                clients[name] = APIClient()
+                clients[name].force_authenticate(user)
+                for path, params in endpoints.items():
+                    clients[name].get(path, params)
+
+        # variants take turns in every round so drift in the machine hits all of them alike
+        for _ in range(args.rounds):
+            for name, overrides in variants.items():
+                with override_settings(**overrides):
+                    for path, params in endpoints.items():
+                        ms = median_ms(lambda: [clients[name].get(path, params) for _ in range(args.requests)], repeat=1)
+                        samples.setdefault((name, path), []).append(ms / args.requests * 1000)
+        results = {key: sorted(values)[len(values) // 2] for key, values in samples.items()}
+        isolated = middleware_alone(args.requests * 50)
+
+    for (name, path), us in results.items():
+        base = results[("no middleware", path)]
+        print(f"{name:>20} {path:<20}: {us:8.1f} µs/request  {us - base:+7.1f} µs ({(us / base - 1):+6.1%})")
+    print(f"{'middleware alone':>20} {'3 queries':<20}: {isolated['view + middleware'] - isolated['view']:8.1f} µs/request")
+
+
+if __name__ == "__main__":
+    main()
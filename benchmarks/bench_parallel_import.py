@@ -0,0 +1,46 @@
+"""Parse/hash/categorize throughput for 1..N import workers.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_parallel_import --rows 200000 --workers 1,2,4
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import setup_django, timed, sample_csv
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count()}")
+    parser.add_argument("--range-bytes", type=int, default=None)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from transactions.services import parse_transactions, parse_transactions_parallel
+
+    if args.range_bytes:
+        settings.TRANSACTION_IMPORT_RANGE_BYTES = args.range_bytes
+
+    with tempfile.NamedTemporaryFile(suffix=".csv") as f:
+        f.write(sample_csv(args.rows))
+        f.flush()
+
+        results = {}
+        for workers in sorted({int(w) for w in args.workers.split(",")}):
+            with timed(results, workers):
+                if workers == 1:
+                    with open(f.name, "rb") as csv_file:
+                        count = sum(1 for _ in parse_transactions(csv_file, 1, lambda *a: None))
+                else:
+                    count = sum(1 for _ in parse_transactions_parallel(f.name, 1, lambda *a: None, workers))
+            assert count == args.rows
+
+    baseline = results[min(results)]
+    for workers, seconds in results.items():
+        print(f"{workers:>3} workers: {args.rows / seconds:10.0f} rows/s  x{baseline / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Token-obtain throughput of EmailTokenObtainPairView: ModelBackend followed by an unindexed
+exact-email EmailBackend, versus the single EmailBackend over the UPPER(email) unique index.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_token_obtain --users 50000 --logins 500
+
+Passwords use the MD5 hasher so the numbers show the lookup, not PBKDF2 (identical in both).
+"""
+import argparse
+
+from benchmarks.common import setup_django, test_database, timed
+
+
+class LegacyEmailBackend:
+    # the backend before the unique index: exact match, listed after ModelBackend
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        from django.contrib.auth.models import User
+
+        email = username or kwargs.get("email")
+        if email is None or password is None:
+            return None
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
+            return None
+        return user if user.check_password(password) and user.is_active else None
+
+    def get_user(self, user_id):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--logins", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from importlib import import_module
+    from django.apps import apps
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+
+    migration = import_module("users.migrations.0001_unique_email_index")
+    backends = {
+        "ModelBackend + legacy": ["django.contrib.auth.backends.ModelBackend", "benchmarks.bench_token_obtain.LegacyEmailBackend"],
+        "EmailBackend, indexed": ["bank_kpi_backend.auth_backends.EmailBackend"],
+    }
+    results, queries = {}, {}
+    with override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]), test_database():
+        password = make_password("pass1234")
+        User.objects.bulk_create([
+            User(username=f"bench-{i}", email=f"bench-{i}@example.com", password=password) for i in range(args.users)
+        ], batch_size=5000)
+        emails = [f"bench-{(i * 7919) % args.users}@example.com" for i in range(args.logins)]
+        client = APIClient()
+
+        for name, backend in backends.items():
+            indexed = "indexed" in name
+            with connection.schema_editor() as schema_editor:
+                (migration.add_unique_index if indexed else migration.remove_unique_index)(apps, schema_editor)
+            count = [0]
+
+            def counter(execute, *query_args):
+                count[0] += 1
+                return execute(*query_args)
+
+            with override_settings(AUTHENTICATION_BACKENDS=backend), connection.execute_wrapper(counter), timed(results, name):
+                for email in emails:
+                    assert client.post("/auth/login/", {"email": email, "password": "pass1234"}, format="json").status_code == 200
+            queries[name] = count[0] / args.logins
+
+    for name, seconds in results.items():
+        print(f"{name:>22}: {args.logins / seconds:8.0f} logins/s  {queries[name]:4.1f} queries/login  ({args.users} users)")
+
+
+if __name__ == "__main__":
+    main()
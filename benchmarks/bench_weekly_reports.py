@@ -0,0 +1,50 @@
+"""Weekly report work for many users: one calculate_kpi_summary per user versus
+calculate_kpi_summaries over chunks, as the fan-out tasks run it (single process).
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_weekly_reports --users 2000 --chunk 500
+"""
+import argparse
+
+from benchmarks.common import setup_django, test_database, seed_transactions, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=50, help="transactions per user")
+    parser.add_argument("--chunk", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from reports.services import calculate_kpi_summary, calculate_kpi_summaries
+    from reports.tasks import user_id_chunks
+
+    with test_database():
+        for i in range(args.users):
+            seed_transactions(User.objects.create_user(username=f"bench-weekly-{i}"), args.rows, days=30)
+
+        period = {"start_date": "2024-01-01", "end_date": "2024-01-08", "target_currency": "TRY"}
+        results, queries = {}, {}
+
+        def run(name, fn):
+            count = [0]
+
+            def counter(execute, *query_args):
+                count[0] += 1
+                return execute(*query_args)
+
+            with connection.execute_wrapper(counter), timed(results, name):
+                fn()
+            queries[name] = count[0]
+
+        run("per-user loop", lambda: [calculate_kpi_summary(user, **period) for user in User.objects.all()])
+        run(f"chunks of {args.chunk}", lambda: [calculate_kpi_summaries(ids, **period) for ids in user_id_chunks(args.chunk)])
+
+    for name, seconds in results.items():
+        print(f"{name:>16}: {seconds:7.2f} s  {queries[name]:6d} queries  {args.users / seconds:8.0f} users/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bank_kpi_backend.settings")
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    # benchmarks run against a throwaway copy of the configured database
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def timed(results: dict, name: str):
+    started = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - started
+
+
+def sample_csv(rows: int, offset: int = 0) -> bytes:
+    descriptions = ["Satış: Fatura #{}", "Kira Ödemesi", "CRM aylık lisans", "Personel maaş", "Market #{}"]
+    currencies = ["TRY", "USD", "EUR"]
+    lines = ["date,amount,currency,type,description"]
+    for i in range(offset, offset + rows):
+        amount = (i % 997) + 10
+        tx_type = "credit" if i % 3 == 0 else "debit"
+        if tx_type == "debit":
+            amount = -amount
+        day = 1 + i % 28
+        description = descriptions[i % len(descriptions)].format(i)
+        lines.append(f"2025-07-{day:02d},{amount}.00,{currencies[i % 3]},{tx_type},{description}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def seed_transactions(user, rows: int, days: int = 365, batch_size: int = 5000):
+    # bulk-inserts synthetic rows spread over `days` days for read-side benchmarks
+    from datetime import datetime, timedelta
+    from decimal import Decimal
+    from django.utils.timezone import make_aware
+    from transactions.models import Transaction, ImportBatch
+    from reports.rollups import refresh_daily_rollups
+
+    batch = ImportBatch.objects.create(user=user, idempotency_key=f"seed-{user.pk}", status=ImportBatch.COMPLETED)
+    categories = ["Sales", "Rent", "SaaS", "Payroll", "Utilities", "Office Supplies", None]
+    currencies = ["TRY", "USD", "EUR"]
+    start = make_aware(datetime(2024, 1, 1))
+    pending = []
+    for i in range(rows):
+        amount = Decimal((i * 7919) % 100000) / 100 + 1
+        if i % 3:
+            amount = -amount
+        pending.append(Transaction(
+            user=user, batch=batch, date=start + timedelta(days=i % days, seconds=i),
+            amount=amount, currency=currencies[i % 3],
+            transaction_type="credit" if amount > 0 else "debit",
+            description=f"seed {i}", category=categories[i % len(categories)], unique_hash=i.to_bytes(32, "big"),
+        ))
+        if len(pending) >= batch_size:
+            Transaction.objects.bulk_create(pending)
+            pending = []
+    Transaction.objects.bulk_create(pending)
+    refresh_daily_rollups(user.pk)
+
+
+def median_ms(fn, repeat: int = 7) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return sorted(samples)[len(samples) // 2]
@@ -0,0 +1,101 @@
+"""Deterministic synthetic bank statements in the upload CSV format (date,amount,currency,type,description).
+
+    python -m benchmarks.statements --rows 1000000 --duplicates 0.05 --seed 7 -o statement.csv
+
+The same seed, size and end date always give the same file. Rows are spread over --days
+days ending at --end-date, mostly TRY with USD/EUR account movements. Every original row
+carries a bank reference number, so the rows dedup skips are exactly the re-sent copies
+of earlier rows (overlapping statement exports), about --duplicates of the file.
+"""
+import argparse
+import csv
+import random
+import sys
+from collections import deque
+from datetime import date, timedelta
+
+# (weight, description template, currency weights, credit?, typical amount)
+MOVEMENTS = [
+    (20, "POS {merchant} {city}", {"TRY": 1}, False, 450),
+    (8, "İNTERNET ALIŞVERİŞİ {shop}", {"TRY": 8, "USD": 1, "EUR": 1}, False, 900),
+    (10, "EFT GELEN {company} Fatura #{invoice}", {"TRY": 1}, True, 18000),
+    (6, "HAVALE GELEN {person}", {"TRY": 1}, True, 5000),
+    (6, "SWIFT GELEN {foreign} Invoice {invoice}", {"USD": 3, "EUR": 2}, True, 4000),
+    (5, "Fatura Ödemesi {utility}", {"TRY": 1}, False, 1200),
+    (4, "Kira Ödemesi {month}", {"TRY": 1}, False, 35000),
+    (4, "Maaş Ödemesi {person}", {"TRY": 1}, False, 42000),
+    (3, "Kredi Kartı Ödemesi", {"TRY": 1}, False, 15000),
+    (3, "Otomatik Ödeme {subscription}", {"TRY": 2, "USD": 3}, False, 600),
+    (2, "Vergi Ödemesi {tax}", {"TRY": 1}, False, 9000),
+    (2, "Döviz Alış {fx}", {"USD": 1, "EUR": 1}, True, 2500),
+    (1, "Kargo {carrier} Gönderi #{invoice}", {"TRY": 1}, False, 150),
+]
+WORDS = {
+    "merchant": ["MİGROS TİCARET A.Ş.", "A101 YENİ MAĞAZACILIK", "BİM BİRLEŞİK MAĞAZALAR", "ŞOK MARKETLER", "CARREFOURSA", "SHELL PETROL", "OPET", "STARBUCKS"],
+    "city": ["İSTANBUL", "ANKARA", "İZMİR", "BURSA", "ANTALYA", "KOCAELİ"],
+    "shop": ["TRENDYOL", "HEPSİBURADA", "AMAZON.COM.TR", "N11", "YEMEKSEPETİ", "GETİR"],
+    "company": ["Aydın Yazılım Ltd.", "Demir Lojistik A.Ş.", "Kaya Danışmanlık", "Yıldız Gıda San.", "Öztürk İnşaat"],
+    "person": ["Ayşe Yılmaz", "Mehmet Kaya", "Zeynep Demir", "Mustafa Çelik", "Elif Şahin", "Ahmet Öztürk"],
+    "foreign": ["ACME Corp", "Globex GmbH", "Initech Ltd", "Umbrella BV"],
+    "utility": ["TÜRK TELEKOM", "İGDAŞ", "BEDAŞ", "İSKİ", "TURKCELL"],
+    "subscription": ["GOOGLE WORKSPACE", "AWS", "SLACK", "MICROSOFT 365", "CRM aylık lisans"],
+    "tax": ["KDV", "Muhtasar", "SGK Primi", "Geçici Vergi"],
+    "fx": ["USD", "EUR"],
+    "carrier": ["Yurtiçi", "Aras", "MNG"],
+    "month": ["Ocak", "Şubat", "Mart", "Nisan", "Mayıs", "Haziran", "Temmuz", "Ağustos", "Eylül", "Ekim", "Kasım", "Aralık"],
+}
+HEADER = ("date", "amount", "currency", "type", "description")
+
+
+def statement_rows(rows: int, seed: int = 0, duplicates: float = 0.0, end_date: date | None = None, days: int = 365):
+    """Yields `rows` CSV rows as tuples; originals in date order, `duplicates` of them re-sent copies."""
+    rng = random.Random(seed)
+    end_date = end_date or date.today() - timedelta(days=1)
+    start = end_date - timedelta(days=days - 1)
+    weights = [movement[0] for movement in MOVEMENTS]
+    recent = deque(maxlen=500)
+    reference = 100000000 + seed * 1000003
+    for i in range(rows):
+        if recent and rng.random() < duplicates:
+            yield rng.choice(recent)
+            continue
+        _, template, currencies, credit, typical = rng.choices(MOVEMENTS, weights)[0]
+        currency = rng.choices(list(currencies), list(currencies.values()))[0]
+        amount = min(round(rng.lognormvariate(0, 0.8) * typical, 2), 10 ** 8)
+        if currency != "TRY":
+            amount = round(amount / 40, 2) or 0.01
+        fields = {name: rng.choice(values) for name, values in WORDS.items()}
+        reference += 1
+        description = template.format(invoice=rng.randint(1000, 99999), **fields) + f" Ref:{reference}"
+        day = start + timedelta(days=i * days // rows)
+        row = (day.isoformat(), f"{amount if credit else -amount:.2f}", currency, "credit" if credit else "debit", description)
+        recent.append(row)
+        yield row
+
+
+def write_statement(out, rows: int, **options):
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(HEADER)
+    writer.writerows(statement_rows(rows, **options))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicates", type=float, default=0.0, help="share of rows that repeat an earlier row (0-1)")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="last statement day (default: yesterday)")
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    options = {"seed": args.seed, "duplicates": args.duplicates, "end_date": args.end_date, "days": args.days}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            write_statement(out, args.rows, **options)
+    else:
+        write_statement(sys.stdout, args.rows, **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""End-to-end benchmark suite: upload, list pagination, KPI summary and the weekly batch
+over a generated statement (see benchmarks.statements), written as JSON.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.suite --rows 100000 --duplicates 0.05 -o run.json
+    DATABASE_URL=postgres://... python -m benchmarks.suite --rows 1000000 -o run.json --baseline baseline.json
+    python -m benchmarks.suite --compare run.json --baseline baseline.json
+
+Every scenario reports "seconds" (medians for the read scenarios). With --baseline, a
+scenario slower than the baseline by more than --tolerance is flagged as a regression and
+the exit status is 1. Compare runs of the same size, seed and database only.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+
+from benchmarks.common import setup_django, test_database, timed, median_ms
+from benchmarks.statements import write_statement
+
+
+def import_statement(user, rows, key, **options):
+    from transactions.services import import_transactions
+
+    with tempfile.NamedTemporaryFile("w+", suffix=".csv", encoding="utf-8", newline="") as statement:
+        write_statement(statement, rows, **options)
+        statement.flush()
+        with open(statement.name, "rb") as upload:
+            return import_transactions(user, upload, key)
+
+
+def run_upload(user, args, options):
+    results = {}
+    with timed(results, "first"):
+        batch = import_statement(user, args.rows, "suite-upload", **options)
+    # the same statement again: every row goes through dedup and is skipped
+    with timed(results, "again"):
+        again = import_statement(user, args.rows, "suite-reupload", **options)
+    return {
+        "upload": {
+            "seconds": results["first"], "rows_per_second": args.rows / results["first"],
+            "inserted": batch["inserted"], "skipped": batch["skipped"],
+        },
+        "upload_duplicates": {
+            "seconds": results["again"], "rows_per_second": args.rows / results["again"], "skipped": again["skipped"],
+        },
+    }
+
+
+def run_list(user, args, end_date):
+    from rest_framework.test import APIClient
+    from transactions.pagination import KeysetPagination
+    from transactions.services import get_filtered_transactions
+
+    client = APIClient()
+    client.force_authenticate(user)
+    total = get_filtered_transactions(user).count()
+    deep_row = get_filtered_transactions(user).values("date", "id")[max(total // 2 - 1, 0)]
+    deep_cursor = KeysetPagination().encode_cursor(deep_row)
+    month = {"start_date": (end_date - timedelta(days=30)).isoformat(), "end_date": end_date.isoformat()}
+
+    def ok(response):
+        assert response.status_code == 200, response.status_code
+
+    scenarios = {
+        "list_page_1": lambda: ok(client.get("/transactions/", {"page": 1})),
+        "list_last_30_days": lambda: ok(client.get("/transactions/", month)),
+        "list_cursor_middle": lambda: ok(client.get("/transactions/", {"cursor": deep_cursor})),
+    }
+    return {name: {"seconds": median_ms(fn, args.repeat) / 1000} for name, fn in scenarios.items()}
+
+
+def run_summary(user, args, end_date):
+    from reports.services import calculate_kpi_summary
+
+    periods = {
+        "summary_all_time": {},
+        "summary_last_30_days": {"start_date": (end_date - timedelta(days=30)).isoformat(), "end_date": end_date.isoformat()},
+    }
+    return {
+        name: {"seconds": median_ms(lambda: calculate_kpi_summary(user, target_currency="USD", **period), args.repeat) / 1000}
+        for name, period in periods.items()
+    }
+
+
+def run_weekly(args, options):
+    from django.contrib.auth.models import User
+    from bank_kpi_backend.celery import app
+    from reports.tasks import generate_weekly_reports
+
+    for i in range(args.users):
+        user = User.objects.create_user(username=f"suite-weekly-{i}")
+        import_statement(user, args.user_rows, f"suite-weekly-{i}", **{**options, "seed": options["seed"] + i + 1, "days": 28})
+    results = {}
+    app.conf.task_always_eager = True
+    try:
+        with timed(results, "weekly"):
+            generate_weekly_reports.delay()
+    finally:
+        app.conf.task_always_eager = False
+    users = args.users + 1
+    return {"weekly_batch": {"seconds": results["weekly"], "users": users, "users_per_second": users / results["weekly"]}}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    setup_django()
+    import django
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    end_date = args.end_date or date.today() - timedelta(days=1)
+    options = {"seed": args.seed, "duplicates": args.duplicates, "end_date": end_date, "days": args.days}
+    scenarios = {}
+    with test_database():
+        user = User.objects.create_user(username="suite")
+        scenarios.update(run_upload(user, args, options))
+        scenarios.update(run_list(user, args, end_date))
+        scenarios.update(run_summary(user, args, end_date))
+        scenarios.update(run_weekly(args, options))
+        vendor = connection.vendor
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "database": vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "rows": args.rows, "seed": args.seed, "duplicates": args.duplicates, "days": args.days,
+            "users": args.users, "user_rows": args.user_rows, "repeat": args.repeat,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def compare(run, baseline, tolerance):
+    """Prints each scenario against the baseline and returns the names that regressed."""
+    keys = ("rows", "seed", "duplicates", "days", "users", "user_rows", "database")
+    differing = [key for key in keys if run["meta"].get(key) != baseline["meta"].get(key)]
+    if differing:
+        print(f"warning: baseline differs in {', '.join(differing)}; timings are not comparable")
+
+    regressions = []
+    for name, result in run["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            print(f"{name:>22}: {result['seconds'] * 1000:10.1f} ms  (not in baseline)")
+            continue
+        change = result["seconds"] / base["seconds"] - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:>22}: {result['seconds'] * 1000:10.1f} ms  baseline {base['seconds'] * 1000:10.1f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000, help="rows in the uploaded statement")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="share of re-sent rows in the statement")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="last statement day (default: yesterday)")
+    parser.add_argument("--users", type=int, default=200, help="extra users for the weekly batch")
+    parser.add_argument("--user-rows", type=int, default=50, help="rows per extra user")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per read scenario (median is kept)")
+    parser.add_argument("-o", "--output", help="write the results as JSON here")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a scenario is flagged")
+    parser.add_argument("--compare", metavar="RESULTS", help="compare these JSON results with --baseline instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        if not args.baseline:
+            parser.error("--compare needs --baseline")
+        with open(args.compare) as results:
+            run = json.load(results)
+    else:
+        run = run_suite(args)
+        if args.output:
+            with open(args.output, "w") as out:
+                json.dump(run, out, indent=2)
+            print(f"results written to {os.path.abspath(args.output)}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(run, json.load(baseline), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        for name, result in run["scenarios"].items():
+            print(f"{name:>22}: {result['seconds'] * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# data sizes every query budget is checked at; the counts must not change between them
+QUERY_BUDGET_SIZES = (10, 100)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # version stamps live in the cache; test databases reuse user ids, so start every test clean
+    from bank_kpi_backend.authentication import clear_local_users
+    from bank_kpi_backend.metrics import registry
+    cache.clear()
+    clear_local_users()
+    registry.clear()
+    yield
+
+
+@pytest.fixture
+def query_budget(db):
+    """query_budget(max_queries, setup, call, sizes=QUERY_BUDGET_SIZES)
+
+    For each size, setup(size) brings the data to that many rows (or users) and returns the
+    argument for call, which hits the endpoint (or runs the task) and returns its result. Only call is
+    counted, with cold caches. Fails if the count changes with the size (O(rows) queries)
+    or exceeds max_queries; returns the count.
+    """
+    def check(max_queries, setup, call, sizes=QUERY_BUDGET_SIZES):
+        from bank_kpi_backend.authentication import clear_local_users
+        counts = {}
+        for size in sizes:
+            argument = setup(size)
+            cache.clear()
+            clear_local_users()
+            with CaptureQueriesContext(connection) as queries:
+                response = call(argument)
+            if hasattr(response, "status_code"):
+                assert response.status_code < 400, response.content
+            counts[size] = [query["sql"] for query in queries]
+
+        numbers = {size: len(sql) for size, sql in counts.items()}
+        largest = counts[sizes[-1]]
+        assert len(set(numbers.values())) == 1, f"query count grows with rows {numbers}:\n" + "\n".join(largest)
+        assert len(largest) <= max_queries, f"{len(largest)} queries over a budget of {max_queries}:\n" + "\n".join(largest)
+        return len(largest)
+    return check
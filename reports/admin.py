@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import ReportSnapshot
 
 # Register your models here.
+@admin.register(ReportSnapshot)
+class ReportSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("user", "period_start", "period_end", "currency", "computed_at")
+    list_filter = ("currency",)
+    list_select_related = ("user",)
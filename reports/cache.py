@@ -0,0 +1,37 @@
+import hashlib
+import threading
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from reports.services import calculate_kpi_summary
+from reports.versions import get_data_version
+from transactions.services import get_rates_version
+from utils import normalize_date
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+def summary_cache_key(user_id, start_date=None, end_date=None, target_currency="TRY"):
+    # entries of an older data or rates version are never read again and just expire
+    start = normalize_date(start_date).isoformat() if start_date else ""
+    end = normalize_date(end_date, is_end=True).isoformat() if end_date else ""
+    return f"kpi-summary:{user_id}:{get_data_version(user_id)}:{get_rates_version()}:{start}:{end}:{target_currency}"
+
+def summary_etag(key: str) -> str:
+    return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+def get_cached_kpi_summary(user, start_date=None, end_date=None, target_currency="TRY", key=None):
+    key = key or summary_cache_key(user.id, start_date, end_date, target_currency)
+    summary = cache.get(key)
+    hit = summary is not None
+    with _stats_lock:
+        _stats["hits" if hit else "misses"] += 1
+
+    if not hit:
+        summary = calculate_kpi_summary(user, start_date, end_date, target_currency)
+        cache.set(key, summary, settings.KPI_SUMMARY_CACHE_TIMEOUT)
+    return summary, hit
+
+def summary_cache_stats() -> dict:
+    with _stats_lock:
+        return {"hits": _stats["hits"], "misses": _stats["misses"]}
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from transactions.models import Transaction
+from reports.models import DailyRollup
+from reports.rollups import refresh_daily_rollups
+
+class Command(BaseCommand):
+    help = "Recompute DailyRollup rows from raw transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only this user id (repeatable)")
+
+    def handle(self, *args, user_ids=None, **options):
+        if not user_ids:
+            user_ids = set(Transaction.objects.values_list("user_id", flat=True).distinct())
+            user_ids |= set(DailyRollup.objects.values_list("user_id", flat=True).distinct())
+        for user_id in sorted(user_ids):
+            refresh_daily_rollups(user_id)
+            self.stdout.write(f"{user_id}: {DailyRollup.objects.filter(user_id=user_id).count()} rollups")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {len(user_ids)} users"))
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.23 on 2026-10-18 07:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from decimal import Decimal
+from django.db.models import Sum, Min, Count, Case, When, F, Q, Value
+from django.db.models.functions import TruncDate
+
+
+def build_rollups(apps, schema_editor, user_ids=None):
+    # existing history is rolled up once here; later imports keep the table current
+    Transaction = apps.get_model('transactions', 'Transaction')
+    DailyRollup = apps.get_model('reports', 'DailyRollup')
+    total = models.DecimalField(max_digits=20, decimal_places=2)
+    transactions = Transaction.objects.all() if user_ids is None else Transaction.objects.filter(user_id__in=user_ids)
+    groups = (
+        transactions.annotate(day=TruncDate('date'))
+        .values('user_id', 'day', 'currency', 'category')
+        .annotate(
+            income=Sum(Case(When(amount__gt=0, then=F('amount')), default=Value(Decimal(0)), output_field=total)),
+            expense=Sum(Case(When(amount__lte=0, then=F('amount')), default=Value(Decimal(0)), output_field=total)),
+            income_count=Count('id', filter=Q(amount__gt=0)),
+            expense_count=Count('id', filter=Q(amount__lte=0)),
+            first_income_id=Min(Case(When(amount__gt=0, then=F('id')))),
+            first_expense_id=Min(Case(When(amount__lte=0, then=F('id')))),
+        )
+        .order_by()
+    )
+
+    pending = []
+    for group in groups.iterator():
+        common = {key: group[key] for key in ('user_id', 'day', 'currency', 'category')}
+        for direction in ('income', 'expense'):
+            if group[f'{direction}_count']:
+                pending.append(DailyRollup(
+                    direction=direction, total=group[direction], count=group[f'{direction}_count'],
+                    first_transaction_id=group[f'first_{direction}_id'], **common,
+                ))
+        if len(pending) >= 1000:
+            DailyRollup.objects.bulk_create(pending)
+            pending = []
+    DailyRollup.objects.bulk_create(pending)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0005_categoryrule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('currency', models.CharField(max_length=3)),
+                ('category', models.CharField(blank=True, max_length=100, null=True)),
+                ('direction', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=7)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('count', models.PositiveIntegerField()),
+                ('first_transaction_id', models.BigIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'day'], name='reports_dai_user_id_ae2c1c_idx')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:03
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('currency', models.CharField(max_length=3)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('data_version', models.BigIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-period_start', 'currency'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reportsnapshot',
+            constraint=models.UniqueConstraint(fields=('user', 'period_start', 'period_end', 'currency'), name='report_snapshot_period_unique'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:46
+
+from importlib import import_module
+from django.db import migrations, models
+from django.db.models import Count, Value
+import django.db.models.functions.comparison
+
+
+def rebuild_duplicated_rollups(apps, schema_editor):
+    # rows doubled by concurrent refreshes would block the constraint; their totals are wrong
+    # anyway, so the users affected get their rollups rebuilt from the raw transactions
+    DailyRollup = apps.get_model('reports', 'DailyRollup')
+    duplicated = set(
+        DailyRollup.objects.values('user_id', 'day', 'currency', 'direction')
+        .annotate(group=django.db.models.functions.comparison.Coalesce('category', Value('')), rows=Count('id'))
+        .filter(rows__gt=1)
+        .values_list('user_id', flat=True)
+    )
+    if duplicated:
+        DailyRollup.objects.filter(user_id__in=duplicated).delete()
+        import_module('reports.migrations.0001_initial').build_rollups(apps, schema_editor, user_ids=duplicated)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_reportsnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_duplicated_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(models.F('user'), models.F('day'), models.F('currency'), django.db.models.functions.comparison.Coalesce('category', models.Value('')), models.F('direction'), name='reports_dailyrollup_group_unique'),
+        ),
+    ]
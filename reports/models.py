@@ -1,3 +1,61 @@
 from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 # Create your models here.
+class DailyRollup(models.Model):
+    INCOME = 'income'
+    EXPENSE = 'expense'
+    DIRECTION_CHOICES = [
+        (INCOME, 'Income'),
+        (EXPENSE, 'Expense'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    day = models.DateField()
+    currency = models.CharField(max_length=3)
+    category = models.CharField(max_length=100, blank=True, null=True)
+    direction = models.CharField(max_length=7, choices=DIRECTION_CHOICES)
+    total = models.DecimalField(max_digits=20, decimal_places=2)
+    count = models.PositiveIntegerField()
+    # lowest transaction id in the group, keeps the category ranking order of the raw rows
+    first_transaction_id = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+        constraints = [
+            # one row per group; category is coalesced so uncategorized rows are covered too
+            models.UniqueConstraint(
+                'user', 'day', 'currency', Coalesce('category', Value('')), 'direction',
+                name='reports_dailyrollup_group_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.day} - {self.direction} {self.total} {self.currency}"
+
+
+class ReportSnapshot(models.Model):
+    # one stored KPI summary per user, period and currency, written by the scheduled reports
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='report_snapshots')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    currency = models.CharField(max_length=3)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField(default=timezone.now)
+    # reports.versions stamp the payload was computed from; an unchanged stamp means it is still current
+    data_version = models.BigIntegerField()
+
+    class Meta:
+        ordering = ['-period_start', 'currency']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period_start', 'period_end', 'currency'], name='report_snapshot_period_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.period_start}..{self.period_end} {self.currency}"
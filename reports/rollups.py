@@ -0,0 +1,71 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import transaction as db_transaction
+from django.db.models import Sum, Min, Count, Case, When, F, Q, Value, DecimalField
+from django.db.models.functions import TruncDate
+from django.utils.timezone import make_aware
+from transactions.models import Transaction
+from reports.models import DailyRollup
+from reports.versions import bump_data_version
+
+AMOUNT_TOTAL = DecimalField(max_digits=20, decimal_places=2)
+INCOME = Q(amount__gt=0)
+EXPENSE = Q(amount__lte=0)
+
+def signed_totals(queryset, *fields):
+    # income/expense sums, counts and first expense id for each group of `fields`
+    return queryset.values(*fields).annotate(
+        income=Sum(Case(When(INCOME, then=F("amount")), default=Value(Decimal(0)), output_field=AMOUNT_TOTAL)),
+        expense=Sum(Case(When(EXPENSE, then=F("amount")), default=Value(Decimal(0)), output_field=AMOUNT_TOTAL)),
+        income_count=Count("id", filter=INCOME),
+        expense_count=Count("id", filter=EXPENSE),
+        first_income_id=Min(Case(When(INCOME, then=F("id")))),
+        first_expense_id=Min(Case(When(EXPENSE, then=F("id")))),
+    )
+
+def day_bounds(first_day, last_day):
+    return make_aware(datetime.combine(first_day, time.min)), make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+
+def refresh_daily_rollups(user_id, days=None):
+    # whole days are recomputed from the raw rows, so a refresh is idempotent and two imports
+    # touching the same day cannot double count; days=None rebuilds every day of the user
+    if days is not None:
+        days = sorted(set(days))
+        if not days:
+            return
+
+    with db_transaction.atomic():
+        # refreshes of one user run one at a time: two concurrent delete-then-insert passes
+        # over the same days would otherwise both insert (the unique constraint rejects that)
+        list(get_user_model().objects.select_for_update().filter(pk=user_id).values_list("pk"))
+        rollups = DailyRollup.objects.filter(user_id=user_id)
+        transactions = Transaction.objects.filter(user_id=user_id).annotate(day=TruncDate("date"))
+        if days is not None:
+            start, end = day_bounds(days[0], days[-1])
+            rollups = rollups.filter(day__in=days)
+            transactions = transactions.filter(date__gte=start, date__lt=end, day__in=days)
+
+        new_rollups = []
+        for group in signed_totals(transactions, "day", "currency", "category"):
+            common = {"user_id": user_id, "day": group["day"], "currency": group["currency"], "category": group["category"]}
+            if group["income_count"]:
+                new_rollups.append(DailyRollup(
+                    direction=DailyRollup.INCOME, total=group["income"], count=group["income_count"],
+                    first_transaction_id=group["first_income_id"], **common,
+                ))
+            if group["expense_count"]:
+                new_rollups.append(DailyRollup(
+                    direction=DailyRollup.EXPENSE, total=group["expense"], count=group["expense_count"],
+                    first_transaction_id=group["first_expense_id"], **common,
+                ))
+
+        rollups.delete()
+        DailyRollup.objects.bulk_create(new_rollups, batch_size=1000)
+        # cached summaries of this user go stale once the new data is visible to other connections
+        db_transaction.on_commit(lambda: bump_data_version(user_id))
+
+def refresh_batch_rollups(batch):
+    days = Transaction.objects.filter(batch=batch).dates("date", "day")
+    refresh_daily_rollups(batch.user_id, list(days))
+    db_transaction.on_commit(lambda: bump_data_version(batch.user_id))
@@ -0,0 +1,10 @@
+from rest_framework import serializers
+from reports.models import ReportSnapshot
+
+class ReportSnapshotSerializer(serializers.ModelSerializer):
+    summary = serializers.JSONField(source="payload")
+
+    class Meta:
+        model = ReportSnapshot
+        fields = ("period_start", "period_end", "currency", "summary", "computed_at")
+        read_only_fields = fields
@@ -1,45 +1,126 @@
-from django.db.models import Sum
+from datetime import date, time, timedelta
+from django.db.models import Sum, Min, Q, F, Case, When, Value, DateField
+from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
+from django.utils.timezone import localtime
 from transactions.models import Transaction
-from datetime import datetime, time
-from django.utils.timezone import make_aware, is_aware
-from django.db.models import Sum
-from transactions.services import convert_amount
+from transactions.services import convert_amounts, get_rate_table
+from reports.models import DailyRollup
+from reports.rollups import signed_totals, day_bounds
 from utils import round_decimal, normalize_date
+from bank_kpi_backend import metrics
 
-def calculate_kpi_summary(user, start_date=None, end_date=None, target_currency="TRY"):
-    queryset = Transaction.objects.filter(user=user)
-    
-    if not queryset.exists():
-        return {
-            "total_income": 0,
-            "total_expense": 0,
-            "net_cash_flow": 0,
-            "top_expense_categories": [],
-            "currency": target_currency,
-        }
+def empty_summary(target_currency):
+    return {
+        "total_income": 0,
+        "total_expense": 0,
+        "net_cash_flow": 0,
+        "top_expense_categories": [],
+        "currency": target_currency,
+    }
 
-    # timezone-aware date filtering
-    if start_date:
-        start_date = normalize_date(start_date)
-        queryset = queryset.filter(date__gte=start_date)
+def split_range(start_date, end_date):
+    """Splits [start_date, end_date] into whole days and the partial edge days around them.
 
+    Returns ((first_day, last_day), edges): whole days come from DailyRollup (None when there
+    are none), and a bound that falls mid-day leaves an edge read from the raw rows. Each edge
+    is (start, end, include_end): the start is always inclusive, the end is inclusive when it
+    is the caller's end_date and exclusive when it is a day boundary.
+    """
+    first_day = last_day = None
+    if start_date:
+        start_date = localtime(start_date)
+        first_day = start_date.date() if start_date.time() == time.min else start_date.date() + timedelta(days=1)
     if end_date:
-        end_date = normalize_date(end_date, is_end=True)
-        queryset = queryset.filter(date__lte=end_date)
+        end_date = localtime(end_date)
+        last_day = end_date.date() if end_date.time() == time.max else end_date.date() - timedelta(days=1)
+
+    if first_day and last_day and first_day > last_day:
+        return None, [(start_date, end_date, True)]
+
+    edges = []
+    if start_date and start_date.time() != time.min:
+        edges.append((start_date, day_bounds(first_day, first_day)[0], False))
+    if end_date and end_date.time() != time.max:
+        edges.append((day_bounds(last_day, last_day)[1], end_date, True))
+    return (first_day, last_day), edges
+
+def edge_filter(edges):
+    # rows of the partial edge days returned by split_range
+    rows = Q()
+    for edge_start, edge_end, include_end in edges:
+        rows |= Q(date__gte=edge_start, date__lte=edge_end) if include_end else Q(date__gte=edge_start, date__lt=edge_end)
+    return rows
+
+def rate_day(day, target_currency):
+    # only totals converted with dated rates have to stay split by day; rows already in the
+    # target currency, or between currencies on fixed rates, collapse into one group
+    table = get_rate_table()
+    fixed = [target_currency]
+    if not table.is_dated(target_currency):
+        fixed += [currency for currency in table.currencies() if not table.is_dated(currency)]
+        if not table.dated_currencies():
+            return Value(None, output_field=DateField())
+    return Case(When(currency__in=fixed, then=Value(None)), default=day, output_field=DateField())
+
+def expense_groups(user, start_date=None, end_date=None, target_currency="TRY"):
+    # category -> income, expense (in target_currency) and first expense id, merged from rollups and edge rows
+    return grouped_expenses([user.pk], start_date, end_date, target_currency).get(user.pk, {})
+
+def grouped_expenses(user_ids, start_date=None, end_date=None, target_currency="TRY"):
+    # user id -> expense_groups(); one rollup query (plus one for partial edge days) covers every user.
+    # foreign currency totals stay split by day so each day is converted at its own rate
+    full_days, edges = split_range(start_date, end_date)
+    rows = []
+
+    if full_days:
+        first_day, last_day = full_days
+        rollups = DailyRollup.objects.filter(user_id__in=user_ids)
+        if first_day:
+            rollups = rollups.filter(day__gte=first_day)
+        if last_day:
+            rollups = rollups.filter(day__lte=last_day)
+        totals = rollups.values("user_id", "currency", "category", "direction", rate_day=rate_day(F("day"), target_currency))
+        for row in totals.annotate(total=Sum("total"), first_id=Min("first_transaction_id")).order_by():
+            if row["direction"] == DailyRollup.INCOME:
+                rows.append((row["user_id"], row["category"], row["currency"], row["rate_day"], row["total"], 0, None))
+            else:
+                rows.append((row["user_id"], row["category"], row["currency"], row["rate_day"], 0, row["total"], row["first_id"]))
+
+    if edges:
+        raw = Transaction.objects.filter(edge_filter(edges), user_id__in=user_ids).annotate(rate_day=rate_day(TruncDate("date"), target_currency))
+        for row in signed_totals(raw, "user_id", "currency", "category", "rate_day").order_by():
+            rows.append((row["user_id"], row["category"], row["currency"], row["rate_day"], row["income"], row["expense"], row["first_expense_id"]))
 
+    # every (currency, day) rate is resolved once for the whole batch
+    converted = iter(convert_amounts(
+        ((amount, currency, day) for _, _, currency, day, income, expense, _ in rows for amount in (income, expense)),
+        target_currency,
+    ))
+
+    by_user = {}
+    for user_id, category, _, _, _, _, first_expense_id in rows:
+        group = by_user.setdefault(user_id, {}).setdefault(category, {"income": 0, "expense": 0, "first_expense_id": None})
+        group["income"] += next(converted)
+        group["expense"] += next(converted)
+        if first_expense_id is not None and (group["first_expense_id"] is None or first_expense_id < group["first_expense_id"]):
+            group["first_expense_id"] = first_expense_id
+
+    return by_user
+
+def summarize_groups(groups, target_currency):
     # total income, expense and net cash flow calculations 
     total_income = 0
     total_expense = 0
     category_totals = {}
 
-    for tx in queryset:
-        amount_converted = convert_amount(tx.amount, tx.currency, target_currency)
-        if tx.amount > 0:
-            total_income += amount_converted
-        else:
-            total_expense += abs(amount_converted)
-            if tx.category:
-                category_totals[tx.category] = category_totals.get(tx.category, 0) + abs(amount_converted)
+    # categories are ranked in the order their first expense was stored, as the row loop did
+    ordered = sorted(groups.items(), key=lambda item: (item[1]["first_expense_id"] is None, item[1]["first_expense_id"] or 0))
+    for category, group in ordered:
+        total_income += group["income"]
+        expense = abs(group["expense"])
+        total_expense += expense
+        if category and group["first_expense_id"] is not None:
+            category_totals[category] = expense
 
     net_cash_flow = total_income - total_expense
 
@@ -59,4 +140,150 @@ def calculate_kpi_summary(user, start_date=None, end_date=None, target_currency=
         "net_cash_flow": round_decimal(net_cash_flow),
         "top_expense_categories": top_expense_categories,
         "currency": target_currency,
-    }
\ No newline at end of file
+    }
+
+@metrics.timed("kpi_summary_duration_seconds")
+def calculate_kpi_summary(user, start_date=None, end_date=None, target_currency="TRY"):
+    # timezone-aware date filtering
+    if start_date:
+        start_date = normalize_date(start_date)
+
+    if end_date:
+        end_date = normalize_date(end_date, is_end=True)
+
+    # rollups answer whole days, so the cost follows the number of days rather than rows;
+    # currency conversion runs on per-day totals, not on every row
+    groups = expense_groups(user, start_date, end_date, target_currency)
+
+    if not groups and not Transaction.objects.filter(user=user).exists():
+        return empty_summary(target_currency)
+
+    return summarize_groups(groups, target_currency)
+
+def calculate_kpi_summaries(user_ids, start_date=None, end_date=None, target_currency="TRY"):
+    """calculate_kpi_summary for many users at once: {user_id: summary}.
+
+    The grouped queries run once for the whole list instead of once per user.
+    """
+    if start_date:
+        start_date = normalize_date(start_date)
+
+    if end_date:
+        end_date = normalize_date(end_date, is_end=True)
+
+    by_user = grouped_expenses(user_ids, start_date, end_date, target_currency)
+
+    # users without rows in the period still get zero totals when they have history, as above
+    missing = [user_id for user_id in user_ids if user_id not in by_user]
+    with_history = set(
+        Transaction.objects.filter(user_id__in=missing).values_list("user_id", flat=True).distinct().order_by()
+    ) if missing else set()
+
+    return {
+        user_id: summarize_groups(by_user.get(user_id, {}), target_currency)
+        if user_id in by_user or user_id in with_history else empty_summary(target_currency)
+        for user_id in user_ids
+    }
+
+INTERVALS = ("day", "week", "month")
+
+def bucket_start(day, interval):
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+def next_bucket(bucket, interval):
+    if interval == "week":
+        return bucket + timedelta(days=7)
+    if interval == "month":
+        return date(bucket.year + bucket.month // 12, bucket.month % 12 + 1, 1)
+    return bucket + timedelta(days=1)
+
+def bucket_expression(field, interval):
+    if interval == "week":
+        return TruncWeek(field, output_field=DateField())
+    if interval == "month":
+        return TruncMonth(field, output_field=DateField())
+    return TruncDate(field)
+
+def calculate_kpi_timeseries(user, start_date=None, end_date=None, interval="day", target_currency="TRY"):
+    """Income, expense, net and per-category expense for each day, ISO week or month of the range.
+
+    Whole days are bucketed straight from DailyRollup; only partial edge days touch the raw rows.
+    Buckets without transactions inside the range are returned as zeros so charts stay continuous.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+
+    if start_date:
+        start_date = normalize_date(start_date)
+
+    if end_date:
+        end_date = normalize_date(end_date, is_end=True)
+
+    full_days, edges = split_range(start_date, end_date)
+    rows = []
+
+    if full_days:
+        first_day, last_day = full_days
+        rollups = DailyRollup.objects.filter(user=user)
+        if first_day:
+            rollups = rollups.filter(day__gte=first_day)
+        if last_day:
+            rollups = rollups.filter(day__lte=last_day)
+        totals = rollups.values(
+            "currency", "category", "direction",
+            bucket=bucket_expression("day", interval) if interval != "day" else F("day"),
+            rate_day=rate_day(F("day"), target_currency),
+        )
+        for row in totals.annotate(total=Sum("total")).order_by():
+            if row["direction"] == DailyRollup.INCOME:
+                rows.append((row["bucket"], row["category"], row["currency"], row["rate_day"], row["total"], 0))
+            else:
+                rows.append((row["bucket"], row["category"], row["currency"], row["rate_day"], 0, row["total"]))
+
+    if edges:
+        raw = Transaction.objects.filter(edge_filter(edges), user=user).annotate(
+            bucket=bucket_expression("date", interval), rate_day=rate_day(TruncDate("date"), target_currency),
+        )
+        for row in signed_totals(raw, "bucket", "currency", "category", "rate_day").order_by():
+            rows.append((row["bucket"], row["category"], row["currency"], row["rate_day"], row["income"], row["expense"]))
+
+    converted = iter(convert_amounts(
+        ((amount, currency, day) for _, _, currency, day, income, expense in rows for amount in (income, expense)),
+        target_currency,
+    ))
+
+    buckets = {}
+    for bucket, category, _, _, _, _ in rows:
+        totals = buckets.setdefault(bucket, {"income": 0, "expense": 0, "categories": {}})
+        income, expense = next(converted), abs(next(converted))
+        totals["income"] += income
+        totals["expense"] += expense
+        if category and expense:
+            totals["categories"][category] = totals["categories"].get(category, 0) + expense
+
+    if not buckets:
+        return {"interval": interval, "currency": target_currency, "buckets": []}
+
+    first = bucket_start(localtime(start_date).date(), interval) if start_date else min(buckets)
+    last = bucket_start(localtime(end_date).date(), interval) if end_date else max(buckets)
+    series = []
+    bucket = first
+    while bucket <= last:
+        totals = buckets.get(bucket, {"income": 0, "expense": 0, "categories": {}})
+        series.append({
+            "period": bucket,
+            "total_income": round_decimal(totals["income"]),
+            "total_expense": round_decimal(totals["expense"]),
+            "net_cash_flow": round_decimal(totals["income"] - totals["expense"]),
+            "categories": {
+                category: round_decimal(total)
+                for category, total in sorted(totals["categories"].items(), key=lambda item: item[1], reverse=True)
+            },
+        })
+        bucket = next_bucket(bucket, interval)
+
+    return {"interval": interval, "currency": target_currency, "buckets": series}
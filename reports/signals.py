@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils.timezone import localdate
+from transactions.models import Transaction, ImportBatch
+from reports.rollups import refresh_daily_rollups
+
+# bulk imports refresh their days explicitly; these cover single saves (admin, shell, fixtures)
+# and whole batch deletes. single deletes are refreshed by Transaction.delete(); there is
+# deliberately no Transaction delete receiver, it would stop Django from fast-deleting
+# cascades. rebuild_daily_rollups fixes up any other direct edits (queryset update/delete)
+
+@receiver(post_save, sender=Transaction)
+def refresh_transaction_day(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    day = localdate(instance.date)
+    stored_user_id, stored_date = getattr(instance, "_stored_day", (None, None))
+    if stored_date is not None and (stored_user_id, localdate(stored_date)) != (instance.user_id, day):
+        # moved to another day (or user): the day it left still counts it
+        refresh_daily_rollups(stored_user_id, [localdate(stored_date)])
+    refresh_daily_rollups(instance.user_id, [day])
+    instance._stored_day = (instance.user_id, instance.date)
+
+@receiver(pre_delete, sender=ImportBatch)
+def remember_batch_days(sender, instance, **kwargs):
+    instance._rollup_days = list(instance.transactions.dates("date", "day"))
+
+@receiver(post_delete, sender=ImportBatch)
+def refresh_batch_days(sender, instance, **kwargs):
+    refresh_daily_rollups(instance.user_id, getattr(instance, "_rollup_days", []))
@@ -0,0 +1,39 @@
+from datetime import date
+from django.utils.timezone import now
+from reports.models import ReportSnapshot
+from reports.versions import get_data_versions
+
+SNAPSHOT_KEY_FIELDS = ["user", "period_start", "period_end", "currency"]
+
+def as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def stale_snapshot_users(user_ids, period_start, period_end, currency):
+    """Returns the current data versions and the users whose snapshot of the period is missing or older.
+
+    Versions are read before anything is computed, so data changing mid-run leaves the
+    snapshot behind the new stamp and the next run picks it up again.
+    """
+    versions = get_data_versions(user_ids)
+    stored = dict(
+        ReportSnapshot.objects.filter(
+            user_id__in=user_ids, period_start=as_date(period_start), period_end=as_date(period_end), currency=currency,
+        ).values_list("user_id", "data_version")
+    )
+    return versions, [user_id for user_id in user_ids if stored.get(user_id) != versions[user_id]]
+
+def save_snapshots(summaries, versions, period_start, period_end, currency):
+    # one upsert for the whole chunk; reruns of the same period overwrite instead of duplicating
+    computed_at = now()
+    ReportSnapshot.objects.bulk_create(
+        [
+            ReportSnapshot(
+                user_id=user_id, period_start=as_date(period_start), period_end=as_date(period_end), currency=currency,
+                payload=summary, computed_at=computed_at, data_version=versions[user_id],
+            )
+            for user_id, summary in summaries.items()
+        ],
+        update_conflicts=True,
+        unique_fields=SNAPSHOT_KEY_FIELDS,
+        update_fields=["payload", "computed_at", "data_version"],
+    )
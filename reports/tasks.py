@@ -1,23 +1,98 @@
-from celery import shared_task
+from celery import shared_task, chord
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from reports.services import calculate_kpi_summary
+from django.db import DatabaseError
+from reports.services import calculate_kpi_summary, calculate_kpi_summaries
+from reports.snapshots import stale_snapshot_users, save_snapshots
+from reports.versions import get_data_versions
 from datetime import timedelta, datetime
 from django.utils.timezone import now
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+def weekly_period():
+    today = now().date()
+    return (today - timedelta(days=7)).isoformat(), today.isoformat()
+
+def user_id_chunks(chunk_size):
+    # only ids are streamed from the database; no user objects are held by the coordinator
+    chunk = []
+    for user_id in User.objects.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=chunk_size):
+        chunk.append(user_id)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 @shared_task
 def generate_weekly_reports():
-    today = now().date()
-    start_date = today - timedelta(days=7)
-    end_date = today
-
-    for user in User.objects.all():
-        try:
-            summary = calculate_kpi_summary(user, start_date=start_date, end_date=end_date, target_currency="TRY")
-            logger.info(f"Weekly report for {user.email or user.username}: {summary}")
-            # at this point we can save the summary to a model or send it via email
-        except Exception as e:
-            logger.error(f"Failed to generate report for {user}: {e}")
+    # fans out one task per chunk of users; the chord callback collects the per-chunk stats
+    start_date, end_date = weekly_period()
+    header = [
+        generate_weekly_report_chunk.s(user_ids, start_date, end_date)
+        for user_ids in user_id_chunks(settings.WEEKLY_REPORT_CHUNK_SIZE)
+    ]
+    if not header:
+        return None
+    return chord(header)(summarize_weekly_reports.s(started_at=now().isoformat())).id
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def generate_weekly_report_chunk(self, user_ids, start_date, end_date):
+    started = time.perf_counter()
+    failed = []
+    stale = user_ids
+    versions = None
+    try:
+        # users whose data did not change since their snapshot of this period keep it as is
+        versions, stale = stale_snapshot_users(user_ids, start_date, end_date, "TRY")
+        summaries = calculate_kpi_summaries(stale, start_date=start_date, end_date=end_date, target_currency="TRY") if stale else {}
+    except DatabaseError as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        # the chunk is reported as failed instead of failing the chord, so the other chunks still count
+        logger.error(f"Weekly report chunk {user_ids[0]}-{user_ids[-1]} failed after {self.request.retries} retries: {e}")
+        summaries, failed = {}, list(stale)
+    except Exception as e:
+        # one bad user should not sink the chunk: fall back to per-user summaries to isolate it
+        logger.warning(f"Weekly report chunk {user_ids[0]}-{user_ids[-1]} falling back to per-user summaries: {e}")
+        if versions is None:
+            # the stale check itself failed: every user is recomputed, stamped with versions read first
+            versions = get_data_versions(stale)
+        summaries = {}
+        for user in User.objects.filter(pk__in=stale):
+            try:
+                summaries[user.pk] = calculate_kpi_summary(user, start_date=start_date, end_date=end_date, target_currency="TRY")
+            except Exception as e:
+                logger.error(f"Failed to generate report for {user}: {e}")
+                failed.append(user.pk)
+
+    if summaries:
+        save_snapshots(summaries, versions, start_date, end_date, "TRY")
+
+    return {
+        "users": len(user_ids),
+        "succeeded": len(summaries),
+        "reused": len(user_ids) - len(stale),
+        "failed": failed,
+        "retries": self.request.retries,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+@shared_task
+def summarize_weekly_reports(results, started_at):
+    stats = {
+        "chunks": len(results),
+        "users": sum(result["users"] for result in results),
+        "succeeded": sum(result["succeeded"] for result in results),
+        "reused": sum(result["reused"] for result in results),
+        "failed": [user_id for result in results for user_id in result["failed"]],
+        "retries": sum(result["retries"] for result in results),
+        "slowest_chunk_seconds": max(result["seconds"] for result in results),
+        "wall_seconds": round((now() - datetime.fromisoformat(started_at)).total_seconds(), 3),
+    }
+    logger.info(f"Weekly reports finished: {stats}")
+    return stats
@@ -1,9 +1,20 @@
 import pytest
-from datetime import datetime
+from io import BytesIO, StringIO
+from decimal import Decimal
+from datetime import date, datetime
 from django.utils.timezone import make_aware
 from django.contrib.auth.models import User
-from transactions.models import Transaction, ImportBatch
-from reports.services import calculate_kpi_summary
+from django.core.management import call_command, CommandError
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from transactions.models import Transaction, ImportBatch, ExchangeRate
+from reports.models import DailyRollup, ReportSnapshot
+from reports.versions import get_data_version, bump_data_version
+from reports.services import calculate_kpi_summary, calculate_kpi_summaries, calculate_kpi_timeseries
+from reports.tasks import generate_weekly_reports, generate_weekly_report_chunk
+from transactions.services import convert_amount, import_transactions, get_rate_table
+from utils import round_decimal
 
 @pytest.fixture
 def user_with_transactions(db):
@@ -13,17 +24,17 @@ def user_with_transactions(db):
     Transaction.objects.create(
         user=user, batch=batch, date=make_aware(datetime(2025, 7, 1)),
         amount=4500.00, currency="TRY", transaction_type="credit",
-        description="Satış: Fatura #1023", category="Sales", unique_hash="hash_report1"
+        description="Satış: Fatura #1023", category="Sales", unique_hash=b"hash_report1"
     )
     Transaction.objects.create(
         user=user, batch=batch, date=make_aware(datetime(2025, 7, 2)),
         amount=-1200.00, currency="TRY", transaction_type="debit",
-        description="Kira Ödemesi", category="Rent", unique_hash="hash_report2"
+        description="Kira Ödemesi", category="Rent", unique_hash=b"hash_report2"
     )
     Transaction.objects.create(
         user=user, batch=batch, date=make_aware(datetime(2025, 7, 3)),
         amount=-800.00, currency="TRY", transaction_type="debit",
-        description="Market Harcaması", category="Food", unique_hash="hash_report3"
+        description="Market Harcaması", category="Food", unique_hash=b"hash_report3"
     )
     return user
 
@@ -50,3 +61,369 @@ def test_date_range_filter(user_with_transactions):
     assert summary["total_expense"] == 0
     assert summary["net_cash_flow"] == 0
     assert summary["top_expense_categories"] == []
+
+def legacy_kpi_summary(user, target_currency):
+    total_income = 0
+    total_expense = 0
+    category_totals = {}
+    for tx in Transaction.objects.filter(user=user).order_by("id"):
+        amount_converted = convert_amount(tx.amount, tx.currency, target_currency)
+        if tx.amount > 0:
+            total_income += amount_converted
+        else:
+            total_expense += abs(amount_converted)
+            if tx.category:
+                category_totals[tx.category] = category_totals.get(tx.category, 0) + abs(amount_converted)
+    top = sorted(
+        [{"category": k, "total": round_decimal(v)} for k, v in category_totals.items()],
+        key=lambda x: x["total"], reverse=True,
+    )[:5]
+    return {
+        "total_income": round_decimal(total_income),
+        "total_expense": round_decimal(total_expense),
+        "net_cash_flow": round_decimal(total_income - total_expense),
+        "top_expense_categories": top,
+        "currency": target_currency,
+    }
+
+@pytest.fixture
+def multi_currency_user(db):
+    user = User.objects.create_user(username="fxuser", password="pass1234")
+    batch = ImportBatch.objects.create(user=user, idempotency_key="fx-key")
+    rows = [
+        (Decimal("100.10"), "USD", "Sales"), (Decimal("-33.33"), "USD", "SaaS"), (Decimal("-10.00"), "EUR", "Rent"),
+        (Decimal("-999.99"), "TRY", "Payroll"), (Decimal("0.00"), "TRY", "Utilities"), (Decimal("-5.55"), "EUR", None),
+        (Decimal("-12.12"), "TRY", "Rent"), (Decimal("-1.00"), "TRY", "Food"), (Decimal("-1.00"), "TRY", "Misc"),
+        (Decimal("2500.00"), "EUR", "Sales"), (Decimal("-20.00"), "USD", ""), (Decimal("-7.77"), "EUR", "SaaS"),
+    ]
+    for i, (amount, currency, category) in enumerate(rows):
+        Transaction.objects.create(
+            user=user, batch=batch, date=make_aware(datetime(2025, 7, 1 + i)), amount=amount, currency=currency,
+            transaction_type="credit" if amount > 0 else "debit", category=category, unique_hash=f"fx{i}".encode(),
+        )
+    return user
+
+@pytest.mark.parametrize("currency", ["TRY", "USD", "EUR"])
+def test_grouped_summary_matches_row_loop(multi_currency_user, currency):
+    assert calculate_kpi_summary(multi_currency_user, target_currency=currency) == legacy_kpi_summary(multi_currency_user, currency)
+
+def test_summary_runs_one_query(multi_currency_user, django_assert_num_queries):
+    get_rate_table()  # loaded once per process and rates version, not per summary
+    with django_assert_num_queries(1):
+        calculate_kpi_summary(multi_currency_user, start_date="2025-07-01", end_date="2025-07-31")
+
+def test_summary_for_user_without_transactions(db):
+    user = User.objects.create_user(username="empty", password="pass1234")
+    assert calculate_kpi_summary(user)["total_income"] == 0
+    assert calculate_kpi_summary(user)["top_expense_categories"] == []
+
+def test_import_maintains_daily_rollups(db):
+    user = User.objects.create_user(username="rollup", password="pass1234")
+    csv_file = BytesIO((
+        "date,amount,currency,type,description\n"
+        "2025-07-01,100.00,TRY,credit,Satış\n"
+        "2025-07-01,-40.00,TRY,debit,Kira\n"
+        "2025-07-01,-10.00,TRY,debit,Kira depozito\n"
+        "2025-07-02,-5.00,USD,debit,CRM\n"
+    ).encode())
+    import_transactions(user, csv_file, "rollup-key")
+
+    rollups = {
+        (r.day.isoformat(), r.category, r.direction): (r.total, r.count)
+        for r in DailyRollup.objects.filter(user=user)
+    }
+    assert rollups == {
+        ("2025-07-01", "Sales", "income"): (Decimal("100.00"), 1),
+        ("2025-07-01", "Rent", "expense"): (Decimal("-50.00"), 2),
+        ("2025-07-02", "SaaS", "expense"): (Decimal("-5.00"), 1),
+    }
+
+    ImportBatch.objects.get(idempotency_key="rollup-key").delete()
+    assert not DailyRollup.objects.filter(user=user).exists()
+
+def test_deleting_a_transaction_refreshes_its_day(db, django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username="delete-one", password="pass1234")
+    import_transactions(user, BytesIO(b"date,amount,currency,type,description\n2025-07-01,-40.00,TRY,debit,Kira\n2025-07-01,-10.00,TRY,debit,Kira\n"), "delete-one-key")
+    version = get_data_version(user.id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Transaction.objects.filter(user=user, amount=Decimal("-10.00")).get().delete()
+    assert DailyRollup.objects.get(user=user).total == Decimal("-40.00")
+    assert get_data_version(user.id) != version
+
+def test_batch_delete_stays_one_fast_delete(db):
+    user = User.objects.create_user(username="fast-delete", password="pass1234")
+    import_transactions(user, BytesIO(b"date,amount,currency,type,description\n2025-07-01,-40.00,TRY,debit,Kira\n2025-07-02,-10.00,TRY,debit,Kira\n"), "fast-delete-key")
+
+    with CaptureQueriesContext(connection) as queries:
+        ImportBatch.objects.get(idempotency_key="fast-delete-key").delete()
+    deletes = [query["sql"] for query in queries if query["sql"].startswith('DELETE FROM "transactions_transaction"')]
+    assert len(deletes) == 1 and '"batch_id" IN' in deletes[0]
+    assert not [query for query in queries if query["sql"].startswith('SELECT "transactions_transaction"."id"')]
+    assert not DailyRollup.objects.filter(user=user).exists()
+
+def test_moving_a_transaction_refreshes_both_days(db):
+    user = User.objects.create_user(username="move-day", password="pass1234")
+    import_transactions(user, BytesIO(b"date,amount,currency,type,description\n2025-07-01,-40.00,TRY,debit,Kira\n"), "move-day-key")
+
+    transaction = Transaction.objects.get(user=user)
+    transaction.date = make_aware(datetime(2025, 7, 5, 12))
+    transaction.save()
+
+    assert list(DailyRollup.objects.filter(user=user).values_list("day", "total")) == [(date(2025, 7, 5), Decimal("-40.00"))]
+    assert calculate_kpi_summary(user)["total_expense"] == Decimal("40.00")
+
+def test_rollup_groups_are_unique(db):
+    user = User.objects.create_user(username="unique-rollup", password="pass1234")
+    row = {"user": user, "day": "2025-07-01", "currency": "TRY", "category": None, "direction": "expense", "total": 1, "count": 1, "first_transaction_id": 1}
+    DailyRollup.objects.create(**row)
+    with pytest.raises(IntegrityError):
+        DailyRollup.objects.create(**row)
+
+def test_partial_edge_days_are_read_from_raw_rows(db):
+    user = User.objects.create_user(username="edges", password="pass1234")
+    batch = ImportBatch.objects.create(user=user, idempotency_key="edge-key")
+    for i, (day, hour, amount) in enumerate([(1, 10, "-1.00"), (1, 18, "-2.00"), (2, 15, "-4.00"), (3, 9, "-8.00"), (3, 20, "-16.00")]):
+        Transaction.objects.create(
+            user=user, batch=batch, date=make_aware(datetime(2025, 7, day, hour)), amount=Decimal(amount),
+            currency="TRY", transaction_type="debit", category="Rent", unique_hash=f"edge{i}".encode(),
+        )
+
+    summary = calculate_kpi_summary(user, start_date=make_aware(datetime(2025, 7, 1, 12)), end_date=make_aware(datetime(2025, 7, 3, 10)))
+    assert summary["total_expense"] == Decimal("14.00")
+
+    same_day = calculate_kpi_summary(user, start_date=make_aware(datetime(2025, 7, 3, 8)), end_date=make_aware(datetime(2025, 7, 3, 10)))
+    assert same_day["total_expense"] == Decimal("8.00")
+
+def test_midnight_end_date_includes_rows_at_midnight(db):
+    user = User.objects.create_user(username="midnight", password="pass1234")
+    batch = ImportBatch.objects.create(user=user, idempotency_key="midnight-key")
+    for i, (day, hour, amount) in enumerate([(2, 12, "-2.00"), (3, 0, "-1.00"), (3, 1, "-4.00")]):
+        Transaction.objects.create(
+            user=user, batch=batch, date=make_aware(datetime(2025, 7, day, hour)), amount=Decimal(amount),
+            currency="TRY", transaction_type="debit", category="Rent", unique_hash=f"midnight{i}".encode(),
+        )
+
+    end = make_aware(datetime(2025, 7, 3))
+    assert calculate_kpi_summary(user, start_date="2025-07-02", end_date=end)["total_expense"] == Decimal("3.00")
+    # a range shorter than a day that ends at midnight
+    assert calculate_kpi_summary(user, start_date=make_aware(datetime(2025, 7, 2, 6)), end_date=end)["total_expense"] == Decimal("3.00")
+    series = calculate_kpi_timeseries(user, start_date="2025-07-02", end_date=end)
+    assert [bucket["total_expense"] for bucket in series["buckets"]] == [Decimal("2.00"), Decimal("1.00")]
+
+def test_rebuild_daily_rollups_command(user_with_transactions):
+    DailyRollup.objects.all().delete()
+    call_command("rebuild_daily_rollups", stdout=StringIO())
+    assert DailyRollup.objects.filter(user=user_with_transactions).count() == 3
+    assert calculate_kpi_summary(user_with_transactions)["total_expense"] == Decimal("2000.00")
+
+def test_summary_endpoint_caches_per_data_version(user_with_transactions, django_capture_on_commit_callbacks):
+    client = APIClient()
+    client.force_authenticate(user_with_transactions)
+    params = {"start_date": "2025-07-01", "end_date": "2025-07-31", "currency": "usd"}
+
+    first = client.get("/reports/summary/", params)
+    second = client.get("/reports/summary/", params)
+    assert (first["X-Cache"], second["X-Cache"]) == ("MISS", "HIT")
+    assert first.data == second.data
+    assert first["ETag"] == second["ETag"]
+
+    not_modified = client.get("/reports/summary/", params, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert not_modified.status_code == 304
+
+    csv_file = BytesIO(b"date,amount,currency,type,description\n2025-07-10,-100.00,TRY,debit,Kira\n")
+    with django_capture_on_commit_callbacks(execute=True):
+        import_transactions(user_with_transactions, csv_file, "bump-key")
+
+    after_import = client.get("/reports/summary/", params, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert after_import.status_code == 200
+    assert after_import["X-Cache"] == "MISS"
+    assert after_import["ETag"] != first["ETag"]
+    assert after_import.data["total_expense"] > first.data["total_expense"]
+
+def test_batched_summaries_match_per_user(user_with_transactions, multi_currency_user, django_assert_max_num_queries):
+    empty = User.objects.create_user(username="nobody", password="pass1234")
+    users = [user_with_transactions, multi_currency_user, empty]
+
+    get_rate_table()
+    with django_assert_max_num_queries(2):
+        summaries = calculate_kpi_summaries([user.pk for user in users], start_date="2025-07-01", end_date="2025-07-31", target_currency="USD")
+
+    for user in users:
+        assert summaries[user.pk] == calculate_kpi_summary(user, start_date="2025-07-01", end_date="2025-07-31", target_currency="USD")
+
+@pytest.fixture
+def eager_celery():
+    from bank_kpi_backend.celery import app
+    app.conf.task_always_eager = True
+    yield app
+    app.conf.task_always_eager = False
+
+def test_weekly_reports_fan_out_in_chunks(user_with_transactions, multi_currency_user, eager_celery, settings, monkeypatch):
+    settings.WEEKLY_REPORT_CHUNK_SIZE = 1
+    chunks = []
+    monkeypatch.setattr("reports.tasks.calculate_kpi_summaries", lambda user_ids, **kwargs: chunks.append(user_ids) or calculate_kpi_summaries(user_ids, **kwargs))
+
+    generate_weekly_reports.delay()
+
+    assert chunks == [[user_with_transactions.pk], [multi_currency_user.pk]]
+
+def test_weekly_report_chunk_isolates_failing_user(user_with_transactions, multi_currency_user, monkeypatch):
+    def summary(user, **kwargs):
+        if user.pk == multi_currency_user.pk:
+            raise ValueError("Unsupported currency conversion")
+        return {}
+    monkeypatch.setattr("reports.tasks.calculate_kpi_summaries", lambda *args, **kwargs: summary(multi_currency_user))
+    monkeypatch.setattr("reports.tasks.calculate_kpi_summary", summary)
+
+    result = generate_weekly_report_chunk.apply(args=([user_with_transactions.pk, multi_currency_user.pk], "2025-07-01", "2025-07-08")).get()
+
+    assert result["succeeded"] == 1
+    assert result["failed"] == [multi_currency_user.pk]
+    assert result["retries"] == 0
+
+def test_weekly_chunk_falls_back_when_the_stale_check_fails(user_with_transactions, monkeypatch):
+    def broken(*args):
+        raise ValueError("bad snapshot row")
+    monkeypatch.setattr("reports.tasks.stale_snapshot_users", broken)
+
+    result = generate_weekly_report_chunk.apply(args=([user_with_transactions.pk], "2025-07-01", "2025-07-08")).get()
+
+    assert result["succeeded"] == 1
+    assert result["failed"] == []
+    assert ReportSnapshot.objects.get(user=user_with_transactions).data_version == get_data_version(user_with_transactions.pk)
+
+def test_weekly_chunk_writes_and_reuses_snapshots(user_with_transactions, monkeypatch):
+    user_ids = [user_with_transactions.pk]
+    generate_weekly_report_chunk.apply(args=(user_ids, "2025-07-01", "2025-07-08")).get()
+
+    snapshot = ReportSnapshot.objects.get(user=user_with_transactions)
+    assert snapshot.payload["total_expense"] == "2000.00"
+    assert snapshot.data_version == get_data_version(user_with_transactions.pk)
+
+    # unchanged data: the stored snapshot is reused and nothing is recomputed
+    monkeypatch.setattr("reports.tasks.calculate_kpi_summaries", lambda *args, **kwargs: pytest.fail("recomputed"))
+    result = generate_weekly_report_chunk.apply(args=(user_ids, "2025-07-01", "2025-07-08")).get()
+    assert result["reused"] == 1
+    monkeypatch.undo()
+
+    bump_data_version(user_with_transactions.pk)
+    result = generate_weekly_report_chunk.apply(args=(user_ids, "2025-07-01", "2025-07-08")).get()
+    assert result["reused"] == 0
+    assert ReportSnapshot.objects.filter(user=user_with_transactions).count() == 1
+    assert ReportSnapshot.objects.get(user=user_with_transactions).data_version == get_data_version(user_with_transactions.pk)
+
+def test_history_endpoint_serves_snapshots(user_with_transactions, django_assert_num_queries):
+    generate_weekly_report_chunk.apply(args=([user_with_transactions.pk], "2025-07-01", "2025-07-08")).get()
+    generate_weekly_report_chunk.apply(args=([user_with_transactions.pk], "2025-06-24", "2025-07-01")).get()
+
+    client = APIClient()
+    client.force_authenticate(user_with_transactions)
+    with django_assert_num_queries(2):
+        response = client.get("/reports/history/", {"currency": "try"})
+
+    assert response.status_code == 200
+    assert response.data["count"] == 2
+    latest = response.data["results"][0]
+    assert (latest["period_start"], latest["period_end"]) == ("2025-07-01", "2025-07-08")
+    assert latest["summary"]["net_cash_flow"] == "2500.00"
+
+    response = client.get("/reports/history/", {"start_date": "2025-07-01"})
+    assert response.data["count"] == 1
+    assert client.get("/reports/history/", {"start_date": "July"}).status_code == 400
+
+@pytest.mark.parametrize("interval", ["day", "week", "month"])
+def test_timeseries_buckets_add_up_to_summary(multi_currency_user, interval, django_assert_max_num_queries):
+    get_rate_table()
+    with django_assert_max_num_queries(1):
+        series = calculate_kpi_timeseries(multi_currency_user, "2025-07-01", "2025-07-31", interval=interval, target_currency="USD")
+    summary = calculate_kpi_summary(multi_currency_user, "2025-07-01", "2025-07-31", target_currency="USD")
+
+    assert sum(bucket["total_income"] for bucket in series["buckets"]) == pytest.approx(summary["total_income"], abs=Decimal("0.05"))
+    assert sum(bucket["total_expense"] for bucket in series["buckets"]) == pytest.approx(summary["total_expense"], abs=Decimal("0.05"))
+    periods = [bucket["period"] for bucket in series["buckets"]]
+    assert periods == sorted(periods)
+    if interval == "day":
+        assert len(periods) == 31
+    if interval == "month":
+        assert periods == [datetime(2025, 7, 1).date()]
+
+def test_timeseries_reads_partial_edge_days(user_with_transactions):
+    # 2025-07-01 12:00 onwards: the 4500 credit at midnight on the 1st falls outside
+    series = calculate_kpi_timeseries(user_with_transactions, make_aware(datetime(2025, 7, 1, 12)), "2025-07-02")
+    assert [(bucket["total_income"], bucket["total_expense"]) for bucket in series["buckets"]] == [
+        (Decimal("0.00"), Decimal("0.00")), (Decimal("0.00"), Decimal("1200.00")),
+    ]
+    assert series["buckets"][1]["categories"] == {"Rent": Decimal("1200.00")}
+
+def test_timeseries_endpoint(user_with_transactions):
+    client = APIClient()
+    client.force_authenticate(user_with_transactions)
+    response = client.get("/reports/timeseries/", {"interval": "week", "currency": "try"})
+
+    assert response.status_code == 200
+    assert response.data["currency"] == "TRY"
+    assert [str(bucket["period"]) for bucket in response.data["buckets"]] == ["2025-06-30"]
+    assert response.data["buckets"][0]["net_cash_flow"] == Decimal("2500.00")
+    assert client.get("/reports/timeseries/", {"interval": "year"}).status_code == 400
+
+def test_summary_converts_each_day_at_its_own_rate(multi_currency_user, tmp_path, django_capture_on_commit_callbacks):
+    rates = tmp_path / "rates.csv"
+    rates.write_text("date,currency,rate\n2025-07-01,USD,40.00\n2025-07-02,USD,41.00\n2025-07-10,EUR,50.00\n")
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("load_exchange_rates", str(rates), stdout=StringIO())
+
+    # legacy loop with the dated rate of each row
+    expected = {"income": 0, "expense": 0}
+    for tx in Transaction.objects.filter(user=multi_currency_user):
+        converted = convert_amount(tx.amount, tx.currency, "TRY", tx.date.date())
+        expected["income" if tx.amount > 0 else "expense"] += converted
+
+    summary = calculate_kpi_summary(multi_currency_user, target_currency="TRY")
+    assert summary["total_income"] == round_decimal(expected["income"])
+    assert summary["total_expense"] == round_decimal(abs(expected["expense"]))
+    # 100.10 USD on 07-01 at 40, -33.33 USD on 07-02 at 41, EUR before its first loaded rate uses it
+    assert convert_amount(Decimal("100.10"), "USD", "TRY", datetime(2025, 7, 1).date()) == Decimal("4004.0000")
+    assert convert_amount(Decimal("1"), "EUR", "TRY", datetime(2025, 7, 3).date()) == Decimal("50.00")
+    assert convert_amount(Decimal("1"), "USD", "TRY") == Decimal("41.00")
+
+def test_rates_reload_after_change_and_unknown_currency_is_rejected(user_with_transactions, django_capture_on_commit_callbacks):
+    client = APIClient()
+    client.force_authenticate(user_with_transactions)
+    before = client.get("/reports/summary/", {"currency": "USD"}).data["total_income"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ExchangeRate.objects.create(currency="USD", date=datetime(2025, 1, 1).date(), rate=Decimal("45"))
+    after = client.get("/reports/summary/", {"currency": "USD"}).data["total_income"]
+
+    assert before == round_decimal(Decimal("4500") / Decimal("40.89"))
+    assert after == Decimal("100.00")
+    assert client.get("/reports/summary/", {"currency": "GBP"}).status_code == 400
+
+def test_load_exchange_rates_rejects_bad_rows(tmp_path, db):
+    rates = tmp_path / "rates.csv"
+    rates.write_text("date,currency,rate\n2025-07-01,USD,40.00\n2025-07-02,USD,-1\n")
+    with pytest.raises(CommandError, match="Line 3"):
+        call_command("load_exchange_rates", str(rates), stdout=StringIO())
+    assert not ExchangeRate.objects.exists()
+
+def test_summary_query_budget(query_budget):
+    user = User.objects.create_user(username="budget-summary")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    def setup(size):
+        rows = "".join(f"2025-07-{1 + i % 28:02d},-{i + 1}.00,{('TRY', 'USD', 'EUR')[i % 3]},debit,Kira #{i}\n" for i in range(size))
+        import_transactions(user, BytesIO(("date,amount,currency,type,description\n" + rows).encode()), f"summary-rows-{size}")
+        return {"start_date": "2025-07-02", "end_date": "2025-07-20", "currency": "USD"}
+
+    query_budget(2, setup, lambda params: client.get("/reports/summary/", params))
+
+def test_weekly_report_chunk_query_budget(query_budget):
+    def setup(size):
+        for i in range(User.objects.count(), size):
+            user = User.objects.create_user(username=f"budget-weekly-{i}")
+            import_transactions(user, BytesIO(f"date,amount,currency,type,description\n2025-07-01,{i + 1}.00,USD,credit,Satış\n".encode()), f"weekly-rows-{i}")
+        return list(User.objects.order_by("pk").values_list("pk", flat=True))
+
+    query_budget(4, setup, lambda user_ids: generate_weekly_report_chunk.apply(args=(user_ids, "2025-07-01", "2025-07-08")))
@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import ReportSummaryView
+from .views import ReportSummaryView, SummaryCacheStatsView, ReportHistoryView, ReportTimeseriesView
 
 urlpatterns = [
     path('summary/', ReportSummaryView.as_view(), name='report-summary'),
+    path('timeseries/', ReportTimeseriesView.as_view(), name='report-timeseries'),
+    path('history/', ReportHistoryView.as_view(), name='report-history'),
+    path('summary/cache-stats/', SummaryCacheStatsView.as_view(), name='report-summary-cache-stats'),
 ]
@@ -0,0 +1,23 @@
+import time
+from django.core.cache import cache
+
+DATA_VERSION_KEY = "kpi:data-version:{}"
+
+# per-user stamp of the transaction data; anything derived from it (cached summaries,
+# snapshots) is keyed on the stamp, so bumping it invalidates without scanning
+def get_data_version(user_id):
+    # an evicted version simply starts a new one, which only costs a recompute
+    return cache.get_or_set(DATA_VERSION_KEY.format(user_id), time.time_ns, None)
+
+def bump_data_version(user_id):
+    cache.set(DATA_VERSION_KEY.format(user_id), time.time_ns(), None)
+
+def get_data_versions(user_ids):
+    # get_data_version for many users in one cache round trip
+    keys = {user_id: DATA_VERSION_KEY.format(user_id) for user_id in user_ids}
+    found = cache.get_many(keys.values())
+    missing = {keys[user_id]: time.time_ns() for user_id in user_ids if keys[user_id] not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {user_id: found[key] for user_id, key in keys.items()}
@@ -1,7 +1,14 @@
+from rest_framework import status, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from reports.services import calculate_kpi_summary
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.utils.http import parse_etags
+from reports.models import ReportSnapshot
+from reports.serializers import ReportSnapshotSerializer
+from reports.snapshots import as_date
+from reports.services import calculate_kpi_timeseries, INTERVALS
+from rest_framework.exceptions import ValidationError
+from reports.cache import get_cached_kpi_summary, summary_cache_key, summary_etag, summary_cache_stats
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 class ReportSummaryView(APIView):
@@ -14,13 +21,89 @@ class ReportSummaryView(APIView):
             OpenApiParameter("currency", str, description="Target currency for report totals (e.g. TRY, USD, EUR)", required=False
         ),
         ],
-        description="Get KPI summary report for the authenticated user.",
-        responses={200: dict}
+        description="Get KPI summary report for the authenticated user. Supports If-None-Match with the returned ETag.",
+        responses={200: dict, 304: None}
     )
     def get(self, request):
         start_date = request.query_params.get("start_date")
         end_date = request.query_params.get("end_date")
-        currency = request.query_params.get("currency") or "TRY"
+        currency = (request.query_params.get("currency") or "TRY").upper()
 
-        data = calculate_kpi_summary(request.user, start_date, end_date, currency)
-        return Response(data)
\ No newline at end of file
+        # the key already encodes the data version, so a matching ETag needs no computation at all
+        key = summary_cache_key(request.user.id, start_date, end_date, currency)
+        etag = summary_etag(key)
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        data, hit = get_cached_kpi_summary(request.user, start_date, end_date, currency, key=key)
+        return Response(data, headers={"ETag": etag, "X-Cache": "HIT" if hit else "MISS"})
+
+
+class ReportTimeseriesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("interval", str, description="Bucket size: day (default), week or month", required=False),
+            OpenApiParameter("start_date", str, description="Series from this date (YYYY-MM-DD)", required=False),
+            OpenApiParameter("end_date", str, description="Series up to this date (YYYY-MM-DD)", required=False),
+            OpenApiParameter("currency", str, description="Target currency for the totals (e.g. TRY, USD, EUR)", required=False),
+        ],
+        description="Income, expense, net cash flow and per-category expense per day, ISO week or month.",
+        responses={200: dict},
+    )
+    def get(self, request):
+        interval = request.query_params.get("interval") or "day"
+        if interval not in INTERVALS:
+            raise ValidationError({"interval": f"Must be one of {', '.join(INTERVALS)}."})
+        try:
+            data = calculate_kpi_timeseries(
+                request.user,
+                start_date=request.query_params.get("start_date"),
+                end_date=request.query_params.get("end_date"),
+                interval=interval,
+                target_currency=(request.query_params.get("currency") or "TRY").upper(),
+            )
+        except ValueError:
+            raise ValidationError({"detail": "Dates must be YYYY-MM-DD."})
+        return Response(data)
+
+
+class SummaryCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(description="Hit and miss counters of the KPI summary cache in this process.", responses={200: dict})
+    def get(self, request):
+        return Response(summary_cache_stats())
+
+
+class ReportHistoryView(generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ReportSnapshotSerializer
+
+    def get_queryset(self):
+        # stored snapshots only: past periods are never recomputed here
+        params = self.request.query_params
+        snapshots = ReportSnapshot.objects.filter(user=self.request.user)
+        if params.get("currency"):
+            snapshots = snapshots.filter(currency=params["currency"].upper())
+        try:
+            if params.get("start_date"):
+                snapshots = snapshots.filter(period_start__gte=as_date(params["start_date"]))
+            if params.get("end_date"):
+                snapshots = snapshots.filter(period_end__lte=as_date(params["end_date"]))
+        except ValueError:
+            raise ValidationError({"detail": "Dates must be YYYY-MM-DD."})
+        return snapshots
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("start_date", str, description="Only periods starting on or after this date (YYYY-MM-DD)", required=False),
+            OpenApiParameter("end_date", str, description="Only periods ending on or before this date (YYYY-MM-DD)", required=False),
+            OpenApiParameter("currency", str, description="Only snapshots in this currency (e.g. TRY)", required=False),
+        ],
+        description="Stored KPI summaries of past report periods, newest first.",
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
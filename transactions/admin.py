@@ -1,3 +1,16 @@
 from django.contrib import admin
+from .models import CategoryRule, ExchangeRate
 
 # Register your models here.
+@admin.register(CategoryRule)
+class CategoryRuleAdmin(admin.ModelAdmin):
+    list_display = ("pattern", "category", "match_type", "priority", "user", "is_active", "updated_at")
+    list_filter = ("match_type", "is_active")
+    list_select_related = ("user",)
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ("currency", "date", "rate")
+    list_filter = ("currency",)
+    date_hierarchy = "date"
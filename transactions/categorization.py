@@ -0,0 +1,127 @@
+import re
+from functools import lru_cache
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# İ/I/ı all fold to "i" so "KİRA", "KIRA" and "kira" match the same keyword;
+# plain str.lower() turns "İ" into "i" + combining dot and misses it
+TURKISH_FOLD = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+
+def fold(text: str) -> str:
+    return text.translate(TURKISH_FOLD).lower()
+
+def _trie_pattern(node: dict) -> str:
+    # keywords sharing a prefix share one branch, so the regex engine never retries
+    # hundreds of alternatives at a position; the greedy optional prefers longer keywords
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:%s)" % "|".join(branches)
+    return "(?:%s)?" % pattern if "" in node else pattern
+
+def compile_keywords(words) -> re.Pattern:
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return re.compile("(?=(%s))" % _trie_pattern(trie))
+
+def _has_nested_repeat(parsed, repeated=False) -> bool:
+    for op, args in parsed:
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, body = args
+            if repeated and high > 1:
+                return True
+            if _has_nested_repeat(body, repeated or high > 1):
+                return True
+        elif op is sre_parse.SUBPATTERN:
+            if _has_nested_repeat(args[-1], repeated):
+                return True
+        elif op is sre_parse.BRANCH:
+            if any(_has_nested_repeat(branch, repeated) for branch in args[1]):
+                return True
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            if _has_nested_repeat(args[1], repeated):
+                return True
+    return False
+
+def check_user_regex(pattern: str, max_length: int):
+    # user rules run against every imported description, so patterns that can backtrack
+    # exponentially ("(a+)+", "(\w*)*") are refused; global rules are managed by admins
+    if len(pattern) > max_length:
+        raise ValueError(f"Regex longer than {max_length} characters")
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regex: {e}")
+    if _has_nested_repeat(parsed):
+        raise ValueError("Nested quantifiers such as (a+)+ are not allowed")
+
+# a rule is (category, pattern, is_regex, priority)
+def keyword_rules(keywords: dict[str, list[str]]) -> list[tuple]:
+    return [(category, word, False, 0) for category, words in keywords.items() for word in words]
+
+# rule table compiled into one regex scan per description. with equal priorities scoring is the
+# same as the old nested loop: each rule found adds a point to its category and ties go to the
+# category that comes first in the table. a match from a higher priority rule wins outright.
+# regex rules run case-insensitively against the folded description
+class CategoryMatcher:
+    def __init__(self, rules, default: str = "Uncategorized", cache_size: int = 10000):
+        self.rules = tuple(rules)
+        self.categories = list(dict.fromkeys(rule[0] for rule in self.rules))
+        self.default = default
+        category_index = {category: index for index, category in enumerate(self.categories)}
+
+        # folded keyword -> (category index, priority) of every rule using it
+        self._keyword_rules = {}
+        self._regex_rules = []
+        for category, pattern, is_regex, priority in self.rules:
+            if is_regex:
+                self._regex_rules.append((re.compile(pattern, re.IGNORECASE), category_index[category], priority))
+            else:
+                self._keyword_rules.setdefault(fold(pattern), []).append((category_index[category], priority))
+
+        # the lookahead reports the longest keyword starting at each position; shorter keywords
+        # inside that match are added back through _implied so overlapping keywords still score
+        words = list(self._keyword_rules)
+        self._pattern = compile_keywords(words) if words else None
+        self._implied = {word: [other for other in words if other in word] for word in words}
+
+        self._categorize_folded = lru_cache(maxsize=cache_size)(self._categorize_folded)
+
+    @classmethod
+    def from_keywords(cls, keywords: dict[str, list[str]], **kwargs):
+        return cls(keyword_rules(keywords), **kwargs)
+
+    def categorize(self, description: str) -> str:
+        return self._categorize_folded(fold(description))
+
+    def categorize_many(self, descriptions) -> list[str]:
+        return [self._categorize_folded(fold(description)) for description in descriptions]
+
+    def _categorize_folded(self, text: str) -> str:
+        found = set()
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text):
+                longest = match.group(1)
+                if longest not in found:
+                    found.update(self._implied[longest])
+
+        hits = [hit for word in found for hit in self._keyword_rules[word]]
+        hits += [(index, priority) for regex, index, priority in self._regex_rules if regex.search(text)]
+        if not hits:
+            return self.default
+
+        # category index -> [highest matched priority, matched rule count]
+        scores = {}
+        for index, priority in hits:
+            score = scores.setdefault(index, [priority, 0])
+            score[0] = max(score[0], priority)
+            score[1] += 1
+        best = max(scores, key=lambda index: (scores[index][0], scores[index][1], -index))
+        return self.categories[best]
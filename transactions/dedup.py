@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from .models import Transaction
+
+BLOOM_KEY = "dedup-bloom:{}"
+BITS_PER_ITEM = 10
+HASH_COUNT = 7
+
+
+class BloomFilter:
+    """Set of a user's transaction hashes with false positives but no false negatives.
+
+    unique_hash is already a uniform SHA-256 digest, so its 4-byte slices serve as the
+    k bit positions and nothing is rehashed.
+    """
+    def __init__(self, capacity: int, bits: bytearray | None = None, count: int = 0):
+        self.capacity = capacity
+        self.size = capacity * BITS_PER_ITEM
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+        self.loaded_count = count
+
+    def positions(self, unique_hash: bytes):
+        return (int.from_bytes(unique_hash[i * 4:(i + 1) * 4], "big") % self.size for i in range(HASH_COUNT))
+
+    def add(self, unique_hash: bytes):
+        for position in self.positions(unique_hash):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, unique_hash: bytes) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self.positions(unique_hash))
+
+    @property
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+    def union(self, bits: bytes, count: int) -> tuple[int, bytes]:
+        """(count, bits) of this filter OR another one of the same capacity.
+
+        The other filter's count plus the hashes added here since loading; hashes both
+        filters saw are counted twice, which only makes the rebuild come sooner.
+        """
+        merged = int.from_bytes(bits, "little") | int.from_bytes(self.bits, "little")
+        return count + self.count - self.loaded_count, merged.to_bytes(len(self.bits), "little")
+
+
+def build_bloom_filter(user_id) -> BloomFilter:
+    # sized with headroom so a few imports fit before it has to be rebuilt
+    existing = Transaction.objects.filter(user_id=user_id)
+    bloom = BloomFilter(max(settings.TRANSACTION_DEDUP_BLOOM_MIN_CAPACITY, existing.count() * 2))
+    for unique_hash in existing.values_list("unique_hash", flat=True).iterator(chunk_size=10000):
+        bloom.add(bytes(unique_hash))
+    return bloom
+
+
+def load_bloom_filter(user_id) -> BloomFilter:
+    stored = cache.get(BLOOM_KEY.format(user_id))
+    if stored is None:
+        return build_bloom_filter(user_id)
+    capacity, count, bits = stored
+    bloom = BloomFilter(capacity, bytearray(bits), count)
+    return build_bloom_filter(user_id) if bloom.full else bloom
+
+
+def save_bloom_filter(user_id, bloom: BloomFilter):
+    """Stores the filter once the rows it was given are committed, merged with the stored copy.
+
+    Concurrent imports each OR their bits into what is stored. The read-merge-write is not
+    atomic, so a rare lost hash is possible; it only means a row is inserted without a probe
+    and left to the unique index, never that a duplicate gets through.
+    """
+    key = BLOOM_KEY.format(user_id)
+
+    def save():
+        count, bits = bloom.count, bytes(bloom.bits)
+        stored = cache.get(key)
+        if stored is not None:
+            capacity, stored_count, stored_bits = stored
+            if capacity > bloom.capacity:
+                # rebuilt larger by another import meanwhile: kept as is, since bits of different
+                # sizes cannot be merged; hashes it lacks are left to the unique index
+                return
+            if capacity == bloom.capacity:
+                count, bits = bloom.union(stored_bits, stored_count)
+        # bounded so filters of users who stopped importing leave the cache; an expired one is rebuilt
+        cache.set(key, (bloom.capacity, count, bits), settings.TRANSACTION_BLOOM_TTL)
+
+    db_transaction.on_commit(save)
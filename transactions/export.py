@@ -0,0 +1,92 @@
+import csv
+import json
+import zlib
+from rest_framework.renderers import BaseRenderer
+
+EXPORT_FIELDS = ("id", "date", "amount", "currency", "transaction_type", "description", "category")
+FLUSH_BYTES = 64 * 1024
+
+
+class ExportRenderer(BaseRenderer):
+    # rows are streamed by the view; the renderer only handles error bodies and content negotiation
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode(self.charset)
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip: listed (or matched by *) with q > 0."""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+class _LineBuffer:
+    # csv.writer target that hands back each formatted line instead of storing it
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for pk, date, amount, currency, transaction_type, description, category in rows:
+        yield writer.writerow((pk, date.isoformat(), amount, currency, transaction_type, description, category))
+
+
+def ndjson_lines(rows):
+    for pk, date, amount, currency, transaction_type, description, category in rows:
+        yield json.dumps({
+            "id": pk,
+            "date": date.isoformat(),
+            "amount": str(amount),
+            "currency": currency,
+            "transaction_type": transaction_type,
+            "description": description,
+            "category": category,
+        }, ensure_ascii=False) + "\n"
+
+
+def encode_chunks(lines, compress: bool = False):
+    # lines are joined into ~64KB chunks so the response is not written one row at a time
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            data = "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+            yield compressor.compress(data) if compressor else data
+
+    data = "".join(buffer).encode("utf-8")
+    if compressor:
+        yield compressor.compress(data) + compressor.flush()
+    elif data:
+        yield data
@@ -0,0 +1,102 @@
+import re
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum, Min
+from django.db.models.functions import TruncDate
+from django.utils.timezone import localtime
+from transactions.export import EXPORT_FIELDS
+from transactions.models import Transaction
+from transactions.serializers import LIST_FIELDS
+from transactions.services import get_filtered_transactions
+from reports.models import DailyRollup
+from reports.rollups import signed_totals, day_bounds
+
+User = get_user_model()
+
+# index names in PostgreSQL and SQLite plans, and the markers of a full table scan
+INDEX_PATTERNS = [
+    re.compile(r"Index (?:Only )?Scan(?: Backward)? using (\w+)"),
+    re.compile(r"Bitmap Index Scan on (\w+)"),
+    re.compile(r"USING (?:COVERING )?INDEX (\w+)"),
+    re.compile(r"USING INTEGER PRIMARY KEY"),
+]
+FULL_SCAN_PATTERNS = [re.compile(r"Seq Scan on (\w+)"), re.compile(r"\bSCAN (\w+)(?! USING)")]
+
+
+def plan_indexes(plan: str) -> list[str]:
+    used = []
+    for pattern in INDEX_PATTERNS:
+        for match in pattern.finditer(plan):
+            name = match.group(1) if pattern.groups else "primary key"
+            if name not in used:
+                used.append(name)
+    for pattern in FULL_SCAN_PATTERNS:
+        for match in pattern.finditer(plan):
+            if not any(index in match.group(0) for index in used):
+                used.append(f"full scan of {match.group(1)}")
+    return used
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the queries behind each endpoint and report which index each one uses."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Explain for this user id (default: the user with most transactions)")
+        parser.add_argument("--analyze", action="store_true", help="Run EXPLAIN ANALYZE (PostgreSQL only)")
+        parser.add_argument("--plans", action="store_true", help="Print the full plans")
+
+    def handle(self, *args, user=None, analyze=False, plans=False, **options):
+        user = self.get_user(user)
+        options = {"analyze": True} if analyze and connection.vendor == "postgresql" else {}
+
+        for name, queryset in self.endpoint_queries(user):
+            plan = queryset.explain(**options)
+            used = plan_indexes(plan)
+            style = self.style.WARNING if any(index.startswith("full scan") for index in used) else self.style.SUCCESS
+            self.stdout.write(f"{name:<32} {style(', '.join(used) or 'no table access')}")
+            if plans:
+                self.stdout.write(plan + "\n")
+
+    def get_user(self, user_id):
+        if user_id:
+            try:
+                return User.objects.get(pk=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f"User {user_id} does not exist")
+        busiest = Transaction.objects.values("user_id").annotate(rows=Count("id")).order_by("-rows").first()
+        if not busiest:
+            raise CommandError("No transactions to explain; pass --user or import some data first")
+        return User.objects.get(pk=busiest["user_id"])
+
+    def endpoint_queries(self, user):
+        # the same query shapes the views and services build, with the user's own data ranges
+        latest = Transaction.objects.filter(user=user).order_by("-date").values_list("date", flat=True).first()
+        end = localtime(latest or localtime()).date()
+        start = end - timedelta(days=30)
+        category = (
+            Transaction.objects.filter(user=user).exclude(category=None)
+            .values_list("category", flat=True).order_by("category").first() or "Rent"
+        )
+        recent = get_filtered_transactions(user, start.isoformat(), end.isoformat())
+        day_start, day_end = day_bounds(start, end)
+        hashes = list(Transaction.objects.filter(user=user).values_list("unique_hash", flat=True)[:1000]) or [b""]
+
+        return [
+            ("GET /transactions/", get_filtered_transactions(user).values(*LIST_FIELDS)[:10]),
+            ("  ?start_date&end_date", recent.values(*LIST_FIELDS)[:10]),
+            ("  ?transaction_type=debit", get_filtered_transactions(user, transaction_type="debit").values(*LIST_FIELDS)[:10]),
+            ("  ?category=", get_filtered_transactions(user, category=category.lower()).values(*LIST_FIELDS)[:10]),
+            ("GET /transactions/export/", recent.values_list(*EXPORT_FIELDS)),
+            ("import duplicate probe", Transaction.objects.filter(user=user, unique_hash__in=hashes).values_list("unique_hash", flat=True)),
+            ("summary/timeseries rollups", (
+                DailyRollup.objects.filter(user=user, day__gte=start, day__lte=end)
+                .values("currency", "category", "direction").annotate(total=Sum("total"), first_id=Min("first_transaction_id")).order_by()
+            )),
+            ("summary partial-day rows", signed_totals(recent.order_by(), "currency", "category")),
+            ("daily rollup refresh", signed_totals(
+                Transaction.objects.filter(user=user, date__gte=day_start, date__lt=day_end).annotate(day=TruncDate("date")),
+                "day", "currency", "category",
+            )),
+        ]
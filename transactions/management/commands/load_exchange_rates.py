@@ -0,0 +1,43 @@
+import csv
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from rest_framework.exceptions import ValidationError
+from transactions.models import ExchangeRate
+from transactions.services import validate_currency, bump_rates_version, iter_chunks
+
+class Command(BaseCommand):
+    help = "Load dated exchange rates (TRY per unit) from a CSV file with date,currency,rate columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file, e.g. rates.csv")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, path, batch_size, **options):
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                # a later line for the same currency and date wins
+                rates = list({(rate.currency, rate.date): rate for rate in self.read_rates(csv.DictReader(f))}.values())
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        # the whole file is applied or nothing is; existing (currency, date) rows are overwritten
+        with db_transaction.atomic():
+            for chunk in iter_chunks(rates, batch_size):
+                ExchangeRate.objects.bulk_create(
+                    chunk, update_conflicts=True, unique_fields=["currency", "date"], update_fields=["rate"],
+                )
+            db_transaction.on_commit(bump_rates_version)
+
+        self.stdout.write(self.style.SUCCESS(f"{len(rates)} exchange rates loaded"))
+
+    def read_rates(self, reader):
+        for line, row in enumerate(reader, start=2):
+            try:
+                rate = Decimal(row["rate"])
+                if rate <= 0:
+                    raise InvalidOperation
+                yield ExchangeRate(currency=validate_currency(row["currency"]), date=date.fromisoformat(row["date"].strip()), rate=rate)
+            except (KeyError, TypeError, ValueError, InvalidOperation, ValidationError):
+                raise CommandError(f"Line {line}: expected date (YYYY-MM-DD), currency and a positive rate, got {row}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from transactions.partitions import PartitioningError, convert_to_partitioned, maintain_partitions, month_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = "Partition the transactions table by month (PostgreSQL) and maintain its partitions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["convert", "maintain", "status"])
+        parser.add_argument("--months-ahead", type=int, help="Months of empty partitions to keep ahead of today")
+        parser.add_argument("--retain-months", type=int, help="Detach monthly partitions older than this many months (0 keeps all)")
+        parser.add_argument("--drop", action="store_true", help="Drop detached partitions instead of keeping them as tables")
+
+    def handle(self, *args, action, months_ahead=None, retain_months=None, drop=False, **options):
+        try:
+            if action == "convert":
+                copied = convert_to_partitioned(months_ahead)
+                self.stdout.write(self.style.SUCCESS(f"Partitioned the transactions table; {copied} rows copied"))
+            elif action == "maintain":
+                created, detached = maintain_partitions(months_ahead, retain_months, drop)
+                self.stdout.write(f"Created: {', '.join(created) or 'none'}")
+                self.stdout.write(f"{'Dropped' if drop else 'Detached'}: {', '.join(detached) or 'none'}")
+            elif not is_partitioned():
+                self.stdout.write("The transactions table is not partitioned")
+            else:
+                for (year, month), name in sorted(month_partitions().items()):
+                    self.stdout.write(f"{year:04d}-{month:02d}  {name}")
+        except PartitioningError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from transactions.models import Transaction
+from transactions.services import recategorize_transactions
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = "Apply the current category rules to stored transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only this user id (repeatable)")
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, user_ids=None, chunk_size=None, **options):
+        user_ids = user_ids or Transaction.objects.values_list("user_id", flat=True).distinct()
+        total = 0
+        for user in User.objects.filter(id__in=list(user_ids)).iterator():
+            updated = recategorize_transactions(user, chunk_size)
+            total += updated
+            self.stdout.write(f"{user.pk}: {updated} transactions updated")
+        self.stdout.write(self.style.SUCCESS(f"{total} transactions updated"))
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.23 on 2026-10-18 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_importbatch_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='error_summary',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='file_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='inserted_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='skipped_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # batches that already exist were imported synchronously, so they start out completed
+        migrations.AddField(
+            model_name='importbatch',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='importbatch',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='total_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_importbatch_error_summary_importbatch_file_path_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='rejected_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='rejects',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.23 on 2026-10-18 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_categoryrule'),
+    ]
+
+    operations = [
+        # the new index is built before the old one goes so list queries always have one
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'date', 'id'], name='transaction_user_date_id_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='transaction_user_id_8af7f1_idx',
+        ),
+    ]
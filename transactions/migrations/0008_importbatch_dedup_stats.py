@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_exchangerate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='dedup_probes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='dedup_seconds',
+            field=models.FloatField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the binary digest is filled in batches by 0010, then replaces unique_hash in 0011
+
+    dependencies = [
+        ('transactions', '0008_importbatch_dedup_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='unique_digest',
+            field=models.BinaryField(max_length=32, null=True),
+        ),
+    ]
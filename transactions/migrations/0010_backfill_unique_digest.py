@@ -0,0 +1,45 @@
+import hashlib
+from django.db import migrations, transaction
+
+BATCH_SIZE = 10000
+
+
+def to_digest(value):
+    # hashes written by imports are hex SHA-256; anything else is hashed so it stays unique
+    try:
+        digest = bytes.fromhex(value)
+    except ValueError:
+        digest = b''
+    return digest if len(digest) == 32 else hashlib.sha256(value.encode()).digest()
+
+
+def convert_hashes(apps, schema_editor, batch_size=BATCH_SIZE):
+    # one short transaction per id range, so no lock is held across the whole table;
+    # converted rows are skipped, so an interrupted run picks up where it stopped
+    Transaction = apps.get_model('transactions', 'Transaction')
+    last_id = 0
+    while True:
+        rows = list(
+            Transaction.objects.filter(id__gt=last_id, unique_digest__isnull=True)
+            .order_by('id').values_list('id', 'unique_hash')[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        with transaction.atomic():
+            Transaction.objects.bulk_update(
+                [Transaction(id=pk, unique_digest=to_digest(value)) for pk, value in rows], ['unique_digest'],
+            )
+
+
+class Migration(migrations.Migration):
+    # the batches commit one by one; rows written while this runs are converted by 0011
+    atomic = False
+
+    dependencies = [
+        ('transactions', '0009_transaction_unique_digest'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_hashes, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,32 @@
+from importlib import import_module
+from django.db import migrations, models
+
+
+def convert_remaining_hashes(apps, schema_editor):
+    # rows imported after 0010's batches; in this migration's transaction, right before NOT NULL
+    import_module('transactions.migrations.0010_backfill_unique_digest').convert_hashes(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0010_backfill_unique_digest'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_remaining_hashes, migrations.RunPython.noop, elidable=True),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='unique_hash',
+        ),
+        migrations.RenameField(
+            model_name='transaction',
+            old_name='unique_digest',
+            new_name='unique_hash',
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='unique_hash',
+            field=models.BinaryField(max_length=32),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations, models
+
+CONSTRAINT = 'transaction_user_hash_unique'
+USER_HASH_UNIQUE = models.UniqueConstraint(fields=['user', 'unique_hash'], name=CONSTRAINT)
+
+
+def drop_invalid_index(schema_editor, name):
+    # an interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+    # IF NOT EXISTS would keep and ADD CONSTRAINT ... USING INDEX then refuses
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)', [name])
+        row = cursor.fetchone()
+    if row and row[0]:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY {name}')
+
+
+def add_unique_constraint(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    if schema_editor.connection.vendor == 'postgresql':
+        # built without blocking writes, then attached to the table as the constraint;
+        # a valid index left by an earlier interrupted run is reused
+        table = Transaction._meta.db_table
+        drop_invalid_index(schema_editor, CONSTRAINT)
+        schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {CONSTRAINT} ON {table} (user_id, unique_hash)')
+        schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {CONSTRAINT} UNIQUE USING INDEX {CONSTRAINT}')
+    else:
+        # plain SQL: SQLite's add_constraint would rebuild the table from a state without it
+        schema_editor.execute(USER_HASH_UNIQUE.create_sql(Transaction, schema_editor))
+
+
+def remove_unique_constraint(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    schema_editor.execute(USER_HASH_UNIQUE.remove_sql(Transaction, schema_editor))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('transactions', '0011_transaction_binary_unique_hash'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='transaction',
+                    constraint=USER_HASH_UNIQUE,
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(add_unique_constraint, remove_unique_constraint),
+            ],
+        ),
+    ]
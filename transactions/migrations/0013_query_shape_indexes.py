@@ -0,0 +1,76 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:17
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def drop_invalid_index(schema_editor, name):
+    # an interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index that blocks the rerun
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)', [name])
+        row = cursor.fetchone()
+    if row and row[0]:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY {name}')
+
+
+# the transactions table keeps taking writes while these are built on PostgreSQL (plain
+# CREATE INDEX holds a SHARE lock for the whole build); other databases use the plain operations
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+        drop_invalid_index(schema_editor, self.index.name)
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class RemoveIndexConcurrentlyOnPostgres(RemoveIndexConcurrently):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.RemoveIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.RemoveIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+        drop_invalid_index(schema_editor, self.name)
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('transactions', '0012_transaction_user_hash_unique'),
+    ]
+
+    operations = [
+        # the covering index replaces (user, date, id); it is built first so list queries always have one
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'date', 'id'], include=('amount', 'currency', 'category'), name='transaction_user_date_cov_idx'),
+        ),
+        RemoveIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            name='transaction_user_date_id_idx',
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(models.F('user'), django.db.models.functions.text.Upper('category'), models.OrderBy(models.F('date'), descending=True), name='transaction_user_category_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('transaction_type', 'credit')), fields=['user', 'date', 'id'], name='transaction_credit_date_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('transaction_type', 'debit')), fields=['user', 'date', 'id'], name='transaction_debit_date_idx'),
+        ),
+    ]
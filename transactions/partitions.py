@@ -0,0 +1,236 @@
+"""Opt-in monthly range partitioning of the transactions table on PostgreSQL.
+
+The table is converted once with ``manage.py partition_transactions convert``; after
+that ``maintain`` (run monthly by celery beat) keeps partitions a few months ahead and
+detaches the ones older than the retention window. Queries filtered on ``date`` (the
+list/export ranges, KPI edge days, rollup refreshes) are pruned to the months they touch.
+
+PostgreSQL requires the partition key in every unique constraint, so on a partitioned
+table the primary key is (id, date) and the per-user hash constraint is
+(user_id, unique_hash, date). The hash already covers the row's date, so this accepts
+exactly the same rows as (user_id, unique_hash). Django's model state keeps the
+single-column key and the two-column constraint (see Transaction.Meta); no migration
+touches them once the table is partitioned.
+"""
+import logging
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from reports.models import DailyRollup
+from reports.versions import bump_data_version
+
+from .models import Transaction, ImportBatch
+
+logger = logging.getLogger(__name__)
+
+PARTITION_FORMAT = "{table}_p{year:04d}_{month:02d}"
+DEFAULT_SUFFIX = "_default"
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def add_months(year, month, months):
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def month_start(year, month):
+    return timezone.make_aware(datetime(year, month, 1))
+
+
+def partition_name(year, month, table=None):
+    return PARTITION_FORMAT.format(table=table or Transaction._meta.db_table, year=year, month=month)
+
+
+def require_postgresql():
+    if connection.vendor != "postgresql":
+        raise PartitioningError("Transaction partitioning needs PostgreSQL")
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [Transaction._meta.db_table])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def month_partitions():
+    """{(year, month): name} of the monthly partitions attached to the table."""
+    table = Transaction._meta.db_table
+    prefix = f"{table}_p"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+            " WHERE i.inhparent = %s::regclass",
+            [table],
+        )
+        names = [name for name, in cursor.fetchall()]
+    months = {}
+    for name in names:
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split("_")
+            months[(int(year), int(month))] = name
+    return months
+
+
+def create_month_partition(cursor, year, month):
+    table = Transaction._meta.db_table
+    upper = add_months(year, month, 1)
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(year, month)} PARTITION OF {table}"
+        " FOR VALUES FROM (%s) TO (%s)",
+        [month_start(year, month), month_start(*upper)],
+    )
+
+
+def create_month_partition_from_default(cursor, year, month):
+    """Create a monthly partition, moving its rows out of the default partition first.
+
+    PostgreSQL refuses to create a partition whose range has rows in the default partition,
+    so when there are any the default is detached, the month is created, the rows are moved
+    into it and the default is attached again. Returns the number of rows moved.
+    """
+    table = Transaction._meta.db_table
+    default = f"{table}{DEFAULT_SUFFIX}"
+    bounds = [month_start(year, month), month_start(*add_months(year, month, 1))]
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [default])
+    if cursor.fetchone()[0]:
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE date >= %s AND date < %s)", bounds)
+        has_rows = cursor.fetchone()[0]
+    else:
+        has_rows = False
+    if not has_rows:
+        create_month_partition(cursor, year, month)
+        return 0
+
+    cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+    create_month_partition(cursor, year, month)
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {default} WHERE date >= %s AND date < %s RETURNING *)"
+        f" INSERT INTO {table} SELECT * FROM moved",
+        bounds,
+    )
+    moved = cursor.rowcount
+    cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+    return moved
+
+
+def convert_to_partitioned(months_ahead=None):
+    """Rebuild the transactions table as a partitioned table, copying every row.
+
+    Runs in one transaction under an exclusive lock: reads and writes to transactions
+    wait until the copy commits, so run it in a maintenance window.
+    Returns the number of rows copied.
+    """
+    require_postgresql()
+    if is_partitioned():
+        raise PartitioningError("The transactions table is already partitioned")
+    months_ahead = settings.TRANSACTION_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+
+    table = Transaction._meta.db_table
+    old_table = f"{table}_unpartitioned"
+    sequence = f"{table}_id_part_seq"
+    user_table = get_user_model()._meta.db_table
+    batch_table = ImportBatch._meta.db_table
+
+    with transaction.atomic(), connection.schema_editor(atomic=False) as schema_editor, connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT min(date), max(date), max(id) FROM {table}")
+        first, last, max_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+        # column definitions only; the identity, keys and indexes are recreated below
+        cursor.execute(f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS) PARTITION BY RANGE (date)")
+        cursor.execute(f"CREATE SEQUENCE {sequence}")
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+
+        now = timezone.localtime()
+        first = timezone.localtime(first) if first else now
+        last = max(timezone.localtime(last), now) if last else now
+        year, month = first.year, first.month
+        end = add_months(last.year, last.month, months_ahead)
+        while (year, month) <= end:
+            create_month_partition(cursor, year, month)
+            year, month = add_months(year, month, 1)
+        # rows dated outside the monthly partitions (old history, far future) land here
+        cursor.execute(f"CREATE TABLE {table}{DEFAULT_SUFFIX} PARTITION OF {table} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {old_table}")
+        copied = cursor.rowcount
+        cursor.execute("SELECT setval(%s, %s, %s)", [sequence, max_id or 1, max_id is not None])
+        cursor.execute(f"DROP TABLE {old_table}")
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, date)")
+        for constraint in Transaction._meta.constraints:
+            columns = [Transaction._meta.get_field(name).column for name in constraint.fields]
+            cursor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {constraint.name} UNIQUE ({', '.join(columns)}, date)"
+            )
+        for column, target in (("user_id", user_table), ("batch_id", batch_table)):
+            cursor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fk FOREIGN KEY ({column})"
+                f" REFERENCES {target} (id) DEFERRABLE INITIALLY DEFERRED"
+            )
+        # the batch delete cascade looks rows up by batch_id
+        cursor.execute(f"CREATE INDEX {table}_batch_id_idx ON {table} (batch_id)")
+        for index in Transaction._meta.indexes:
+            schema_editor.execute(index.create_sql(Transaction, schema_editor))
+    return copied
+
+
+def maintain_partitions(months_ahead=None, retain_months=None, drop=False):
+    """Create the partitions up to months_ahead and detach those older than retain_months.
+
+    Returns (created, detached) partition names. Rows already stored in the default
+    partition for a month being created are moved into the new partition. Detached
+    partitions are kept as plain tables for archiving unless drop is set. Their daily
+    rollups are deleted with them: reports must match what a rebuild from the remaining
+    rows produces, so a detached month leaves the reports at once rather than at the
+    next rebuild_daily_rollups.
+    """
+    require_postgresql()
+    if not is_partitioned():
+        raise PartitioningError("The transactions table is not partitioned; run partition_transactions convert")
+    months_ahead = settings.TRANSACTION_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    retain_months = settings.TRANSACTION_PARTITION_RETAIN_MONTHS if retain_months is None else retain_months
+
+    table = Transaction._meta.db_table
+    now = timezone.localtime()
+    existing = month_partitions()
+    created, detached = [], []
+    users = set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            year, month = add_months(now.year, now.month, offset)
+            if (year, month) not in existing:
+                moved = create_month_partition_from_default(cursor, year, month)
+                if moved:
+                    logger.info(f"Moved {moved} rows from the default partition into {partition_name(year, month)}")
+                created.append(partition_name(year, month))
+
+        if retain_months:
+            cutoff = add_months(now.year, now.month, -retain_months)
+            for key, name in sorted(existing.items()):
+                if key < cutoff:
+                    cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                    if drop:
+                        cursor.execute(f"DROP TABLE {name}")
+                    detached.append(name)
+                    # rollup days are local dates, the same calendar as the partition bounds
+                    rollups = DailyRollup.objects.filter(
+                        day__gte=month_start(*key).date(), day__lt=month_start(*add_months(*key, 1)).date(),
+                    )
+                    users.update(rollups.values_list("user_id", flat=True).distinct())
+                    rollups.delete()
+        for user_id in users:
+            transaction.on_commit(lambda user_id=user_id: bump_data_version(user_id))
+    return created, detached
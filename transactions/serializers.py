@@ -1,14 +1,115 @@
+from decimal import Decimal
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Transaction
+from .models import Transaction, ImportBatch, CategoryRule
+from .categorization import check_user_regex
 
 class MessageResponseSerializer(serializers.Serializer):
     message = serializers.CharField()
     
+class ImportResultSerializer(MessageResponseSerializer):
+    inserted = serializers.IntegerField()
+    skipped = serializers.IntegerField()
+    rejected = serializers.IntegerField()
+    rejects = serializers.ListField(child=serializers.DictField())
+    dedup_seconds = serializers.FloatField()
+
 class TransactionUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
 
 class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
-        fields = "__all__"
-        read_only_fields = ("user", "unique_hash", "batch")
\ No newline at end of file
+        exclude = ("unique_hash",)
+        read_only_fields = ("user", "batch")
+
+LIST_FIELDS = ("id", "date", "amount", "currency", "transaction_type", "description", "category")
+
+
+class TransactionReadSerializer(serializers.ModelSerializer):
+    # describes the list payload for the schema; TransactionListSerializer borrows its field converters
+    class Meta:
+        model = Transaction
+        fields = LIST_FIELDS
+        read_only_fields = fields
+
+
+class TransactionListSerializer(serializers.BaseSerializer):
+    """Turns ``.values()`` rows into response dicts without model instances or per-row field binding.
+
+    ``fields`` restricts the output to a subset of ``LIST_FIELDS`` (sparse fieldsets).
+    """
+    _converters = None
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.field_names = tuple(fields) if fields else LIST_FIELDS
+        # many=True shares one child, so this runs once per response rather than once per row
+        self.row_converters = {**self.converters(), "date": self.datetime_converter(), "amount": self.amount_converter()}
+
+    @classmethod
+    def converters(cls):
+        # field introspection happens once per process instead of once per serializer
+        if cls._converters is None:
+            cls._converters = {name: field.to_representation for name, field in TransactionReadSerializer().fields.items()}
+        return cls._converters
+
+    @staticmethod
+    def datetime_converter():
+        # same output as DateTimeField with the default ISO format, with the zone looked up once
+        tz = timezone.get_current_timezone()
+
+        def convert(value):
+            text = value.astimezone(tz).isoformat()
+            return text[:-6] + "Z" if text.endswith("+00:00") else text
+        return convert
+
+    @staticmethod
+    def amount_converter():
+        exponent = Decimal(1).scaleb(-Transaction._meta.get_field("amount").decimal_places)
+        return lambda value: "{:f}".format(value.quantize(exponent))
+
+    @classmethod
+    def parse_fields(cls, value):
+        if not value:
+            return None
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = sorted(set(names) - set(LIST_FIELDS))
+        if unknown:
+            raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}"})
+        return [name for name in LIST_FIELDS if name in names]
+
+    def to_representation(self, row):
+        converters = self.row_converters
+        return {
+            name: None if row[name] is None else converters[name](row[name])
+            for name in self.field_names
+        }
+
+class ImportBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportBatch
+        fields = (
+            "id", "idempotency_key", "status", "total_rows", "inserted_rows", "skipped_rows",
+            "rejected_rows", "rejects", "dedup_seconds", "dedup_probes", "error_summary", "created_at", "started_at", "finished_at",
+        )
+        read_only_fields = fields
+
+
+class CategoryRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CategoryRule
+        fields = ("id", "category", "pattern", "match_type", "priority", "is_active", "updated_at")
+        read_only_fields = ("updated_at",)
+
+    def validate(self, attrs):
+        match_type = attrs.get("match_type", getattr(self.instance, "match_type", CategoryRule.KEYWORD))
+        pattern = attrs.get("pattern", getattr(self.instance, "pattern", ""))
+        if match_type == CategoryRule.REGEX:
+            try:
+                check_user_regex(pattern, settings.CATEGORY_REGEX_MAX_LENGTH)
+            except ValueError as e:
+                raise serializers.ValidationError({"pattern": str(e)})
+        return attrs
+
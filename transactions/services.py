@@ -1,13 +1,27 @@
 import csv
 import hashlib
-from io import TextIOWrapper
-from collections import Counter
+import os
+import threading
+import time as clock
+import django
+from bisect import bisect_right
+from functools import lru_cache
+from io import StringIO, TextIOWrapper
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, time
 from rest_framework.exceptions import ValidationError
-from django.utils.timezone import make_aware, is_aware
-from django.db import transaction as db_transaction
-from .models import Transaction, ImportBatch
-from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.timezone import make_aware, is_aware, now, localdate
+from django.db import IntegrityError, transaction as db_transaction
+from bank_kpi_backend import metrics
+from .models import Transaction, ImportBatch, CategoryRule, ExchangeRate
+from .categorization import CategoryMatcher, keyword_rules
+from .dedup import load_bloom_filter, save_bloom_filter
+from reports.rollups import refresh_daily_rollups, refresh_batch_rollups
+from decimal import Decimal, InvalidOperation
 
 # predefined categories with keywords
 CATEGORY_KEYWORDS = {
@@ -19,25 +33,94 @@ CATEGORY_KEYWORDS = {
     "Utilities": ["elektrik", "su", "internet", "fatura"],
 }
 
-# predefined exchange rates for currency conversion
-# could be fetched from an API in a real application
+# predefined exchange rates for currency conversion, used for currencies
+# without rows in ExchangeRate (see load_exchange_rates)
 EXCHANGE_RATES = {
     'USD': Decimal('40.89'),
     'EUR': Decimal('47.81'),
     'TRY': Decimal('1'),
 }
 
+category_matcher = CategoryMatcher.from_keywords(CATEGORY_KEYWORDS)
+
 # could be change with ml/nlp model in future
 def detect_category(description: str) -> str:
-    desc_lower = description.lower()
-    scores = Counter()
+    return category_matcher.categorize(description)
+
+def detect_categories(descriptions) -> list[str]:
+    return category_matcher.categorize_many(descriptions)
+
+RULES_VERSION_KEY = "category-rules:version:{}"
+_user_matchers = OrderedDict()
+_user_matchers_lock = threading.Lock()
+
+def bump_rules_version(user_id=None):
+    cache.set(RULES_VERSION_KEY.format(user_id or "global"), clock.time_ns(), None)
+
+def get_rules_version(user_id) -> tuple:
+    # lives in the shared cache so a rule edit in one process reaches every worker
+    keys = [RULES_VERSION_KEY.format("global"), RULES_VERSION_KEY.format(user_id)]
+    versions = cache.get_many(keys)
+    return tuple(versions.get(key) or cache.get_or_set(key, clock.time_ns, None) for key in keys)
+
+def get_category_matcher(user_id):
+    # rules are only queried when the version stamp changes, not per import and never per row
+    version = get_rules_version(user_id)
+    with _user_matchers_lock:
+        cached = _user_matchers.get(user_id)
+        if cached and cached[0] == version:
+            _user_matchers.move_to_end(user_id)
+            return cached[1]
+
+    rules = CategoryRule.objects.filter(Q(user__isnull=True) | Q(user_id=user_id), is_active=True)
+    # the user's own rules come first so they win ties against global and built-in ones
+    rules = sorted(rules, key=lambda rule: rule.user_id is None)
+    matcher = CategoryMatcher(
+        [(rule.category, rule.pattern, rule.match_type == CategoryRule.REGEX, rule.priority) for rule in rules]
+        + keyword_rules(CATEGORY_KEYWORDS)
+    )
+
+    with _user_matchers_lock:
+        _user_matchers[user_id] = (version, matcher)
+        if len(_user_matchers) > settings.CATEGORY_MATCHER_CACHE_SIZE:
+            _user_matchers.popitem(last=False)
+    return matcher
+
+@lru_cache(maxsize=32)
+def _worker_matcher(rules: tuple):
+    return CategoryMatcher(rules)
 
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in desc_lower:
-                scores[category] += 1
+def recategorize_transactions(user, chunk_size: int | None = None) -> int:
+    # applies the current rules to stored rows with one UPDATE per changed category per chunk
+    chunk_size = chunk_size or settings.TRANSACTION_IMPORT_CHUNK_SIZE
+    matcher = get_category_matcher(user.id)
+    updated = 0
+    last_id = 0
 
-    return scores.most_common(1)[0][0] if scores else "Uncategorized"
+    while True:
+        rows = list(
+            Transaction.objects.filter(user=user, id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "description", "category", "date")[:chunk_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        changes = {}
+        days = set()
+        categories = matcher.categorize_many(description or "" for _, description, _, _ in rows)
+        for (tx_id, _, category, date), new_category in zip(rows, categories):
+            if new_category != category:
+                changes.setdefault(new_category, []).append(tx_id)
+                days.add(localdate(date))
+
+        with db_transaction.atomic():
+            for category, ids in changes.items():
+                updated += Transaction.objects.filter(id__in=ids).update(category=category)
+            refresh_daily_rollups(user.id, days)
+
+    return updated
 
 def validate_currency(value: str) -> str:
     value = value.strip().upper()
@@ -45,39 +128,306 @@ def validate_currency(value: str) -> str:
         raise ValidationError("Currency must be a 3-letter.")
     return value
 
-def generate_unique_hash(user_id, row):
+def generate_unique_hash(user_id, row) -> bytes:
+    # the 32-byte digest of what older imports stored as 64 hex characters
     hash_input = f"{user_id}-{row['date']}-{row['amount']}-{row['description']}"
-    return hashlib.sha256(hash_input.encode()).hexdigest()
+    return hashlib.sha256(hash_input.encode()).digest()
+
+def iter_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+CSV_COLUMNS = ("date", "amount", "currency", "type", "description")
+MAX_AMOUNT = Decimal("1e10")  # Transaction.amount is max_digits=12, decimal_places=2
+
+def normalize_row(user_id, row, matcher=category_matcher) -> dict:
+    # the hash is taken over the raw values so dedup matches what earlier imports stored
+    try:
+        date = make_aware(datetime.strptime(row['date'], "%Y-%m-%d"))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date: {row['date']!r}")
+
+    try:
+        amount = Decimal(row['amount'].strip())
+    except (AttributeError, InvalidOperation):
+        raise ValueError(f"Invalid amount: {row['amount']!r}")
+    if not amount.is_finite() or abs(amount) >= MAX_AMOUNT or amount.as_tuple().exponent < -2:
+        raise ValueError(f"Invalid amount: {row['amount']!r}")
+
+    try:
+        currency = validate_currency(row['currency'] or "")
+    except ValidationError as e:
+        raise ValueError(str(e.detail[0]))
+
+    transaction_type = (row['type'] or "").strip().lower()
+    if transaction_type not in (Transaction.CREDIT, Transaction.DEBIT):
+        raise ValueError(f"Unknown type: {row['type']!r}")
+
+    description = row['description'] or ""
+    return {
+        "date": date,
+        "amount": amount,
+        "currency": currency,
+        "transaction_type": transaction_type,
+        "description": description,
+        "category": matcher.categorize(description),
+        "unique_hash": generate_unique_hash(user_id, row),
+    }
+
+def check_columns(fieldnames):
+    missing = [column for column in CSV_COLUMNS if column not in (fieldnames or ())]
+    if missing:
+        raise ValidationError(f"CSV is missing columns: {', '.join(missing)}")
+
+def parse_transactions(csv_file, user_id, on_reject, matcher=category_matcher):
+    # rows are validated one at a time; invalid ones go to on_reject(line, error, row) instead of aborting
+    reader = csv.DictReader(TextIOWrapper(csv_file, encoding='utf-8-sig'))
+    check_columns(reader.fieldnames)
+
+    for row in reader:
+        try:
+            yield normalize_row(user_id, row, matcher)
+        except ValueError as e:
+            on_reject(reader.line_num, str(e), row)
+
+def split_byte_ranges(path, range_bytes: int):
+    # ranges end on line boundaries outside quoted fields: a range whose quote count is odd
+    # (an escaped "" counts twice) stops inside a quoted newline and is extended line by line
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            quotes = (f.read(range_bytes) + f.readline()).count(b'"')
+            while quotes % 2:
+                line = f.readline()
+                if not line:
+                    break
+                quotes += line.count(b'"')
+            ranges.append((start, f.tell()))
+            start = f.tell()
+    return ranges
+
+def _parse_byte_range(path, start, end, fieldnames, user_id, rules):
+    # runs in a worker process: parse, hash and categorize without touching the database
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    reader = csv.DictReader(StringIO(data.decode("utf-8"), newline=""), fieldnames=fieldnames)
+    matcher = _worker_matcher(rules)
+    rows, rejects = [], []
+    for row in reader:
+        try:
+            rows.append(normalize_row(user_id, row, matcher))
+        except ValueError as e:
+            rejects.append((reader.line_num, str(e), row))
+    return rows, rejects, data.count(b"\n")
+
+def parse_transactions_parallel(path, user_id, on_reject, workers: int, matcher=category_matcher):
+    with open(path, "rb") as f:
+        fieldnames = next(csv.reader([f.readline().decode("utf-8-sig")]), None)
+    check_columns(fieldnames)
+
+    ranges = iter(split_byte_ranges(path, settings.TRANSACTION_IMPORT_RANGE_BYTES))
+    line_offset = 1  # header
+
+    # results are consumed in file order so dedup sees rows exactly as the serial parser would;
+    # only a bounded number of ranges is in flight to keep memory flat
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+        pending = deque()
+        for byte_range in ranges:
+            pending.append(executor.submit(_parse_byte_range, path, *byte_range, fieldnames, user_id, matcher.rules))
+            if len(pending) >= workers * 2:
+                break
+
+        while pending:
+            rows, rejects, line_count = pending.popleft().result()
+            byte_range = next(ranges, None)
+            if byte_range:
+                pending.append(executor.submit(_parse_byte_range, path, *byte_range, fieldnames, user_id, matcher.rules))
+
+            for line, error, row in rejects:
+                on_reject(line_offset + line, error, row)
+            yield from rows
+            line_offset += line_count
+
+def find_new_rows(user, rows, bloom=None) -> tuple[list, bool]:
+    """Drops rows repeated in the chunk or already stored; returns (new rows, probed).
+
+    Stored hashes are looked up with one IN query per chunk. With a Bloom filter only hashes
+    it may contain are probed, and a chunk of certainly new rows skips the query entirely.
+    """
+    pending = {}
+    for row in rows:
+        pending.setdefault(row["unique_hash"], row)
+
+    candidates = list(pending) if bloom is None else [unique_hash for unique_hash in pending if unique_hash in bloom]
+    # bytes() because PostgreSQL hands bytea back as memoryview
+    existing = {
+        bytes(unique_hash)
+        for unique_hash in Transaction.objects.filter(user=user, unique_hash__in=candidates).values_list("unique_hash", flat=True)
+    } if candidates else set()
+    return [row for unique_hash, row in pending.items() if unique_hash not in existing], bool(candidates)
 
-def import_transactions(user, csv_file, idempotency_key: str):
+def insert_transactions(user, batch, rows, bloom=None) -> int:
+    # ignore_conflicts covers rows inserted concurrently by another upload, and hashes the
+    # Bloom filter has not seen yet (rows added outside imports)
+    Transaction.objects.bulk_create([Transaction(user=user, batch=batch, **row) for row in rows], ignore_conflicts=True)
+    if bloom is not None:
+        for row in rows:
+            bloom.add(row["unique_hash"])
+    return len(rows)
+
+def _import_chunks(batch, csv_file, chunk_size=None, on_chunk=None, path=None, workers=None):
+    import_started = clock.perf_counter()
+    chunk_size = chunk_size or settings.TRANSACTION_IMPORT_CHUNK_SIZE
+    workers = workers or settings.TRANSACTION_IMPORT_WORKERS
+    batch.total_rows = batch.inserted_rows = batch.skipped_rows = batch.rejected_rows = batch.dedup_probes = 0
+    batch.dedup_seconds = 0
+    batch.rejects = []
+
+    def reject(line, error, row):
+        batch.total_rows += 1
+        batch.rejected_rows += 1
+        if len(batch.rejects) < settings.TRANSACTION_IMPORT_MAX_REJECTS:
+            batch.rejects.append({"line": line, "error": error, "row": row})
+
+    matcher = get_category_matcher(batch.user_id)
+    if path and workers > 1:
+        parsed = parse_transactions_parallel(path, batch.user_id, reject, workers, matcher)
+    else:
+        parsed = parse_transactions(csv_file, batch.user_id, reject, matcher)
+
+    started = clock.perf_counter()
+    bloom = load_bloom_filter(batch.user_id) if settings.TRANSACTION_DEDUP_BLOOM else None
+    batch.dedup_seconds += clock.perf_counter() - started
+    for rows in iter_chunks(parsed, chunk_size):
+        started = clock.perf_counter()
+        new_rows, probed = find_new_rows(batch.user, rows, bloom)
+        batch.dedup_seconds += clock.perf_counter() - started
+        batch.dedup_probes += probed
+
+        with db_transaction.atomic():
+            inserted = insert_transactions(batch.user, batch, new_rows, bloom)
+        batch.total_rows += len(rows)
+        batch.inserted_rows += inserted
+        batch.skipped_rows = batch.total_rows - batch.inserted_rows - batch.rejected_rows
+        if on_chunk:
+            on_chunk(batch)
+
+    if bloom is not None:
+        save_bloom_filter(batch.user_id, bloom)
+    # counted from the table so conflicts skipped by bulk_create are not reported as inserted
+    batch.inserted_rows = Transaction.objects.filter(batch=batch).count()
+    batch.skipped_rows = batch.total_rows - batch.inserted_rows - batch.rejected_rows
+    refresh_batch_rollups(batch)
+    metrics.record_import(batch.total_rows, clock.perf_counter() - import_started)
+
+def create_batch(user, idempotency_key: str, **fields):
+    # (batch, created). the exists checks before this are only a fast path: two requests with
+    # the same key can both pass them, and the unique key then makes the slower one reuse the
+    # batch of the first instead of failing with an IntegrityError
+    try:
+        with db_transaction.atomic():
+            return ImportBatch.objects.create(user=user, idempotency_key=idempotency_key, **fields), True
+    except IntegrityError:
+        try:
+            return ImportBatch.objects.get(idempotency_key=idempotency_key, user=user), False
+        except ImportBatch.DoesNotExist:
+            # keys are unique across users
+            raise ValidationError("Idempotency-Key is already in use")
+
+def import_transactions(user, csv_file, idempotency_key: str, chunk_size: int | None = None, workers: int | None = None):
     if ImportBatch.objects.filter(idempotency_key=idempotency_key, user=user).exists():
         return False
-    
-    text_file = TextIOWrapper(csv_file, encoding='utf-8-sig')
-    reader = csv.DictReader(text_file)
 
     with db_transaction.atomic():
-        batch = ImportBatch.objects.create(user=user, idempotency_key=idempotency_key)
-
-        for row in reader:
-            currency = validate_currency(row['currency'])
-            unique_hash = generate_unique_hash(user.id, row)
-            category = detect_category(row['description'])
-
-            Transaction.objects.get_or_create(
-                unique_hash=unique_hash,
-                defaults={
-                    "user": user,
-                    "batch": batch,
-                    "date": make_aware(datetime.strptime(row['date'], "%Y-%m-%d")),
-                    "amount": row['amount'],
-                    "currency": currency,
-                    "transaction_type": row['type'],
-                    "description": row['description'],
-                    "category": category,
-                }
+        batch, created = create_batch(user, idempotency_key, status=ImportBatch.PROCESSING, started_at=now())
+        if not created:
+            return False
+        # large uploads are already on disk, which the parallel parser needs
+        path = csv_file.temporary_file_path() if hasattr(csv_file, "temporary_file_path") else None
+        _import_chunks(batch, csv_file, chunk_size, path=path, workers=workers)
+        batch.status = ImportBatch.COMPLETED
+        batch.finished_at = now()
+        batch.save()
+
+    return {
+        "inserted": batch.inserted_rows,
+        "skipped": batch.skipped_rows,
+        "rejected": batch.rejected_rows,
+        "rejects": batch.rejects,
+        "dedup_seconds": batch.dedup_seconds,
+    }
+
+def spool_upload(batch, uploaded_file) -> str:
+    os.makedirs(settings.IMPORT_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(settings.IMPORT_SPOOL_DIR, f"batch-{batch.pk}.csv")
+    with open(path, "wb") as spooled:
+        for chunk in uploaded_file.chunks():
+            spooled.write(chunk)
+    return path
+
+def enqueue_import(user, uploaded_file, idempotency_key: str):
+    # a retried upload gets the job created by the first attempt
+    batch = ImportBatch.objects.filter(idempotency_key=idempotency_key, user=user).first()
+    if batch:
+        return batch, False
+
+    with db_transaction.atomic():
+        batch, created = create_batch(user, idempotency_key)
+        if not created:
+            return batch, False
+        batch.file_path = spool_upload(batch, uploaded_file)
+        batch.save(update_fields=["file_path"])
+    return batch, True
+
+PROGRESS_FIELDS = [
+    "status", "total_rows", "inserted_rows", "skipped_rows", "rejected_rows", "rejects", "dedup_seconds", "dedup_probes",
+    "error_summary", "started_at", "finished_at",
+]
+
+def process_spooled_import(batch_id: int, chunk_size: int | None = None):
+    batch = ImportBatch.objects.select_related("user").get(pk=batch_id)
+    if batch.status == ImportBatch.COMPLETED:
+        return batch
+
+    batch.status = ImportBatch.PROCESSING
+    batch.started_at = now()
+    batch.error_summary = ""
+    batch.save(update_fields=PROGRESS_FIELDS)
+
+    # every chunk commits on its own so pollers see progress; a rerun skips rows already written
+    try:
+        with open(batch.file_path, "rb") as csv_file:
+            _import_chunks(
+                batch, csv_file, chunk_size,
+                on_chunk=lambda b: b.save(update_fields=PROGRESS_FIELDS),
+                path=batch.file_path,
             )
-            
+    except Exception as e:
+        # chunks committed before the failure stay, so their days still need rolling up
+        refresh_batch_rollups(batch)
+        batch.status = ImportBatch.FAILED
+        batch.error_summary = str(e)
+        batch.finished_at = now()
+        batch.save(update_fields=PROGRESS_FIELDS)
+        raise
+
+    batch.status = ImportBatch.COMPLETED
+    batch.finished_at = now()
+    batch.save(update_fields=PROGRESS_FIELDS)
+    os.remove(batch.file_path)
+    return batch
+
 def get_filtered_transactions(user, start_date=None, end_date=None, transaction_type=None, category=None):
     qs = Transaction.objects.filter(user=user)
 
@@ -101,21 +451,83 @@ def get_filtered_transactions(user, start_date=None, end_date=None, transaction_
     if category:
         qs = qs.filter(category__iexact=category)
 
-    return qs.order_by("-date")
+    # id breaks ties between rows of the same date so page and cursor boundaries are stable
+    return qs.order_by("-date", "-id")
 
 
-def convert_amount(amount: Decimal, from_currency: str, to_currency: str) -> Decimal:
-    if from_currency == to_currency:
-        return amount
+RATES_VERSION_KEY = "exchange-rates:version"
+_rate_table = None
+_rate_table_lock = threading.Lock()
+
+def bump_rates_version():
+    cache.set(RATES_VERSION_KEY, clock.time_ns(), None)
+
+def get_rates_version():
+    return cache.get_or_set(RATES_VERSION_KEY, clock.time_ns, None)
+
+class RateTable:
+    """TRY value of each currency by date, resolved to the nearest earlier loaded rate.
 
-    rate_from = EXCHANGE_RATES[from_currency]
-    rate_to = EXCHANGE_RATES[to_currency]
+    Currencies without loaded rates fall back to EXCHANGE_RATES; a day before the first
+    loaded rate uses the earliest one.
+    """
+    def __init__(self, rows):
+        self.dates = {}
+        self.rates = {}
+        for currency, day, rate in rows:
+            self.dates.setdefault(currency, []).append(day)
+            self.rates.setdefault(currency, []).append(rate)
 
-    if from_currency == "TRY":
-        return amount / rate_to
+    def is_dated(self, currency: str) -> bool:
+        return currency in self.dates
+
+    def dated_currencies(self) -> list[str]:
+        return list(self.dates)
+
+    def currencies(self) -> list[str]:
+        return sorted(set(EXCHANGE_RATES) | set(self.dates))
+
+    def rate(self, currency: str, day=None) -> Decimal:
+        dates = self.dates.get(currency)
+        if dates:
+            index = len(dates) - 1 if day is None else bisect_right(dates, day) - 1
+            return self.rates[currency][max(index, 0)]
+        if currency in EXCHANGE_RATES:
+            return EXCHANGE_RATES[currency]
+        raise ValidationError(f"No exchange rate for currency {currency}.")
+
+def get_rate_table() -> RateTable:
+    # the whole table is small, so it is loaded once per process and per version stamp
+    global _rate_table
+    version = get_rates_version()
+    with _rate_table_lock:
+        if _rate_table and _rate_table[0] == version:
+            return _rate_table[1]
+
+    table = RateTable(ExchangeRate.objects.order_by("currency", "date").values_list("currency", "date", "rate"))
+    with _rate_table_lock:
+        _rate_table = (version, table)
+    return table
+
+def convert_amount(amount: Decimal, from_currency: str, to_currency: str, day=None) -> Decimal:
+    # day=None converts at the latest known rate
+    if from_currency == to_currency:
+        return amount
 
-    if to_currency == "TRY":
-        return amount * rate_from
+    table = get_rate_table()
+    return amount * table.rate(from_currency, day) / table.rate(to_currency, day)
 
-    amount_in_try = amount * rate_from
-    return amount_in_try / rate_to
\ No newline at end of file
+def convert_amounts(items, to_currency: str) -> list[Decimal]:
+    """Converts (amount, currency, day) items in one pass; each (currency, day) rate is resolved once."""
+    table = get_rate_table()
+    factors = {}
+    converted = []
+    for amount, currency, day in items:
+        if currency == to_currency:
+            converted.append(amount)
+            continue
+        factor = factors.get((currency, day))
+        if factor is None:
+            factor = factors[(currency, day)] = (table.rate(currency, day), table.rate(to_currency, day))
+        converted.append(amount * factor[0] / factor[1])
+    return converted
\ No newline at end of file
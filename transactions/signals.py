@@ -0,0 +1,14 @@
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import CategoryRule, ExchangeRate
+from .services import bump_rules_version, bump_rates_version
+
+@receiver([post_save, post_delete], sender=CategoryRule)
+def invalidate_category_rules(sender, instance, **kwargs):
+    # bumped after commit so no process can cache the old rules under the new version
+    db_transaction.on_commit(lambda: bump_rules_version(instance.user_id))
+
+@receiver([post_save, post_delete], sender=ExchangeRate)
+def invalidate_exchange_rates(sender, instance, **kwargs):
+    db_transaction.on_commit(bump_rates_version)
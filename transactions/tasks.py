@@ -0,0 +1,33 @@
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from transactions.services import process_spooled_import, recategorize_transactions
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def process_import_batch(batch_id):
+    try:
+        batch = process_spooled_import(batch_id)
+    except Exception as e:
+        logger.error(f"Import batch {batch_id} failed: {e}")
+        raise
+    logger.info(f"Import batch {batch_id} finished: {batch.inserted_rows} inserted, {batch.skipped_rows} skipped")
+
+@shared_task
+def recategorize_user_transactions(user_id):
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is None:
+        return 0
+    updated = recategorize_transactions(user)
+    logger.info(f"Recategorized {updated} transactions of user {user_id}")
+    return updated
+
+@shared_task
+def maintain_transaction_partitions():
+    # a no-op until the table has been converted with partition_transactions convert
+    from transactions.partitions import is_partitioned, maintain_partitions
+    if not is_partitioned():
+        return
+    created, detached = maintain_partitions()
+    logger.info(f"Transaction partitions created: {created}, detached: {detached}")
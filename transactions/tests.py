@@ -1,10 +1,36 @@
+import csv
+import gzip
+import hashlib
+import json
 import pytest
+from io import BytesIO, StringIO
+from collections import Counter
+from importlib import import_module
 from datetime import datetime
 from django.utils import timezone
 from django.contrib.auth.models import User
-from transactions.models import Transaction, ImportBatch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.db.models import QuerySet
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+from rest_framework.exceptions import ValidationError
+from transactions.models import Transaction, ImportBatch, CategoryRule
 from transactions.services import get_filtered_transactions
-from transactions.services import detect_category
+from transactions.services import detect_category, detect_categories, CATEGORY_KEYWORDS
+from transactions.categorization import CategoryMatcher
+from transactions.services import import_transactions, enqueue_import, parse_transactions, parse_transactions_parallel
+from transactions.services import process_spooled_import, get_category_matcher, normalize_row, generate_unique_hash, CSV_COLUMNS
+from transactions import views as transaction_views
+from transactions import dedup
+from transactions.dedup import load_bloom_filter, save_bloom_filter
+from transactions.export import accepts_gzip
+from transactions.tasks import recategorize_user_transactions
+from transactions.management.commands.explain_queries import plan_indexes
+from transactions.partitions import add_months, maintain_partitions, partition_name
+from reports.models import DailyRollup
+from reports.rollups import refresh_daily_rollups
 
 @pytest.fixture
 def users_and_transactions(db):
@@ -15,24 +41,24 @@ def users_and_transactions(db):
     Transaction.objects.create(
         user=user, batch=batch, date=timezone.make_aware(datetime(2025, 7, 1)),
         amount=4500.00, currency="TRY", transaction_type="credit",
-        description="Satış: Fatura #1023", category="Sales", unique_hash="hash1"
+        description="Satış: Fatura #1023", category="Sales", unique_hash=b"hash1"
     )
     Transaction.objects.create(
         user=user, batch=batch, date=timezone.make_aware(datetime(2025, 7, 1)),
         amount=-1200.00, currency="TRY", transaction_type="debit",
-        description="Kira Ödemesi", category="Rent", unique_hash="hash2"
+        description="Kira Ödemesi", category="Rent", unique_hash=b"hash2"
     )
     Transaction.objects.create(
         user=user, batch=batch, date=timezone.make_aware(datetime(2025, 7, 1)),
         amount=-500.00, currency="TRY", transaction_type="debit",
-        description="Yemek Gideri", category="Food", unique_hash="hash3"
+        description="Yemek Gideri", category="Food", unique_hash=b"hash3"
     )
 
     other_batch = ImportBatch.objects.create(user=other_user, idempotency_key="other-key")
     Transaction.objects.create(
         user=other_user, batch=other_batch, date=timezone.make_aware(datetime(2025, 7, 1)),
         amount=1000.00, currency="TRY", transaction_type="credit",
-        description="Başka kullanıcı", category="Other", unique_hash="hash4"
+        description="Başka kullanıcı", category="Other", unique_hash=b"hash4"
     )
     return user
 
@@ -69,3 +95,594 @@ def test_combined_filters(users_and_transactions):
 
 def test_category_defaults_to_uncategorized():
     assert detect_category("Bilinmeyen bir açıklama") == "Uncategorized"
+
+CSV_HEADER = "date,amount,currency,type,description\n"
+
+def make_csv(*lines):
+    return BytesIO((CSV_HEADER + "".join(f"{line}\n" for line in lines)).encode("utf-8"))
+
+def test_import_inserts_rows_in_chunks(db):
+    user = User.objects.create_user(username="importer", password="pass1234")
+    csv_file = make_csv(
+        "2025-07-01,4500.00,try,credit,Satış: Fatura #1",
+        "2025-07-02,-1200.00,TRY,debit,Kira Ödemesi",
+        "2025-07-03,-99.00,USD,debit,CRM aylık lisans",
+    )
+    result = import_transactions(user, csv_file, "import-key", chunk_size=2)
+
+    assert result.pop("dedup_seconds") >= 0
+    assert result == {"inserted": 3, "skipped": 0, "rejected": 0, "rejects": []}
+    assert Transaction.objects.filter(user=user).count() == 3
+    assert Transaction.objects.get(description="Kira Ödemesi").category == "Rent"
+    assert Transaction.objects.get(description="Satış: Fatura #1").currency == "TRY"
+
+def test_import_skips_duplicate_rows(db):
+    user = User.objects.create_user(username="importer", password="pass1234")
+    rows = ("2025-07-01,4500.00,TRY,credit,Satış", "2025-07-02,-1200.00,TRY,debit,Kira")
+    import_transactions(user, make_csv(*rows), "first-key")
+
+    # the repeated row inside the file and both rows of the earlier upload are skipped
+    result = import_transactions(user, make_csv(*rows, rows[0], "2025-07-03,-10.00,TRY,debit,Kalem"), "second-key", chunk_size=1)
+
+    assert result["inserted"] == 1
+    assert result["skipped"] == 3
+    assert Transaction.objects.filter(user=user).count() == 3
+
+def test_bloom_filter_skips_probes_for_new_chunks(db, settings, django_capture_on_commit_callbacks):
+    settings.TRANSACTION_DEDUP_BLOOM = True
+    user = User.objects.create_user(username="importer", password="pass1234")
+    rows = [f"2025-07-{day:02d},-{day}.00,TRY,debit,Kalem {day}" for day in range(1, 7)]
+    with django_capture_on_commit_callbacks(execute=True):
+        import_transactions(user, make_csv(*rows[:2]), "first-key", chunk_size=2)
+    # added outside an import, so the filter has never seen it
+    Transaction.objects.create(
+        user=user, batch=ImportBatch.objects.get(idempotency_key="first-key"), date=timezone.make_aware(datetime(2025, 7, 3)),
+        amount=-3, currency="TRY", transaction_type="debit", description="Kalem 3",
+        unique_hash=normalize_row(user.id, dict(zip(CSV_COLUMNS, rows[2].split(","))))["unique_hash"],
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        result = import_transactions(user, make_csv(*rows[2:]), "fresh-key", chunk_size=2)
+    batch = ImportBatch.objects.get(idempotency_key="fresh-key")
+    assert (result["inserted"], result["skipped"]) == (3, 1)
+    assert batch.dedup_probes == 0
+
+    result = import_transactions(user, make_csv(*rows), "overlap-key", chunk_size=2)
+    batch = ImportBatch.objects.get(idempotency_key="overlap-key")
+    assert (result["inserted"], result["skipped"]) == (0, 6)
+    assert batch.dedup_probes == 3
+
+def test_concurrent_bloom_saves_are_merged(db, settings, django_capture_on_commit_callbacks):
+    settings.TRANSACTION_DEDUP_BLOOM_MIN_CAPACITY = 100
+    user = User.objects.create_user(username="importer", password="pass1234")
+    first, second = load_bloom_filter(user.id), load_bloom_filter(user.id)
+    first.add(hashlib.sha256(b"first").digest())
+    second.add(hashlib.sha256(b"second").digest())
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        save_bloom_filter(user.id, first)
+        save_bloom_filter(user.id, second)
+    assert load_bloom_filter(user.id).count == 0  # nothing is stored before the commit
+    for callback in callbacks:
+        callback()
+
+    stored = load_bloom_filter(user.id)
+    assert hashlib.sha256(b"first").digest() in stored
+    assert hashlib.sha256(b"second").digest() in stored
+    assert stored.count == 2
+
+def test_bloom_filter_is_stored_with_a_ttl(db, settings, monkeypatch, django_capture_on_commit_callbacks):
+    settings.TRANSACTION_DEDUP_BLOOM_MIN_CAPACITY = 100
+    settings.TRANSACTION_BLOOM_TTL = 3600
+    user = User.objects.create_user(username="importer", password="pass1234")
+    stored = []
+    monkeypatch.setattr(dedup.cache, "set", lambda key, value, timeout: stored.append(timeout))
+    with django_capture_on_commit_callbacks(execute=True):
+        save_bloom_filter(user.id, load_bloom_filter(user.id))
+    assert stored == [3600]
+
+def test_import_is_idempotent_per_key(db):
+    user = User.objects.create_user(username="importer", password="pass1234")
+    import_transactions(user, make_csv("2025-07-01,10.00,TRY,credit,Satış"), "same-key")
+    assert import_transactions(user, make_csv("2025-07-02,10.00,TRY,credit,Satış"), "same-key") is False
+    assert Transaction.objects.filter(user=user).count() == 1
+
+def test_import_key_race_reuses_the_first_batch(db, settings, tmp_path, monkeypatch):
+    settings.IMPORT_SPOOL_DIR = str(tmp_path)
+    user = User.objects.create_user(username="importer", password="pass1234")
+    first = ImportBatch.objects.create(user=user, idempotency_key="raced-key")
+    # both requests passed the exists check before either inserted its batch
+    monkeypatch.setattr(QuerySet, "exists", lambda self: False)
+    monkeypatch.setattr(QuerySet, "first", lambda self: None)
+
+    assert import_transactions(user, make_csv("2025-07-01,10.00,TRY,credit,Satış"), "raced-key") is False
+    csv_file = SimpleUploadedFile("tx.csv", make_csv("2025-07-01,10.00,TRY,credit,Satış").read())
+    assert enqueue_import(user, csv_file, "raced-key") == (first, False)
+    assert ImportBatch.objects.count() == 1
+    assert not Transaction.objects.exists()
+
+    other = User.objects.create_user(username="other", password="pass1234")
+    with pytest.raises(ValidationError):
+        import_transactions(other, make_csv("2025-07-01,10.00,TRY,credit,Satış"), "raced-key")
+
+def test_import_rejects_invalid_rows_with_line_numbers(db):
+    user = User.objects.create_user(username="importer", password="pass1234")
+    csv_file = make_csv(
+        "2025-07-01,4500.00,TRY,credit,Satış",
+        "2025-13-01,10.00,TRY,credit,Bad date",
+        "2025-07-02,abc,TRY,debit,Bad amount",
+        "2025-07-03,-10.00,TL,debit,Bad currency",
+        "2025-07-04,-10.00,TRY,refund,Bad type",
+        "2025-07-05,-20.00,TRY,Debit,Kira",
+    )
+    result = import_transactions(user, csv_file, "reject-key", chunk_size=2)
+
+    assert result["inserted"] == 2
+    assert result["rejected"] == 4
+    assert [r["line"] for r in result["rejects"]] == [3, 4, 5, 6]
+    assert result["rejects"][2]["error"] == "Currency must be a 3-letter."
+    assert ImportBatch.objects.get(idempotency_key="reject-key").rejected_rows == 4
+    assert Transaction.objects.get(description="Kira").transaction_type == "debit"
+
+def test_import_requires_csv_columns(db):
+    user = User.objects.create_user(username="importer", password="pass1234")
+    with pytest.raises(ValidationError):
+        import_transactions(user, BytesIO(b"date,amount\n2025-07-01,10\n"), "header-key")
+    assert not ImportBatch.objects.filter(idempotency_key="header-key").exists()
+
+def test_parallel_parser_matches_serial_parser(settings, tmp_path):
+    settings.TRANSACTION_IMPORT_RANGE_BYTES = 64
+    lines = [f"2025-07-{day:02d},-{day}.50,TRY,debit,Kira {day}" for day in range(1, 29)]
+    lines[5] = "2025-07-06,oops,TRY,debit,Bad amount"
+    lines[20] = "2025-02-30,1.00,TRY,credit,Bad date"
+    path = tmp_path / "tx.csv"
+    path.write_bytes(make_csv(*lines).getvalue())
+
+    def parse(parser, *args):
+        rejects = []
+        rows = list(parser(*args, lambda line, error, row: rejects.append((line, error))))
+        return rows, rejects
+
+    with open(path, "rb") as f:
+        serial = parse(parse_transactions, f, 1)
+    parallel = parse(lambda *args: parse_transactions_parallel(*args, workers=2), str(path), 1)
+
+    assert parallel == serial
+    assert [line for line, _ in parallel[1]] == [7, 22]
+
+def test_parallel_parser_keeps_quoted_newlines_in_one_range(settings, tmp_path):
+    settings.TRANSACTION_IMPORT_RANGE_BYTES = 48
+    lines = [f'2025-07-{day:02d},-{day}.00,TRY,debit,"Kira {day}\nTemmuz ""ödeme""\nsatır 3"' for day in range(1, 15)]
+    lines[4] = "2025-07-05,oops,TRY,debit,Bad amount"
+    path = tmp_path / "tx.csv"
+    path.write_bytes(make_csv(*lines).getvalue())
+
+    def parse(parser, *args):
+        rejects = []
+        rows = list(parser(*args, lambda line, error, row: rejects.append((line, error))))
+        return rows, rejects
+
+    with open(path, "rb") as f:
+        serial = parse(parse_transactions, f, 1)
+    parallel = parse(lambda *args: parse_transactions_parallel(*args, workers=2), str(path), 1)
+
+    assert len(serial[0]) == 13
+    assert parallel == serial
+
+def test_spooled_import_with_worker_pool(db, settings, tmp_path):
+    settings.TRANSACTION_IMPORT_WORKERS = 2
+    settings.TRANSACTION_IMPORT_RANGE_BYTES = 64
+    user = User.objects.create_user(username="parallel", password="pass1234")
+    path = tmp_path / "tx.csv"
+    lines = [f"2025-07-{day:02d},-{day}.00,TRY,debit,Kira" for day in range(1, 21)]
+    path.write_bytes(make_csv(*lines, *lines[:5]).getvalue())
+    batch = ImportBatch.objects.create(user=user, idempotency_key="parallel-key", file_path=str(path))
+
+    batch = process_spooled_import(batch.pk)
+
+    assert batch.status == ImportBatch.COMPLETED
+    assert (batch.inserted_rows, batch.skipped_rows) == (20, 5)
+
+def test_async_upload_returns_job_and_reuses_it_on_retry(db, settings, tmp_path, monkeypatch, django_capture_on_commit_callbacks):
+    settings.IMPORT_SPOOL_DIR = str(tmp_path)
+    monkeypatch.setattr(
+        transaction_views.process_import_batch, "delay",
+        lambda batch_id: transaction_views.process_import_batch.apply(args=(batch_id,)),
+    )
+    user = User.objects.create_user(username="asyncuser", password="pass1234")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    def upload():
+        csv_file = SimpleUploadedFile("tx.csv", make_csv("2025-07-01,10.00,TRY,credit,Satış", "2025-07-02,-5.00,TRY,debit,Kira").read())
+        return client.post("/transactions/upload/?async=true", {"file": csv_file}, HTTP_IDEMPOTENCY_KEY="async-key")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = upload()
+    assert response.status_code == 202
+    assert response.data["job_url"].endswith(f"/transactions/imports/{response.data['id']}/")
+
+    job = client.get(f"/transactions/imports/{response.data['id']}/")
+    assert job.data["status"] == ImportBatch.COMPLETED
+    assert job.data["inserted_rows"] == 2
+    assert not list(tmp_path.iterdir())
+
+    retry = upload()
+    assert retry.status_code == 200
+    assert retry.data["id"] == response.data["id"]
+    assert Transaction.objects.filter(user=user).count() == 2
+
+def legacy_detect_category(description, keywords):
+    scores = Counter()
+    for category, words in keywords.items():
+        for word in words:
+            if word in description.lower():
+                scores[category] += 1
+    return scores.most_common(1)[0][0] if scores else "Uncategorized"
+
+@pytest.mark.parametrize("description", [
+    "Satış: Fatura #1023", "Kira Ödemesi", "CRM aylık lisans", "Elektrik faturası",
+    "Personel maaş ödemesi", "Ofis kırtasiye", "internet", "Market Harcaması", "", "su faturası kira",
+])
+def test_compiled_matcher_matches_legacy_scoring(description):
+    assert detect_category(description) == legacy_detect_category(description, CATEGORY_KEYWORDS)
+
+def test_matcher_counts_overlapping_keywords_and_breaks_ties_by_table_order():
+    matcher = CategoryMatcher.from_keywords({"A": ["ab"], "B": ["abc", "bc"], "C": ["c"]})
+    assert matcher.categorize("xabcx") == "B"
+    assert matcher.categorize("ab") == "A"
+    assert matcher.categorize_many(["c", "abc", "zzz"]) == ["C", "B", "Uncategorized"]
+
+def test_matcher_folds_turkish_dotted_and_dotless_i():
+    assert detect_category("İNTERNET FATURASI") == "Utilities"
+    assert detect_category("KIRA ÖDEMESİ") == "Rent"
+    assert detect_categories(["KIRTASİYE", "Kırtasiye"]) == ["Office Supplies", "Office Supplies"]
+
+def test_user_rules_override_builtin_keywords_on_import(db, django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username="ruleuser", password="pass1234")
+    other = User.objects.create_user(username="other", password="pass1234")
+    with django_capture_on_commit_callbacks(execute=True):
+        CategoryRule.objects.create(user=user, category="Cloud", pattern="aws", priority=0)
+        CategoryRule.objects.create(user=user, category="Office Rent", pattern=r"kira\s+\d+", match_type=CategoryRule.REGEX, priority=10)
+        CategoryRule.objects.create(category="Food", pattern="market")
+
+    import_transactions(user, make_csv(
+        "2025-07-01,-10.00,TRY,debit,AWS fatura",
+        "2025-07-02,-10.00,TRY,debit,KIRA 2025",
+        "2025-07-03,-10.00,TRY,debit,Market",
+    ), "rules-key")
+
+    categories = dict(Transaction.objects.filter(user=user).values_list("description", "category"))
+    # "AWS fatura" ties Cloud with Sales; the user's rule comes first in the table
+    assert categories == {"AWS fatura": "Cloud", "KIRA 2025": "Office Rent", "Market": "Food"}
+    assert get_category_matcher(other.id).categorize("aws") == "Uncategorized"
+
+def test_category_matcher_cache_is_invalidated_by_rule_edits(db, django_assert_num_queries, django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username="ruleuser", password="pass1234")
+    assert get_category_matcher(user.id).categorize("netflix") == "Uncategorized"
+    with django_assert_num_queries(0):
+        get_category_matcher(user.id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rule = CategoryRule.objects.create(user=user, category="Subscriptions", pattern="netflix")
+    assert get_category_matcher(user.id).categorize("NETFLIX.COM") == "Subscriptions"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rule.delete()
+    assert get_category_matcher(user.id).categorize("netflix") == "Uncategorized"
+
+def test_recategorize_applies_changed_rules(db, django_capture_on_commit_callbacks, monkeypatch):
+    user = User.objects.create_user(username="ruleuser", password="pass1234")
+    import_transactions(user, make_csv(
+        "2025-07-01,-10.00,TRY,debit,Netflix",
+        "2025-07-02,-20.00,TRY,debit,Netflix",
+        "2025-07-03,-30.00,TRY,debit,Kira",
+    ), "recat-key")
+    with django_capture_on_commit_callbacks(execute=True):
+        CategoryRule.objects.create(user=user, category="Subscriptions", pattern="netflix")
+
+    client = APIClient()
+    client.force_authenticate(user)
+    queued = []
+    monkeypatch.setattr(transaction_views.recategorize_user_transactions, "delay", queued.append)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post("/transactions/recategorize/")
+    assert response.status_code == 202
+    assert queued == [user.pk]
+
+    assert recategorize_user_transactions.apply(args=(user.pk,)).get() == 2
+    assert list(Transaction.objects.filter(user=user).order_by("date").values_list("category", flat=True)) == [
+        "Subscriptions", "Subscriptions", "Rent",
+    ]
+
+def test_rule_api_rejects_invalid_regex(db):
+    user = User.objects.create_user(username="ruleuser", password="pass1234")
+    client = APIClient()
+    client.force_authenticate(user)
+    response = client.post("/transactions/rules/", {"category": "X", "pattern": "(", "match_type": "regex"})
+    assert response.status_code == 400
+    assert "pattern" in response.data
+
+@pytest.mark.parametrize("pattern", ["(a+)+$", "(\\w*)*x", "(?:ab|a+){2,}", "((a|b)+c?)*", "a" * 101])
+def test_rule_api_rejects_catastrophic_regex(db, pattern):
+    user = User.objects.create_user(username="ruleuser", password="pass1234")
+    client = APIClient()
+    client.force_authenticate(user)
+    response = client.post("/transactions/rules/", {"category": "X", "pattern": pattern, "match_type": "regex"})
+    assert response.status_code == 400
+    assert "pattern" in response.data
+
+def test_rule_api_accepts_plain_regex(db):
+    user = User.objects.create_user(username="ruleuser", password="pass1234")
+    client = APIClient()
+    client.force_authenticate(user)
+    response = client.post("/transactions/rules/", {"category": "X", "pattern": r"^pos \d+ (migros|a101)\b", "match_type": "regex"})
+    assert response.status_code == 201
+
+def test_admin_rejects_invalid_global_regex(db):
+    admin = User.objects.create_superuser(username="ruleadmin", password="pass1234")
+    client = APIClient()
+    client.force_login(admin)
+    form = {"category": "X", "pattern": "(", "match_type": "regex", "priority": 0, "is_active": "on"}
+    response = client.post("/admin/transactions/categoryrule/add/", form)
+    assert response.status_code == 200
+    assert "Invalid regex" in response.content.decode()
+    assert not CategoryRule.objects.exists()
+
+    response = client.post("/admin/transactions/categoryrule/add/", {**form, "pattern": r"kira\s+\d+"})
+    assert response.status_code == 302
+    assert CategoryRule.objects.get().user is None
+
+@pytest.fixture
+def many_transactions(db):
+    user = User.objects.create_user(username="pager", password="pass1234")
+    batch = ImportBatch.objects.create(user=user, idempotency_key="pager-key")
+    # three rows per day so cursors have to break ties on id
+    Transaction.objects.bulk_create([
+        Transaction(
+            user=user, batch=batch, date=timezone.make_aware(datetime(2025, 7, 1 + i // 3)), amount=-i,
+            currency="TRY", transaction_type="debit", description=f"row {i}", category="Rent", unique_hash=f"page{i}".encode(),
+        )
+        for i in range(25)
+    ])
+    return user
+
+def test_cursor_pagination_walks_every_row_once_without_count(many_transactions, django_assert_max_num_queries):
+    client = APIClient()
+    client.force_authenticate(many_transactions)
+    expected = list(get_filtered_transactions(many_transactions).values_list("id", flat=True))
+
+    seen = []
+    url = "/transactions/?pagination=cursor&page_size=4"
+    while url:
+        with django_assert_max_num_queries(1) as ctx:
+            response = client.get(url)
+        assert "COUNT" not in " ".join(q["sql"] for q in ctx.captured_queries)
+        assert "count" not in response.data
+        seen += [row["id"] for row in response.data["results"]]
+        url = response.data["next"]
+
+    assert seen == expected
+
+def test_page_number_mode_is_still_default(many_transactions):
+    client = APIClient()
+    client.force_authenticate(many_transactions)
+    response = client.get("/transactions/", {"page": 2})
+    assert response.data["count"] == 25
+    assert len(response.data["results"]) == 10
+
+def test_invalid_cursor_is_rejected(many_transactions):
+    client = APIClient()
+    client.force_authenticate(many_transactions)
+    assert client.get("/transactions/", {"cursor": "not-a-cursor"}).status_code == 404
+
+def test_export_streams_filtered_csv(users_and_transactions):
+    client = APIClient()
+    client.force_authenticate(users_and_transactions)
+    response = client.get("/transactions/export/", {"transaction_type": "debit"})
+
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    rows = list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode())))
+    assert [row["description"] for row in rows] == ["Yemek Gideri", "Kira Ödemesi"]
+    assert rows[0]["amount"] == "-500.00"
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True), ("deflate, GZIP;q=0.5", True), ("br;q=1.0, *;q=0.1", True),
+    ("gzip;q=0", False), ("gzip; q=0.000, *", False), ("identity", False), ("", False), ("notgzip", False),
+])
+def test_accepts_gzip_honours_q_values(header, expected):
+    assert accepts_gzip(header) is expected
+
+def test_export_ndjson_with_gzip(users_and_transactions):
+    client = APIClient()
+    client.force_authenticate(users_and_transactions)
+    response = client.get("/transactions/export/?format=ndjson", HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+    assert response["Content-Encoding"] == "gzip"
+    body = gzip.decompress(b"".join(response.streaming_content)).decode()
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert len(rows) == 3
+    assert {row["category"] for row in rows} == {"Sales", "Rent", "Food"}
+    assert rows[0]["date"] == "2025-07-01T00:00:00+00:00"
+
+def test_list_returns_public_fields_only(users_and_transactions, django_assert_num_queries):
+    client = APIClient()
+    client.force_authenticate(users_and_transactions)
+    with django_assert_num_queries(2):
+        response = client.get("/transactions/", {"transaction_type": "credit"})
+
+    row = response.json()["results"][0]
+    assert row == {
+        "id": row["id"], "date": "2025-07-01T00:00:00Z", "amount": "4500.00", "currency": "TRY",
+        "transaction_type": "credit", "description": "Satış: Fatura #1023", "category": "Sales",
+    }
+
+def test_list_sparse_fieldset(users_and_transactions):
+    client = APIClient()
+    client.force_authenticate(users_and_transactions)
+    response = client.get("/transactions/", {"fields": "amount,id", "pagination": "cursor"})
+    assert [set(row) for row in response.data["results"]] == [{"id", "amount"}] * 3
+
+    response = client.get("/transactions/", {"fields": "amount,unique_hash"})
+    assert response.status_code == 400
+    assert "unique_hash" in str(response.data["fields"])
+
+def test_binary_hash_matches_hex_rows_converted_by_migration(db):
+    migration = import_module("transactions.migrations.0010_backfill_unique_digest")
+    row = {"date": "2025-07-01", "amount": "10.00", "description": "Satış"}
+    old_hex = hashlib.sha256(b"7-2025-07-01-10.00-Sat\xc4\xb1\xc5\x9f").hexdigest()
+
+    # rows stored before the migration dedup against re-uploads after it
+    assert migration.to_digest(old_hex) == generate_unique_hash(7, row)
+    assert len(migration.to_digest("not-a-hex-hash")) == 32
+
+@pytest.mark.django_db(transaction=True)
+def test_hash_migrations_convert_rows_written_between_the_steps():
+    from django.db.migrations.executor import MigrationExecutor
+    executor = MigrationExecutor(connection)
+    executor.migrate([("transactions", "0009_transaction_unique_digest")])
+    old_apps = executor.loader.project_state(("transactions", "0009_transaction_unique_digest")).apps
+    OldTransaction = old_apps.get_model("transactions", "Transaction")
+    user = old_apps.get_model("auth", "User").objects.create(username="migrated")
+    batch = old_apps.get_model("transactions", "ImportBatch").objects.create(user=user, idempotency_key="migrated-key")
+    common = {"user": user, "batch": batch, "date": timezone.now(), "amount": 1, "currency": "TRY", "transaction_type": "credit"}
+    OldTransaction.objects.create(unique_hash="ab" * 32, **common)
+
+    executor = MigrationExecutor(connection)
+    executor.migrate([("transactions", "0010_backfill_unique_digest")])
+    # imported by the old code after the batched backfill finished
+    OldTransaction.objects.create(unique_hash="late-row", **common)
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+    assert sorted(bytes(value) for value in Transaction.objects.values_list("unique_hash", flat=True)) == sorted(
+        [bytes.fromhex("ab" * 32), hashlib.sha256(b"late-row").digest()]
+    )
+
+def test_unique_hash_is_scoped_per_user(users_and_transactions):
+    other = User.objects.get(username="otheruser")
+    Transaction.objects.create(
+        user=other, batch=ImportBatch.objects.get(idempotency_key="other-key"), date=timezone.now(),
+        amount=1, currency="TRY", transaction_type="credit", unique_hash=b"hash1",
+    )
+    with pytest.raises(IntegrityError):
+        Transaction.objects.create(
+            user=other, batch=ImportBatch.objects.get(idempotency_key="other-key"), date=timezone.now(),
+            amount=1, currency="TRY", transaction_type="credit", unique_hash=b"hash1",
+        )
+
+def test_explain_queries_reports_indexes(users_and_transactions):
+    out = StringIO()
+    call_command("explain_queries", user=users_and_transactions.pk, stdout=out)
+    lines = {line[:32].strip(): line[32:].strip() for line in out.getvalue().splitlines()}
+
+    assert lines["?transaction_type=debit"] == "transaction_debit_date_idx"
+    assert "transaction_user_hash_unique" in out.getvalue()
+    assert "full scan of transactions_transaction" not in out.getvalue()
+
+def test_plan_indexes_reads_postgres_plans():
+    plan = (
+        "Limit  (cost=0.42..1.02 rows=10 width=72)\n"
+        "  ->  Index Scan using transaction_user_category_idx on transactions_transaction\n"
+        "        Index Cond: ((user_id = 1) AND (upper((category)::text) = 'RENT'::text))\n"
+        "  ->  Seq Scan on reports_dailyrollup"
+    )
+    assert plan_indexes(plan) == ["transaction_user_category_idx", "full scan of reports_dailyrollup"]
+
+def test_partition_command_needs_postgresql(db):
+    if connection.vendor == "postgresql":
+        pytest.skip("covered by test_partitioned_range_queries_are_pruned")
+    with pytest.raises(CommandError, match="PostgreSQL"):
+        call_command("partition_transactions", "convert")
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="declarative partitioning is PostgreSQL only")
+def test_partitioned_range_queries_are_pruned(users_and_transactions):
+    user = users_and_transactions
+    call_command("partition_transactions", "convert", stdout=StringIO())
+    Transaction.objects.create(
+        user=user, batch=ImportBatch.objects.get(idempotency_key="batch-key"), date=timezone.make_aware(datetime(2025, 8, 3)),
+        amount=-50, currency="TRY", transaction_type="debit", category="Food", unique_hash=b"hash-august",
+    )
+
+    july = get_filtered_transactions(user, "2025-07-01", "2025-07-31")
+    plan = july.explain()
+    assert "transactions_transaction_p2025_07" in plan
+    assert "transactions_transaction_p2025_08" not in plan
+    assert "transactions_transaction_default" not in plan
+    assert july.count() == 3
+    assert get_filtered_transactions(user).count() == 4
+
+def partition_rows(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {name}")
+        return cursor.fetchone()[0]
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="declarative partitioning is PostgreSQL only")
+def test_maintain_moves_rows_out_of_the_default_partition(users_and_transactions):
+    user = users_and_transactions
+    call_command("partition_transactions", "convert", "--months-ahead", "0", stdout=StringIO())
+    # two months ahead has no partition yet, so this row lands in the default partition
+    year, month = add_months(timezone.localtime().year, timezone.localtime().month, 2)
+    Transaction.objects.create(
+        user=user, batch=ImportBatch.objects.get(idempotency_key="batch-key"), date=timezone.make_aware(datetime(year, month, 5)),
+        amount=-50, currency="TRY", transaction_type="debit", category="Food", unique_hash=b"hash-ahead",
+    )
+    assert partition_rows("transactions_transaction_default") == 1
+
+    created, _ = maintain_partitions(months_ahead=2, retain_months=0)
+    assert partition_name(year, month) in created
+    assert partition_rows(partition_name(year, month)) == 1
+    assert partition_rows("transactions_transaction_default") == 0
+    assert get_filtered_transactions(user).count() == 4
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="declarative partitioning is PostgreSQL only")
+def test_detaching_a_month_drops_its_rollups(users_and_transactions):
+    user = users_and_transactions
+    call_command("partition_transactions", "convert", stdout=StringIO())
+    july = timezone.localdate(timezone.make_aware(datetime(2025, 7, 1)))
+    assert DailyRollup.objects.filter(day=july).exists()
+    now = timezone.localtime()
+    retain = (now.year - 2025) * 12 + now.month - 8
+
+    _, detached = maintain_partitions(months_ahead=0, retain_months=retain)
+    assert partition_name(2025, 7) in detached
+    assert not DailyRollup.objects.filter(day=july).exists()
+    # a full rebuild from the remaining rows agrees with the reports
+    refresh_daily_rollups(user.pk)
+    assert not DailyRollup.objects.filter(day=july).exists()
+
+def csv_rows(count, offset=0):
+    return make_csv(*(f"2025-07-{1 + i % 28:02d},{i + 1}.00,TRY,debit,Kira #{offset + i}" for i in range(count)))
+
+def test_upload_query_budget(query_budget):
+    # queries grow per chunk (TRANSACTION_IMPORT_CHUNK_SIZE rows), never per row; both sizes fit in one
+    # chunk and in one INSERT (SQLite splits bulk inserts at 999 parameters, about 110 rows)
+    def setup(size):
+        user = User.objects.create_user(username=f"budget-upload-{size}")
+        client = APIClient()
+        client.force_authenticate(user)
+        return client, SimpleUploadedFile("tx.csv", csv_rows(size).read()), f"budget-key-{size}"
+
+    def call(argument):
+        client, csv_file, key = argument
+        return client.post("/transactions/upload/", {"file": csv_file}, HTTP_IDEMPOTENCY_KEY=key)
+
+    query_budget(20, setup, call)  # 2 of them are the savepoint around the batch insert
+
+def test_list_query_budget(query_budget):
+    user = User.objects.create_user(username="budget-list")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    def setup(size):
+        import_transactions(user, csv_rows(size - Transaction.objects.filter(user=user).count(), offset=size), f"list-rows-{size}")
+        return {"start_date": "2025-07-01", "end_date": "2025-07-31"}
+
+    query_budget(2, setup, lambda params: client.get("/transactions/", params))
+
+def test_str_does_not_load_the_user(users_and_transactions, django_assert_num_queries):
+    transactions = list(Transaction.objects.all())
+    batches = list(ImportBatch.objects.all())
+    with django_assert_num_queries(0):
+        [str(obj) for obj in transactions + batches]
@@ -1,7 +1,13 @@
 from django.urls import path
-from .views import TransactionUploadView, TransactionListView
+from .views import TransactionUploadView, TransactionListView, ImportBatchDetailView
+from .views import CategoryRuleListCreateView, CategoryRuleDetailView, RecategorizeView, TransactionExportView
 
 urlpatterns = [
     path('upload/', TransactionUploadView.as_view(), name='transaction-upload'),
+    path('export/', TransactionExportView.as_view(), name='transaction-export'),
+    path('imports/<int:pk>/', ImportBatchDetailView.as_view(), name='import-batch-detail'),
+    path('rules/', CategoryRuleListCreateView.as_view(), name='category-rule-list'),
+    path('rules/<int:pk>/', CategoryRuleDetailView.as_view(), name='category-rule-detail'),
+    path('recategorize/', RecategorizeView.as_view(), name='transaction-recategorize'),
     path('', TransactionListView.as_view(), name='transaction-list'),
 ]
\ No newline at end of file
@@ -4,10 +4,20 @@ from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import MultiPartParser
 from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes, OpenApiRequest
-from .services import import_transactions
-from .serializers import MessageResponseSerializer, TransactionUploadSerializer, TransactionSerializer
+from .models import ImportBatch, CategoryRule
+from .services import import_transactions, enqueue_import
+from .serializers import MessageResponseSerializer, ImportResultSerializer, ImportBatchSerializer, TransactionUploadSerializer
+from .serializers import LIST_FIELDS, TransactionReadSerializer, TransactionListSerializer
+from .serializers import CategoryRuleSerializer
 from .services import get_filtered_transactions
+from .tasks import process_import_batch, recategorize_user_transactions
+from .pagination import KeysetPagination
+from .export import EXPORT_FIELDS, CSVRenderer, NDJSONRenderer, csv_lines, ndjson_lines, encode_chunks, accepts_gzip
 
 class TransactionUploadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -15,9 +25,10 @@ class TransactionUploadView(APIView):
     parser_classes = [MultiPartParser]
     @extend_schema(
         request=TransactionUploadSerializer,
-        responses={201: MessageResponseSerializer},
+        responses={201: ImportResultSerializer, 200: MessageResponseSerializer, 202: ImportBatchSerializer},
         parameters=[
             OpenApiParameter(name='Idempotency-Key', description='Unique key to prevent duplicate uploads', required=True, type=OpenApiTypes.STR, location=OpenApiParameter.HEADER),
+            OpenApiParameter("async", bool, description="Process the upload in the background and return a job to poll", required=False),
         ]
     )
     def post(self, request, *args, **kwargs):
@@ -29,38 +40,157 @@ class TransactionUploadView(APIView):
         if not csv_file:
             return Response({"error": "CSV file is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        created = import_transactions(request.user, csv_file, idempotency_key)
-        if not created:
+        if request.query_params.get("async") in ("1", "true", "True"):
+            return self.post_async(request, csv_file, idempotency_key)
+
+        result = import_transactions(request.user, csv_file, idempotency_key)
+        if not result:
             return Response({"message": "This upload has already been processed"}, status=status.HTTP_200_OK)
         
-        return Response({"message": "Transactions uploaded successfully"}, status=status.HTTP_201_CREATED)
+        return Response({"message": "Transactions uploaded successfully", **result}, status=status.HTTP_201_CREATED)
+
+    def post_async(self, request, csv_file, idempotency_key):
+        batch, created = enqueue_import(request.user, csv_file, idempotency_key)
+        if created:
+            db_transaction.on_commit(lambda: process_import_batch.delay(batch.pk))
+
+        data = ImportBatchSerializer(batch).data
+        data["job_url"] = request.build_absolute_uri(reverse("import-batch-detail", args=[batch.pk]))
+        return Response(data, status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+
+
+class ImportBatchDetailView(generics.RetrieveAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ImportBatchSerializer
+
+    def get_queryset(self):
+        return ImportBatch.objects.filter(user=self.request.user)
     
 
 class TransactionListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
-    serializer_class = TransactionSerializer
+    serializer_class = TransactionListSerializer
     pagination_class = PageNumberPagination
 
+    @property
+    def paginator(self):
+        # page numbers for the UI; sync clients opt into cursors with ?pagination=cursor
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if "cursor" in params or params.get("pagination") == "cursor":
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_fields(self):
+        if not hasattr(self, "_fields"):
+            self._fields = TransactionListSerializer.parse_fields(self.request.query_params.get("fields"))
+        return self._fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs["fields"] = self.get_fields()
+        return super().get_serializer(*args, **kwargs)
+
     def get_queryset(self):
         user = self.request.user
         params = self.request.query_params
+        # date and id are always selected: they drive the ordering and the cursor
+        wanted = {"id", "date", *(self.get_fields() or LIST_FIELDS)}
+        columns = [name for name in LIST_FIELDS if name in wanted]
         return get_filtered_transactions(
             user=user,
             start_date=params.get("start_date"),
             end_date=params.get("end_date"),
             transaction_type=params.get("transaction_type"),
             category=params.get("category"),
-        )
+        ).values(*columns)
+
     @extend_schema(
         parameters=[
             OpenApiParameter("start_date", str, description="Filter transactions from this date (YYYY-MM-DD)", required=False),
             OpenApiParameter("end_date", str, description="Filter transactions up to this date (YYYY-MM-DD)", required=False),
             OpenApiParameter("transaction_type", str, description="Filter by transaction type, e.g. credit or debit", required=False),
             OpenApiParameter("category", str, description="Filter by transaction category", required=False),
+            OpenApiParameter("pagination", str, description="Set to 'cursor' for keyset pagination without a total count", required=False),
+            OpenApiParameter("cursor", str, description="Opaque cursor from the 'next' link of a cursor page", required=False),
+            OpenApiParameter("page_size", int, description="Rows per cursor page (max 1000)", required=False),
+            OpenApiParameter("fields", str, description="Comma-separated subset of fields to return, e.g. id,date,amount", required=False),
         ],
         description="Retrieve filtered list of transactions for the authenticated user.",
-        responses=TransactionSerializer(many=True),
+        responses=TransactionReadSerializer(many=True),
     )
     # extend schema for API documentation, couse drf cannot detect get_queryset method
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
\ No newline at end of file
+        return super().get(request, *args, **kwargs)
+
+
+class CategoryRuleListCreateView(generics.ListCreateAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = CategoryRuleSerializer
+
+    def get_queryset(self):
+        return CategoryRule.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class CategoryRuleDetailView(generics.RetrieveUpdateDestroyAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = CategoryRuleSerializer
+
+    def get_queryset(self):
+        return CategoryRule.objects.filter(user=self.request.user)
+
+
+class RecategorizeView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        request=None,
+        responses={202: MessageResponseSerializer},
+        description="Queue a background job that applies the current category rules to all stored transactions of the authenticated user.",
+    )
+    def post(self, request):
+        user_id = request.user.pk
+        db_transaction.on_commit(lambda: recategorize_user_transactions.delay(user_id))
+        return Response({"message": "Recategorization queued"}, status=status.HTTP_202_ACCEPTED)
+
+
+class TransactionExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("format", str, description="csv (default) or ndjson; the Accept header works too", required=False),
+            OpenApiParameter("start_date", str, description="Filter transactions from this date (YYYY-MM-DD)", required=False),
+            OpenApiParameter("end_date", str, description="Filter transactions up to this date (YYYY-MM-DD)", required=False),
+            OpenApiParameter("transaction_type", str, description="Filter by transaction type, e.g. credit or debit", required=False),
+            OpenApiParameter("category", str, description="Filter by transaction category", required=False),
+        ],
+        description="Stream every matching transaction as CSV or NDJSON, gzip-compressed when the client accepts it.",
+        responses={(200, "text/csv"): OpenApiTypes.STR, (200, "application/x-ndjson"): OpenApiTypes.STR},
+    )
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        # server-side cursor over plain tuples: no model instances or serializers, flat memory
+        rows = get_filtered_transactions(
+            user=request.user,
+            start_date=params.get("start_date"),
+            end_date=params.get("end_date"),
+            transaction_type=params.get("transaction_type"),
+            category=params.get("category"),
+        ).values_list(*EXPORT_FIELDS).iterator(chunk_size=settings.TRANSACTION_EXPORT_CHUNK_SIZE)
+
+        renderer = request.accepted_renderer
+        lines = csv_lines(rows) if renderer.format == "csv" else ndjson_lines(rows)
+        compress = accepts_gzip(request.headers.get("Accept-Encoding", ""))
+
+        response = StreamingHttpResponse(encode_chunks(lines, compress), content_type=f"{renderer.media_type}; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="transactions.{renderer.format}"'
+        response["Vary"] = "Accept, Accept-Encoding"
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        return response
@@ -0,0 +1,63 @@
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import Upper
+
+CONSTRAINT = 'auth_user_email_upper_unique'
+# matches EmailBackend's UPPER(email) = UPPER(%s) lookup; accounts without an email stay allowed
+EMAIL_UNIQUE = models.UniqueConstraint(Upper('email'), condition=~Q(email=''), name=CONSTRAINT)
+
+
+class DuplicateEmails(Exception):
+    pass
+
+
+def duplicate_emails(User):
+    """{UPPER(email): [(id, username, email), ...]} for addresses used by more than one account.
+
+    Compared with the database's UPPER, the function the index uses: Python's str.upper
+    differs for some characters ('ß' becomes 'SS'), which would report accounts the index
+    accepts or miss ones it rejects.
+    """
+    emails = User.objects.exclude(email='').annotate(key=Upper('email'))
+    duplicated = emails.values('key').annotate(accounts=Count('id')).filter(accounts__gt=1).values('key')
+    accounts = {}
+    for key, pk, username, email in emails.filter(key__in=duplicated).order_by('key', 'id').values_list('key', 'id', 'username', 'email'):
+        accounts.setdefault(key, []).append((pk, username, email))
+    return accounts
+
+
+def check_duplicate_emails(apps, schema_editor):
+    # no account's email is changed here: duplicates are resolved by hand, then the migration is rerun
+    duplicates = duplicate_emails(apps.get_model('auth', 'User'))
+    if duplicates:
+        lines = [
+            f"  {email}: " + ", ".join(f"id={pk} username={username!r} email={stored!r}" for pk, username, stored in users)
+            for email, users in sorted(duplicates.items())
+        ]
+        raise DuplicateEmails(
+            f"{len(duplicates)} email address(es) belong to more than one account (compared case-insensitively). "
+            "Change or clear all but one of each before migrating:\n" + "\n".join(lines)
+        )
+
+
+def add_unique_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    schema_editor.execute(EMAIL_UNIQUE.create_sql(User, schema_editor))
+
+
+def remove_unique_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    schema_editor.execute(EMAIL_UNIQUE.remove_sql(User, schema_editor))
+
+
+class Migration(migrations.Migration):
+    # auth.User belongs to django.contrib.auth, so the index is added here as SQL rather than in model state
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunPython(add_unique_index, remove_unique_index),
+    ]
@@ -0,0 +1,12 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from bank_kpi_backend.authentication import invalidate_user
+
+User = get_user_model()
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # password changes and deactivation are saves too; bumped after commit like the other version stamps
+    db_transaction.on_commit(lambda: invalidate_user(instance.pk))
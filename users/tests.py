@@ -1,3 +1,136 @@
-from django.test import TestCase
+import pytest
+from importlib import import_module
+from django.apps import apps
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.db import connection, IntegrityError
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from bank_kpi_backend.authentication import CachedJWTAuthentication
 
-# Create your tests here.
+
+@pytest.fixture
+def token_client(db):
+    user = User.objects.create_user(username="tokenuser", email="token@example.com", password="pass1234")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    return user, client
+
+def user_queries(client):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/reports/history/")
+    assert response.status_code == 200
+    return [query["sql"] for query in queries if '"auth_user"' in query["sql"]]
+
+def test_token_user_is_loaded_once(token_client):
+    user, client = token_client
+    assert len(user_queries(client)) == 1
+    assert user_queries(client) == []
+
+def test_cached_user_instances_are_not_shared(token_client):
+    user, _ = token_client
+    authentication = CachedJWTAuthentication()
+    first = authentication.get_cached_user(user.pk)
+    first.first_name = "changed"
+    first._state.fields_cache["marker"] = object()
+    second = authentication.get_cached_user(user.pk)
+    assert second.first_name == ""
+    assert "marker" not in second._state.fields_cache
+    assert second._state is not first._state
+
+def test_password_change_reloads_cached_user(token_client, django_capture_on_commit_callbacks):
+    user, client = token_client
+    user_queries(client)
+    with django_capture_on_commit_callbacks(execute=True):
+        user.set_password("new-pass-5678")
+        user.save()
+
+    assert len(user_queries(client)) == 1
+
+def test_deactivated_user_is_rejected_immediately(token_client, django_capture_on_commit_callbacks):
+    user, client = token_client
+    user_queries(client)
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+
+    response = client.get("/reports/history/")
+    assert response.status_code == 401
+
+def test_schema_documents_the_bearer_scheme(db):
+    from drf_spectacular.generators import SchemaGenerator
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    assert schema["components"]["securitySchemes"]["jwtAuth"]["scheme"] == "bearer"
+    assert {"jwtAuth": []} in schema["paths"]["/reports/history/"]["get"]["security"]
+
+def test_email_login_is_case_insensitive_and_one_query(token_client):
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().post("/auth/login/", {"email": "Token@Example.COM", "password": "pass1234"}, format="json")
+    assert response.status_code == 200
+    assert "access" in response.data
+    assert len([query for query in queries if '"auth_user"' in query["sql"]]) == 1
+
+def test_username_login_still_works(token_client):
+    user, _ = token_client
+    assert authenticate(username="tokenuser", password="pass1234") == user
+    assert authenticate(username="tokenuser", password="wrong") is None
+    assert authenticate(email="missing@example.com", password="pass1234") is None
+    assert authenticate(username="TOKEN@example.com", password="pass1234") == user
+
+def test_username_containing_at_sign_logs_in(token_client):
+    user = User.objects.create_user(username="ali@corp", email="", password="pass1234")
+    assert authenticate(username="ali@corp", password="pass1234") == user
+    # a username that equals another account's email resolves to the username
+    other = User.objects.create_user(username="token@example.com", password="other5678")
+    assert authenticate(username="token@example.com", password="other5678") == other
+
+def test_email_is_unique_ignoring_case(token_client):
+    User.objects.create_user(username="noemail-1")
+    User.objects.create_user(username="noemail-2")
+    with pytest.raises(IntegrityError):
+        User.objects.create_user(username="copy", email="TOKEN@example.com")
+
+def test_register_rejects_taken_email(token_client):
+    response = APIClient().post("/auth/register/", {
+        "username": "another", "email": "token@EXAMPLE.com", "password": "Sup3r-secret!", "password2": "Sup3r-secret!",
+    }, format="json")
+    assert response.status_code == 400
+    assert "email" in response.data
+
+@pytest.mark.django_db(transaction=True)
+def test_migration_refuses_duplicate_emails():
+    migration = import_module("users.migrations.0001_unique_email_index")
+    with connection.schema_editor() as schema_editor:
+        migration.remove_unique_index(apps, schema_editor)
+    User.objects.create_user(username="first", email="dup@example.com")
+    User.objects.create_user(username="second", email="DUP@example.com")
+
+    with pytest.raises(migration.DuplicateEmails, match="DUP@EXAMPLE.COM: id=.* username='first'.*username='second'"):
+        migration.check_duplicate_emails(apps, None)
+    assert sorted(User.objects.values_list("email", flat=True)) == ["DUP@example.com", "dup@example.com"]
+
+    User.objects.filter(username="second").update(email="second@example.com")
+    # python would fold both to STRASSE; the database's UPPER, which the index uses, does not
+    User.objects.create_user(username="sharp-s", email="straße@example.com")
+    User.objects.create_user(username="double-s", email="STRASSE@example.com")
+    migration.check_duplicate_emails(apps, None)
+    with connection.schema_editor() as schema_editor:
+        migration.add_unique_index(apps, schema_editor)
+
+def add_users(size):
+    User.objects.bulk_create([
+        User(username=f"budget-{i}", email=f"budget-{i}@example.com") for i in range(User.objects.count(), size)
+    ])
+
+def test_register_query_budget(query_budget):
+    def setup(size):
+        add_users(size)
+        return {"username": f"new-{size}", "email": f"new-{size}@example.com", "password": "Sup3r-secret!", "password2": "Sup3r-secret!"}
+
+    query_budget(3, setup, lambda body: APIClient().post("/auth/register/", body, format="json"))
+
+def test_token_query_budget(query_budget):
+    User.objects.create_user(username="budget-login", email="login@example.com", password="pass1234")
+    body = {"email": "login@example.com", "password": "pass1234"}
+    query_budget(1, lambda size: add_users(size), lambda _: APIClient().post("/auth/login/", body, format="json"))
@@ -5,7 +5,8 @@ from django.utils.timezone import make_aware, is_aware
 def normalize_date(input_date: str | date | datetime, is_end: bool = False) -> datetime:
 
     if isinstance(input_date, str):
-        input_date = datetime.strptime(input_date, "%Y-%m-%d")
+        # parsed as a date so an end bound covers the whole day, like get_filtered_transactions
+        input_date = datetime.strptime(input_date, "%Y-%m-%d").date()
 
     if isinstance(input_date, date) and not isinstance(input_date, datetime):
         input_date = datetime.combine(input_date, time.max if is_end else time.min)